@@ -2,8 +2,12 @@
 
 if [ "$BUILD_AUTODOC" = "No" ]; then
     ARGS=''
+elif [ "$BUILD_AUTODOC" = "Combined" ]; then
+    ARGS='--combined'
 else
     ARGS='-t autodoc'
 fi
 
 nox -s build -- $ARGS
+# Prune and fingerprint the assets before Netlify or GitHub Pages deploys them
+nox -s prepare-deployment
@@ -0,0 +1,199 @@
+"""Skip ignored modules in autosummary's recursion before importing them.
+
+The reference can also be limited to just some modules, with references to
+the rest resolved as unlinked stubs so that nitpicky builds still pass.
+"""
+
+# Standard library imports
+import fnmatch
+import functools
+import pkgutil
+import re
+from pathlib import Path
+
+# Third party imports
+import sphinx
+from sphinx.util import logging
+
+
+# Constants
+REGEX_PREFIX = "re:"
+STUB_DIRNAME = "_autosummary"
+
+logger = logging.getLogger(__name__)
+
+
+def compile_module_matcher(patterns):
+    """Compile glob and regex (``re:``-prefixed) patterns into one matcher.
+
+    Patterns are matched against the full dotted module name, and the
+    returned function returns whether a module name matches any of them.
+    """
+    regexes = [
+        (
+            pattern[len(REGEX_PREFIX) :]
+            if pattern.startswith(REGEX_PREFIX)
+            else fnmatch.translate(pattern)
+        )
+        for pattern in patterns
+    ]
+    if not regexes:
+        return lambda modname: False
+    combined = re.compile("|".join(f"(?:{regex})" for regex in regexes))
+    return functools.lru_cache(maxsize=None)(
+        lambda modname: combined.fullmatch(modname) is not None
+    )
+
+
+def compile_module_selector(prefixes):
+    """Compile module name prefixes into a matcher of the modules to keep.
+
+    A module is kept if it is one of the prefixes, is inside one, or is a
+    parent package of one (so autosummary can recurse down to it). With no
+    prefixes, every module is kept.
+    """
+    prefixes = tuple(prefixes)
+    if not prefixes:
+        return lambda modname: True
+    return functools.lru_cache(maxsize=None)(
+        lambda modname: any(
+            modname == prefix
+            or modname.startswith(f"{prefix}.")
+            or prefix.startswith(f"{modname}.")
+            for prefix in prefixes
+        )
+    )
+
+
+def get_module_filter(config):
+    """Get a function returning whether a module is left out of the docs."""
+    is_ignored = compile_module_matcher(config.autosummary_ignore_modules)
+    is_selected = compile_module_selector(config.autosummary_only_modules)
+    return lambda modname: is_ignored(modname) or not is_selected(modname)
+
+
+def wrap_get_modules(get_modules, is_ignored):
+    """Wrap autosummary's submodule finder to skip ignored modules."""
+
+    @functools.wraps(get_modules)
+    def pruned_get_modules(obj, *, skip, name, **kwargs):
+        ignored = [
+            modname
+            for __, modname, __ in pkgutil.iter_modules(obj.__path__)
+            if is_ignored(f"{name}.{modname}")
+        ]
+        for modname in ignored:
+            logger.verbose("autosummary: skipping module %s.%s", name, modname)
+        return get_modules(obj, skip=[*skip, *ignored], name=name, **kwargs)
+
+    return pruned_get_modules
+
+
+def get_template_filter(patterns):
+    """Get the module names and name parts the module template can skip.
+
+    Only exact names and ``*part*`` globs can be matched by the template.
+    """
+    names, parts, unsupported = [], [], []
+    for pattern in patterns:
+        inner = pattern[1:-1] if pattern[:1] == pattern[-1:] == "*" else None
+        if not re.search(r"[*?\[]", pattern) and not pattern.startswith(
+            REGEX_PREFIX
+        ):
+            names.append(pattern)
+        elif inner and not re.search(r"[*?\[]", inner):
+            parts.append(inner)
+        else:
+            unsupported.append(pattern)
+    return names, parts, unsupported
+
+
+def filter_in_template(config):
+    """Leave the ignored modules out when rendering the module template.
+
+    For Sphinx versions without the submodule finder this extension wraps,
+    so they are still imported, only not documented.
+    """
+    names, parts, unsupported = get_template_filter(
+        config.autosummary_ignore_modules
+    )
+    logger.warning(
+        (
+            "autosummaryprune can't skip modules before they're imported on "
+            "Sphinx %s, so only leaves them out of the module template%s"
+        ),
+        sphinx.__version__,
+        f" (and can't match {', '.join(unsupported)})" if unsupported else "",
+        type="autosummaryprune",
+    )
+    config.autosummary_context = {
+        **config.autosummary_context,
+        "ignored_module_names": names,
+        "ignored_module_parts": parts,
+    }
+
+
+def prune_autosummary_modules(app, config):
+    """Install the module filter before autosummary generates stubs."""
+    # pylint: disable = import-outside-toplevel, protected-access
+    from sphinx.ext.autosummary import generate
+
+    if not hasattr(generate, "_get_modules"):
+        filter_in_template(config)
+        return
+    get_modules = getattr(
+        generate._get_modules, "__wrapped__", generate._get_modules
+    )
+    is_excluded = get_module_filter(config)
+    app.autosummary_module_selector = compile_module_selector(
+        config.autosummary_only_modules
+    )
+    generate._get_modules = wrap_get_modules(get_modules, is_excluded)
+
+    # Don't read the stubs left over from builds of other modules
+    if config.autosummary_only_modules:
+        config.exclude_patterns = [
+            *config.exclude_patterns,
+            *(
+                f"{STUB_DIRNAME}/{stub_path.name}"
+                for stub_path in sorted(
+                    (Path(app.srcdir) / STUB_DIRNAME).glob("*.rst")
+                )
+                if is_excluded(stub_path.stem)
+            ),
+        ]
+
+
+def resolve_to_stub(app, env, node, contnode):
+    """Resolve references to modules not in the only list as unlinked stubs."""
+    # pylint: disable = unused-argument
+    only_modules = app.config.autosummary_only_modules
+    if not only_modules or node.get("refdomain") != "py":
+        return None
+    is_selected = app.autosummary_module_selector
+    packages = {prefix.partition(".")[0] for prefix in only_modules}
+    target = node["reftarget"]
+    module = node.get("py:module")
+    for name in (target, f"{module}.{target}" if module else None):
+        if (
+            name
+            and name.partition(".")[0] in packages
+            and not is_selected(name)
+        ):
+            return contnode
+    return None
+
+
+def setup(app):
+    """Register the autosummary module filter with Sphinx."""
+    app.setup_extension("sphinx.ext.autosummary")
+    app.add_config_value("autosummary_ignore_modules", [], "env", types=[list])
+    app.add_config_value("autosummary_only_modules", [], "env", types=[list])
+    app.connect("config-inited", prune_autosummary_modules)
+    # After intersphinx and the domains have had a chance to resolve them
+    app.connect("missing-reference", resolve_to_stub, priority=900)
+    return {
+        "version": "1.0",
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
@@ -0,0 +1,229 @@
+"""Time the Sphinx event handlers of each extension and report the slowest."""
+
+# Standard library imports
+import functools
+import heapq
+import json
+import os
+import time
+from pathlib import Path
+
+# Third party imports
+from docutils import nodes
+from sphinx.util import logging
+
+
+# Constants
+SLOWEST_CALLS = 5
+RANKED_HANDLERS = 25
+
+logger = logging.getLogger(__name__)
+
+
+def get_handler_module(handler):
+    """Get the name of the module defining an event handler."""
+    while isinstance(handler, functools.partial):
+        handler = handler.func
+    handler = getattr(handler, "__func__", handler)
+    module_name = getattr(handler, "__module__", None)
+    if module_name is None:
+        module_name = type(handler).__module__
+    return module_name or "<unknown>"
+
+
+def describe_call(app, event_name, args):
+    """Get a short description of what an event handler was called for."""
+    target = None
+    if event_name.startswith("autodoc-") and len(args) > 1:
+        target = args[1]
+    else:
+        for arg in args:
+            if isinstance(arg, nodes.Element) and "reftarget" in arg:
+                target = arg["reftarget"]
+                break
+            if isinstance(arg, str):
+                target = arg
+                break
+    env = getattr(app, "env", None)
+    docname = getattr(env, "docname", None) if env else None
+    parts = [part for part in (docname, target) if part]
+    if len(parts) == 2 and parts[0] == parts[1]:
+        parts = parts[:1]
+    return ": ".join(str(part) for part in parts)
+
+
+class EventTimer:
+    """Record the calls and self times of wrapped event handlers.
+
+    Time spent in events emitted from within a handler is counted towards
+    the inner handlers only, so the totals add up to the time spent in
+    handlers overall.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.pid = os.getpid()
+        self.stats = {}
+        self._nested_times = [0.0]
+        self._extension_names = {}
+
+    def get_extension_name(self, handler):
+        """Get the extension (or else the package) an event handler is from."""
+        module_name = get_handler_module(handler)
+        if module_name in self._extension_names:
+            return self._extension_names[module_name]
+        name = module_name
+        while name and name not in self.app.extensions:
+            name = name.rpartition(".")[0]
+        extension_name = name or module_name.partition(".")[0]
+        self._extension_names[module_name] = extension_name
+        return extension_name
+
+    def record(self, key, elapsed, detail):
+        """Add a handler call to the stats."""
+        key_stats = self.stats.get(key)
+        if key_stats is None:
+            key_stats = self.stats[key] = {
+                "calls": 0,
+                "total": 0.0,
+                "slowest": [],
+            }
+        key_stats["calls"] += 1
+        key_stats["total"] += elapsed
+        slowest = key_stats["slowest"]
+        if len(slowest) < SLOWEST_CALLS:
+            heapq.heappush(slowest, (elapsed, detail))
+        elif elapsed > slowest[0][0]:
+            heapq.heapreplace(slowest, (elapsed, detail))
+
+    def wrap(self, event_name, handler):
+        """Wrap an event handler to time its calls."""
+        if getattr(handler, "event_timer", None) is self:
+            return handler
+        if get_handler_module(handler) == __name__:
+            return handler
+        key = (self.get_extension_name(handler), event_name)
+
+        @functools.wraps(handler)
+        def timed_handler(app, *args):
+            # Calls in parallel worker processes are never reported back
+            if os.getpid() != self.pid:
+                return handler(app, *args)
+            self._nested_times.append(0.0)
+            start_time = time.perf_counter()
+            try:
+                return handler(app, *args)
+            finally:
+                elapsed = time.perf_counter() - start_time
+                nested_time = self._nested_times.pop()
+                self._nested_times[-1] += elapsed
+                self.record(
+                    key,
+                    elapsed - nested_time,
+                    describe_call(app, event_name, args),
+                )
+
+        timed_handler.event_timer = self
+        return timed_handler
+
+    def install(self):
+        """Wrap the connected handlers, and those connected from now on."""
+        events = self.app.events
+        for event_name, listeners in events.listeners.items():
+            listeners[:] = [
+                listener._replace(
+                    handler=self.wrap(event_name, listener.handler)
+                )
+                for listener in listeners
+            ]
+        connect = events.connect
+
+        @functools.wraps(connect)
+        def timed_connect(name, callback, priority):
+            return connect(name, self.wrap(name, callback), priority)
+
+        events.connect = timed_connect
+
+    def get_rows(self):
+        """Get the stats as a list of dicts, ranked by total time."""
+        return [
+            {
+                "extension": extension_name,
+                "event": event_name,
+                "calls": key_stats["calls"],
+                "total": key_stats["total"],
+                "slowest": [
+                    {"time": elapsed, "call": detail}
+                    for elapsed, detail in sorted(
+                        key_stats["slowest"], reverse=True
+                    )
+                ],
+            }
+            for (extension_name, event_name), key_stats in sorted(
+                self.stats.items(),
+                key=lambda item: item[1]["total"],
+                reverse=True,
+            )
+        ]
+
+
+def get_totals(rows, field):
+    """Sum the calls and times of stats rows by one of their fields."""
+    totals = {}
+    for row in rows:
+        total = totals.setdefault(row[field], {"calls": 0, "total": 0.0})
+        total["calls"] += row["calls"]
+        total["total"] += row["total"]
+    return dict(
+        sorted(totals.items(), key=lambda item: item[1]["total"], reverse=True)
+    )
+
+
+def format_ranking(rows, *, limit=RANKED_HANDLERS):
+    """Format the slowest handlers as a ranked list of their total times."""
+    return "\n".join(
+        f"{row['total'] * 1000:10.1f} ms  {row['extension']}: {row['event']}"
+        f" ({row['calls']} calls, slowest"
+        f" {row['slowest'][0]['time'] * 1000:.1f} ms)"
+        for row in rows[:limit]
+    )
+
+
+def write_report(app, exception):
+    """Print the ranked handler times and write them to a JSON file."""
+    timer = getattr(app, "event_timer", None)
+    if exception is not None or timer is None or not timer.stats:
+        return
+    rows = timer.get_rows()
+    report = {
+        "extensions": get_totals(rows, "extension"),
+        "events": get_totals(rows, "event"),
+        "handlers": rows,
+    }
+    logger.info("\nslowest event handlers:\n%s\n", format_ranking(rows))
+    if app.parallel > 1:
+        logger.info(
+            "event timing: handlers run in parallel worker processes are "
+            "not included; build with -j 1 for complete times"
+        )
+    if app.config.event_timing_report:
+        # In the build's own dir, so concurrent builds don't share a report
+        report_path = Path(app.doctreedir) / app.config.event_timing_report
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        logger.info("event timing report written to %s", report_path)
+    # Start over on the next build of a long-running app
+    timer.stats.clear()
+
+
+def setup(app):
+    """Install the event handler timer."""
+    app.add_config_value("event_timing_report", None, "", types=[str])
+    app.event_timer = EventTimer(app)
+    app.event_timer.install()
+    app.connect("build-finished", write_report, priority=1000)
+    return {
+        "version": "1.0",
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
@@ -0,0 +1,289 @@
+"""Cache highlighted code across builds and skip unchanged viewcode pages."""
+
+# Standard library imports
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from logging import WARNING
+from pathlib import Path
+
+# Third party imports
+import pygments
+from sphinx.util import logging
+
+# Local imports
+import sharedcache
+
+
+# Constants
+CACHE_DIRNAME = "highlight-cache"
+CACHE_VERSION = 1
+HIGHLIGHTING_LOGGER = "sphinx.highlighting"
+# Where parallel writing processes leave their stats for the main one
+STATS_DIRNAME = "highlight-cache-stats"
+VIEWCODE_HASHES_FILENAME = "viewcode-hashes.json"
+VIEWCODE_MODULE = "sphinx.ext.viewcode"
+
+logger = logging.getLogger(__name__)
+
+
+def hash_parts(*parts):
+    """Get a stable hex hash of the reprs of the given parts."""
+    parts_hash = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for part in parts:
+        parts_hash.update(b"\0")
+        parts_hash.update(repr(part).encode())
+    return parts_hash.hexdigest()
+
+
+def write_atomic(path, text):
+    """Write text to a temp file next to the path and move it into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    # pylint: disable-next = too-many-try-statements
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as temp_file:
+            temp_file.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+# --- Highlighting --- #
+
+
+class WarningCounter:
+    """Logging filter counting the warnings it lets through."""
+
+    def __init__(self):
+        self.count = 0
+
+    def filter(self, record):
+        """Count the record if it's a warning, and let it through."""
+        if record.levelno >= WARNING:
+            self.count += 1
+        return True
+
+
+def new_stats():
+    """Get empty cache stats for the current process."""
+    return {"pid": os.getpid(), "id": uuid.uuid4().hex, "hits": 0, "misses": 0}
+
+
+def count_lookup(app, outcome):
+    """Count a cache hit or miss, starting over in a new worker process."""
+    stats = app.env.highlight_cache_stats
+    if stats["pid"] != os.getpid():
+        stats.update(new_stats())
+    stats[outcome] += 1
+
+
+def get_style_name(highlighter):
+    """Get the name of the Pygments style used by a highlighter."""
+    style = highlighter.formatter_args.get("style")
+    return getattr(style, "__name__", style)
+
+
+def wrap_highlight_block(app, highlighter):
+    """Wrap a highlighter to reuse the output for previously seen code."""
+    highlight_block = highlighter.highlight_block
+    cache_dir = sharedcache.get_cache_dir(app, CACHE_DIRNAME)
+    style_name = get_style_name(highlighter)
+    warning_counter = app.builder.highlight_warning_counter = WarningCounter()
+    logging.getLogger(HIGHLIGHTING_LOGGER).logger.addFilter(warning_counter)
+
+    @functools.wraps(highlight_block)
+    def cached_highlight_block(source, lang, opts=None, force=False, **kwargs):
+        if not isinstance(source, str):
+            source = source.decode()
+        location = kwargs.pop("location", None)
+        cache_key = hash_parts(
+            source,
+            lang,
+            sorted((opts or {}).items()),
+            force,
+            sorted(kwargs.items()),
+            style_name,
+            highlighter.dest,
+            pygments.__version__,
+        )
+        cache_path = cache_dir / cache_key[:2] / cache_key[2:]
+        try:
+            highlighted = cache_path.read_text(encoding="utf-8")
+        except OSError:
+            pass
+        else:
+            count_lookup(app, "hits")
+            return highlighted
+
+        count_lookup(app, "misses")
+        warning_count = warning_counter.count
+        highlighted = highlight_block(
+            source, lang, opts, force, location=location, **kwargs
+        )
+        # Don't cache fallback output, so the warnings are shown again
+        if warning_counter.count == warning_count:
+            write_atomic(cache_path, highlighted)
+        return highlighted
+
+    highlighter.highlight_block = cached_highlight_block
+
+
+def init_highlight_cache(app):
+    """Set up the highlight cache on the builder's highlighters."""
+    if not app.config.highlight_cache:
+        return
+    highlighter = getattr(app.builder, "highlighter", None)
+    if highlighter is None:
+        return
+    app.builder.highlight_cache_pid = os.getpid()
+    app.env.highlight_cache_stats = new_stats()
+    shutil.rmtree(get_stats_dir(app), ignore_errors=True)
+    # Already wrapped if a build server runs this again for another build
+    if not hasattr(highlighter.highlight_block, "__wrapped__"):
+        wrap_highlight_block(app, highlighter)
+    if VIEWCODE_MODULE in app.extensions:
+        patch_viewcode(app)
+
+
+def get_stats_dir(app):
+    """Get the dir parallel writing processes save their stats to."""
+    return Path(app.doctreedir) / STATS_DIRNAME
+
+
+def merge_read_stats(app, env, docnames, other):
+    """Add the stats of a parallel reading process to the main ones."""
+    # pylint: disable = unused-argument
+    stats = getattr(env, "highlight_cache_stats", None)
+    other_stats = getattr(other, "highlight_cache_stats", None)
+    # Processes that didn't highlight anything still have the main stats
+    if not stats or not other_stats or other_stats["pid"] == stats["pid"]:
+        return
+    stats["hits"] += other_stats["hits"]
+    stats["misses"] += other_stats["misses"]
+
+
+def save_write_stats(app, pagename, templatename, context, doctree):
+    """Save the stats of a parallel writing process for the main one."""
+    # pylint: disable = unused-argument
+    stats = getattr(app.env, "highlight_cache_stats", None)
+    if not stats or stats["pid"] == app.builder.highlight_cache_pid:
+        return
+    # Worker PIDs can be reused, so name the file by a unique ID
+    write_atomic(get_stats_dir(app) / f"{stats['id']}.json", json.dumps(stats))
+
+
+def report_highlight_cache(app, exception):
+    """Log how much highlighting the cache saved."""
+    warning_counter = getattr(app.builder, "highlight_warning_counter", None)
+    if warning_counter is None:
+        return
+    logging.getLogger(HIGHLIGHTING_LOGGER).logger.removeFilter(warning_counter)
+    stats_dir = get_stats_dir(app)
+    all_stats = [app.env.highlight_cache_stats]
+    for stats_path in sorted(stats_dir.glob("*.json")):
+        all_stats.append(json.loads(stats_path.read_text(encoding="utf-8")))
+    shutil.rmtree(stats_dir, ignore_errors=True)
+    hits = sum(stats["hits"] for stats in all_stats)
+    misses = sum(stats["misses"] for stats in all_stats)
+    if exception is not None or not hits + misses:
+        return
+    logger.info("highlight cache: %s hits, %s misses", hits, misses)
+
+
+# --- Viewcode --- #
+
+
+def get_viewcode_hash(app, modname):
+    """Hash everything a viewcode module page is generated from."""
+    # pylint: disable = protected-access
+    entry = app.env._viewcode_modules.get(modname)
+    if not entry:
+        return None
+    code, tags, used, refname = entry
+    build_info = getattr(app.builder, "build_info", None)
+    return hash_parts(
+        code,
+        sorted(tags.items()),
+        sorted(used.items()),
+        refname,
+        app.config.highlight_language,
+        app.config.viewcode_line_numbers,
+        get_style_name(app.builder.highlighter),
+        getattr(build_info, "config_hash", None),
+        getattr(build_info, "tags_hash", None),
+    )
+
+
+def patch_viewcode(app):
+    """Make viewcode skip module pages whose inputs have not changed.
+
+    Viewcode compares the module file mtime with the page's, so every page
+    is regenerated after a fresh checkout of the Spyder submodule.
+    """
+    # pylint: disable = import-outside-toplevel
+    from sphinx.ext import viewcode
+
+    hashes_path = Path(app.doctreedir) / VIEWCODE_HASHES_FILENAME
+    try:
+        old_hashes = json.loads(hashes_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        old_hashes = {}
+    new_hashes = {}
+    app.builder.viewcode_page_hashes = (old_hashes, new_hashes)
+    original_should_generate = getattr(
+        viewcode.should_generate_module_page,
+        "__wrapped__",
+        viewcode.should_generate_module_page,
+    )
+
+    @functools.wraps(original_should_generate)
+    def should_generate_module_page(app, modname):
+        page_hash = get_viewcode_hash(app, modname)
+        basename = modname.replace(".", "/") + app.builder.out_suffix
+        page_path = Path(app.outdir) / viewcode.OUTPUT_DIRNAME / basename
+        if page_hash is None:
+            return original_should_generate(app, modname)
+        new_hashes[modname] = page_hash
+        return not (
+            page_path.is_file() and old_hashes.get(modname) == page_hash
+        )
+
+    viewcode.should_generate_module_page = should_generate_module_page
+
+
+def save_viewcode_hashes(app, exception):
+    """Save the hashes of the module pages that are now up to date."""
+    hashes = getattr(app.builder, "viewcode_page_hashes", None)
+    if exception is not None or hashes is None:
+        return
+    old_hashes, new_hashes = hashes
+    write_atomic(
+        Path(app.doctreedir) / VIEWCODE_HASHES_FILENAME,
+        json.dumps(new_hashes, indent=1, sort_keys=True),
+    )
+    # Keep the state current for the next build of a long-running app
+    old_hashes.clear()
+    old_hashes.update(new_hashes)
+    new_hashes.clear()
+
+
+def setup(app):
+    """Register the highlight cache with Sphinx."""
+    app.setup_extension("sharedcache")
+    app.add_config_value("highlight_cache", True, "", types=[bool])
+    app.connect("builder-inited", init_highlight_cache)
+    app.connect("env-merge-info", merge_read_stats)
+    app.connect("html-page-context", save_write_stats)
+    app.connect("build-finished", report_highlight_cache)
+    app.connect("build-finished", save_viewcode_hashes)
+    return {
+        "version": "1.0",
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
@@ -0,0 +1,169 @@
+"""Prefetch internal links and cache the site with a service worker."""
+
+# Standard library imports
+import hashlib
+import json
+import urllib.parse
+from pathlib import Path
+
+# Third party imports
+from sphinx.util import logging
+
+# Local imports
+import sharedcache
+
+
+# Constants
+SCRIPT_PATH = "js/instant-nav.js"
+SERVICE_WORKER_TEMPLATE = "service-worker.js"
+SERVICE_WORKER_PATH = "service-worker.js"
+PREFETCH_MODES = {"hover", "viewport"}
+SINGLE_PAGE_BUILDERS = {"singlehtml"}
+# Visited pages kept in the cache, beyond which the oldest are dropped
+DEFAULT_MAX_CACHED_PAGES = 200
+
+logger = logging.getLogger(__name__)
+
+
+def is_enabled(app):
+    """Check if instant navigation is enabled for the current builder."""
+    return (
+        app.config.instant_navigation
+        and app.builder.format == "html"
+        and app.builder.name not in SINGLE_PAGE_BUILDERS
+    )
+
+
+def get_asset_url(asset):
+    """Get the root-relative URL of a local CSS or JS asset, else None."""
+    filename = getattr(asset, "filename", asset)
+    if not filename or not isinstance(filename, str):
+        return None
+    parsed = urllib.parse.urlsplit(filename)
+    if parsed.scheme or parsed.netloc or filename.startswith("/"):
+        return None
+    return parsed.path
+
+
+def collect_shell_assets(app, pagename, templatename, context, doctree):
+    """Record the CSS and JS of the first page written, as the shell assets."""
+    # pylint: disable = unused-argument
+    if not is_enabled(app) or app.builder.instant_nav_assets is not None:
+        return
+    # The first page is written in the main process, even in parallel builds
+    assets = [
+        get_asset_url(asset)
+        for asset in (
+            *context.get("css_files", []),
+            *context.get("script_files", []),
+        )
+    ]
+    for config_path in (app.config.html_logo, app.config.html_favicon):
+        if config_path and not urllib.parse.urlsplit(config_path).scheme:
+            assets.append(f"_static/{Path(config_path).name}")
+    app.builder.instant_nav_assets = [
+        asset for asset in dict.fromkeys(assets) if asset
+    ]
+
+
+def get_deployment_version(app, precache_urls):
+    """Hash the written pages and shell assets, to version the caches by."""
+    content_hash = hashlib.sha256()
+    outdir = Path(app.outdir)
+    page_paths = [
+        Path(app.builder.get_outfilename(docname))
+        for docname in sorted(app.env.found_docs)
+    ]
+    for path in (*page_paths, *(outdir / url for url in precache_urls)):
+        if path.is_file():
+            content_hash.update(path.relative_to(outdir).as_posix().encode())
+            content_hash.update(hashlib.sha256(path.read_bytes()).digest())
+    return content_hash.hexdigest()[:16]
+
+
+def write_service_worker(app, exception):
+    """Write the service worker, precaching the root page and shell assets."""
+    if exception is not None or not is_enabled(app):
+        return
+    if not app.config.instant_navigation_offline:
+        return
+    if app.builder.instant_nav_assets is None:
+        # Nothing was written, so the current service worker is still valid
+        if Path(app.outdir, SERVICE_WORKER_PATH).is_file():
+            return
+        app.builder.instant_nav_assets = []
+    precache_urls = [
+        app.builder.get_target_uri(app.config.root_doc),
+        *app.builder.instant_nav_assets,
+    ]
+    version = get_deployment_version(app, precache_urls)
+    script = app.builder.templates.render(
+        SERVICE_WORKER_TEMPLATE,
+        {
+            "version": version,
+            # Kept on one line for pruneassets.py to rewrite
+            "precache_urls": json.dumps(precache_urls),
+            "max_cached_pages": app.config.instant_navigation_max_pages,
+        },
+    )
+    sharedcache.write_atomic(
+        Path(app.outdir, SERVICE_WORKER_PATH), script.encode()
+    )
+    logger.info(
+        "Wrote service worker version %s, precaching %d files",
+        version,
+        len(precache_urls),
+    )
+
+
+def init_instant_nav(app):
+    """Add the prefetching and service worker registration script."""
+    app.builder.instant_nav_assets = None
+    if not is_enabled(app):
+        return
+    prefetch = app.config.instant_navigation_prefetch
+    if prefetch and prefetch not in PREFETCH_MODES:
+        logger.warning(
+            "Unknown instant_navigation_prefetch %r; use one of %s",
+            prefetch,
+            ", ".join(sorted(PREFETCH_MODES)),
+        )
+        prefetch = None
+    app.add_js_file(
+        SCRIPT_PATH,
+        loading_method="defer",
+        **{
+            "data-prefetch": prefetch or "",
+            "data-service-worker": (
+                SERVICE_WORKER_PATH
+                if app.config.instant_navigation_offline
+                else ""
+            ),
+        },
+    )
+
+
+def setup(app):
+    """Register the instant navigation extension with Sphinx."""
+    app.setup_extension("sharedcache")
+    app.add_config_value("instant_navigation", False, "html", types=[bool])
+    app.add_config_value(
+        "instant_navigation_prefetch", "hover", "html", types=[str, type(None)]
+    )
+    app.add_config_value(
+        "instant_navigation_offline", True, "html", types=[bool]
+    )
+    app.add_config_value(
+        "instant_navigation_max_pages",
+        DEFAULT_MAX_CACHED_PAGES,
+        "html",
+        types=[int],
+    )
+    app.connect("builder-inited", init_instant_nav)
+    app.connect("html-page-context", collect_shell_assets)
+    app.connect("build-finished", write_service_worker)
+    return {
+        "version": "1.0",
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
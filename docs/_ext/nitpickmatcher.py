@@ -0,0 +1,154 @@
+"""Match nitpick ignores with compiled patterns and report unresolved refs."""
+
+# Standard library imports
+import collections
+import json
+import re
+from pathlib import Path
+
+# Third party imports
+from sphinx.util import logging
+
+
+# Constants
+PATTERN_GROUP_PREFIX = "nitpick_"
+
+logger = logging.getLogger(__name__)
+
+
+class NitpickMatcher:
+    """Match reference targets against compiled nitpick_ignore_regex rules.
+
+    All target patterns that apply to a given reference type are combined
+    into one regex, compiled the first time that type is seen, and the
+    decision for each type and target is memoized.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = sorted(set(patterns))
+        self.pattern_hits = collections.Counter()
+        self._compiled_types = [
+            re.compile(type_pattern) for type_pattern, __ in self.patterns
+        ]
+        self._target_regexes = {}
+        self._decisions = {}
+
+    def _get_target_regex(self, ref_type):
+        """Get the combined regex of target patterns for a reference type."""
+        if ref_type in self._target_regexes:
+            return self._target_regexes[ref_type]
+        alternatives = [
+            f"(?P<{PATTERN_GROUP_PREFIX}{idx}>{target_pattern})"
+            for idx, ((__, target_pattern), type_regex) in enumerate(
+                zip(self.patterns, self._compiled_types)
+            )
+            if type_regex.fullmatch(ref_type)
+        ]
+        target_regex = (
+            re.compile("|".join(alternatives)) if alternatives else None
+        )
+        self._target_regexes[ref_type] = target_regex
+        return target_regex
+
+    def match(self, ref_type, target):
+        """Return the (type, target) pattern matching a reference, or None."""
+        if (ref_type, target) in self._decisions:
+            return self._decisions[ref_type, target]
+        target_regex = self._get_target_regex(ref_type)
+        match = target_regex and target_regex.fullmatch(target)
+        matched = None
+        if match:
+            pattern_idx = int(match.lastgroup[len(PATTERN_GROUP_PREFIX) :])
+            matched = self.patterns[pattern_idx]
+        self._decisions[ref_type, target] = matched
+        return matched
+
+
+def init_matcher(app, config):
+    """Take over nitpick_ignore_regex with a compiled matcher."""
+    app.nitpick_matcher = NitpickMatcher(config.nitpick_ignore_regex)
+    app.nitpick_unresolved = collections.Counter()
+    # Sphinx would otherwise re-run every pattern on each missing reference
+    config.nitpick_ignore_regex = []
+
+
+def check_missing_reference(app, domain, node):
+    """Suppress the warning for ignored references, and count all of them."""
+    ref_type = node["reftype"]
+    target = node["reftarget"]
+    full_type = f"{domain.name}:{ref_type}" if domain else ref_type
+
+    matched = app.nitpick_matcher.match(full_type, target)
+    # For "std" types, also try without domain name, like Sphinx does
+    if matched is None and (not domain or domain.name == "std"):
+        matched = app.nitpick_matcher.match(ref_type, target)
+
+    app.nitpick_unresolved[full_type, target, matched] += 1
+    if matched is None:
+        return None
+    app.nitpick_matcher.pattern_hits[matched] += 1
+    return True
+
+
+def write_report(app, exception):
+    """Write the unresolved references, ranked by count, to a JSON file."""
+    if exception is not None or not app.config.nitpick_report:
+        return
+    unresolved = getattr(app, "nitpick_unresolved", None)
+    if not unresolved:
+        return
+
+    matcher = app.nitpick_matcher
+    report = {
+        "unresolved": [
+            {
+                "type": ref_type,
+                "target": target,
+                "count": count,
+                "ignored_by": list(matched) if matched else None,
+            }
+            for (ref_type, target, matched), count in unresolved.most_common()
+        ],
+        "patterns": [
+            {
+                "type": pattern[0],
+                "target": pattern[1],
+                "hits": matcher.pattern_hits[pattern],
+            }
+            for pattern in sorted(
+                matcher.patterns,
+                key=lambda pattern: matcher.pattern_hits[pattern],
+                reverse=True,
+            )
+        ],
+    }
+    # In the build's own dir, so concurrent builds don't share a report
+    report_path = Path(app.doctreedir) / app.config.nitpick_report
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    ignored_count = sum(
+        count for (__, __, matched), count in unresolved.items() if matched
+    )
+    logger.info(
+        "nitpick report: %s unresolved references (%s ignored) in %s",
+        sum(unresolved.values()),
+        ignored_count,
+        report_path,
+    )
+    # Start over on the next build of a long-running app
+    unresolved.clear()
+    matcher.pattern_hits.clear()
+
+
+def setup(app):
+    """Register the nitpick matcher with Sphinx."""
+    app.add_config_value("nitpick_report", None, "", types=[str])
+    app.connect("config-inited", init_matcher)
+    app.connect("warn-missing-reference", check_missing_reference)
+    app.connect("build-finished", write_report)
+    return {
+        "version": "1.0",
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
@@ -0,0 +1,357 @@
+"""Generate autosummary stubs in parallel, isolated worker processes.
+
+Each module is imported and introspected in its own forked worker, which
+sends the rendered stub text back to the main process to write out, so a
+module that crashes or hangs on import only fails its own stub. The main
+process still imports the parent packages of the modules it looks up, and
+autodoc imports every module there when reading serially (with ``-j 1``, or
+on the serial fallback); with ``-j``, the parallel readers import them.
+"""
+
+# Standard library imports
+import functools
+import importlib.util
+import inspect
+import multiprocessing
+import multiprocessing.connection
+import os
+import pkgutil
+import time
+from pathlib import Path
+
+# Third party imports
+import sphinx
+from sphinx.util import logging
+from sphinx.util.osutil import ensuredir
+
+
+# Constants
+POLL_INTERVAL = 1
+# Only passed to generate_autosummary_content since Sphinx 8
+RENDER_KEYWORDS = frozenset({"config", "events", "registry"})
+
+logger = logging.getLogger(__name__)
+
+# Modules whose stub could not be generated, so parents don't list them;
+# reset for each build on builder-inited
+failed_modules = set()
+
+
+# --- Worker pool --- #
+
+
+def _run_task(connection, task):
+    """Run a task in a worker process and send back its result."""
+    try:
+        result = ("ok", task())
+    except BaseException as error:  # pylint: disable = broad-exception-caught
+        result = ("error", f"{type(error).__name__}: {error}")
+    try:
+        connection.send(result)
+    finally:
+        connection.close()
+        # Skip the cleanup inherited from the parent process
+        os._exit(0)  # pylint: disable = protected-access
+
+
+def run_isolated(tasks, *, dependencies=None, workers, timeout, on_result):
+    """Run tasks in forked worker processes, at most ``workers`` at a time.
+
+    A task is only started once the tasks it depends on have finished, and
+    ``on_result(key, status, value)`` is called in the main process for each
+    task as it finishes, with status "ok" or "error".
+    """
+    context = multiprocessing.get_context("fork")
+    dependencies = dependencies or {}
+    pending = dict(tasks)
+    finished = set()
+    running = {}
+
+    while pending or running:
+        for key in sorted(pending, key=str):
+            if len(running) >= workers:
+                break
+            if (dependencies.get(key, set()) & tasks.keys()) - finished:
+                continue
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_run_task, args=(sender, pending.pop(key)), daemon=True
+            )
+            process.start()
+            sender.close()
+            running[key] = (process, receiver, time.monotonic())
+
+        multiprocessing.connection.wait(
+            [receiver for __, receiver, __ in running.values()]
+            + [process.sentinel for process, __, __ in running.values()],
+            timeout=POLL_INTERVAL,
+        )
+        for key, (process, receiver, start_time) in list(running.items()):
+            if receiver.poll():
+                try:
+                    status, value = receiver.recv()
+                except EOFError:
+                    status, value = "error", "worker exited without a result"
+            elif not process.is_alive():
+                status, value = (
+                    "error",
+                    f"worker exited with code {process.exitcode}",
+                )
+            elif time.monotonic() - start_time > timeout:
+                process.kill()
+                status, value = "error", f"timed out after {timeout} s"
+            else:
+                continue
+            process.join()
+            receiver.close()
+            del running[key]
+            finished.add(key)
+            on_result(key, status, value)
+
+
+# --- Stub generation --- #
+
+
+def discover_modules(root_name, is_ignored):
+    """Find a package's submodules on disk, without importing them."""
+    try:
+        spec = importlib.util.find_spec(root_name)
+    except (ImportError, ValueError):
+        spec = None
+    modules = {root_name: set()}
+    if spec is None or not spec.submodule_search_locations:
+        return modules
+    for module_info in pkgutil.iter_modules(
+        spec.submodule_search_locations, prefix=f"{root_name}."
+    ):
+        if is_ignored(module_info.name):
+            continue
+        modules[root_name].add(module_info.name)
+        if module_info.ispkg:
+            modules.update(discover_modules(module_info.name, is_ignored))
+        else:
+            modules[module_info.name] = set()
+    return modules
+
+
+def render_stub(app, entry, imported_members):
+    """Import an object and render its autosummary stub."""
+    # pylint: disable = import-outside-toplevel
+    from sphinx.ext.autosummary import import_by_name
+    from sphinx.ext.autosummary.generate import (
+        AutosummaryRenderer,
+        generate_autosummary_content,
+    )
+
+    name, obj, parent, modname = import_by_name(entry.name)
+    content = generate_autosummary_content(
+        name,
+        obj,
+        parent,
+        AutosummaryRenderer(app),
+        entry.template,
+        imported_members,
+        entry.recursive,
+        {**app.config.autosummary_context},
+        modname,
+        name.replace(f"{modname}.", ""),
+        config=app.config,
+        events=app.events,
+        registry=app.registry,
+    )
+    return name, content
+
+
+def get_ignore_matcher(app):
+    """Get the module filter of the autosummaryprune extension, if used."""
+    if "autosummaryprune" not in app.extensions:
+        return lambda modname: False
+    # pylint: disable-next = import-outside-toplevel
+    from autosummaryprune import get_module_filter
+
+    return get_module_filter(app.config)
+
+
+def generate_stubs_parallel(
+    original,
+    sources,
+    output_dir=None,
+    suffix=".rst",
+    base_path=None,
+    imported_members=False,
+    app=None,
+    overwrite=True,
+    encoding="utf-8",
+):
+    """Generate autosummary stubs like Sphinx, but in worker processes."""
+    # pylint: disable = import-outside-toplevel, too-many-locals
+    # pylint: disable = too-many-positional-arguments
+    from sphinx.ext.autosummary.generate import (
+        find_autosummary_in_files,
+        find_autosummary_in_lines,
+    )
+
+    workers = app.config.autosummary_parallel_workers or app.parallel
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return original(
+            sources,
+            output_dir=output_dir,
+            suffix=suffix,
+            base_path=base_path,
+            imported_members=imported_members,
+            app=app,
+            overwrite=overwrite,
+            encoding=encoding,
+        )
+
+    failed_modules.clear()
+    source_paths = [
+        Path(base_path) / source if base_path else Path(source)
+        for source in sources
+    ]
+    entries = sorted(set(find_autosummary_in_files(source_paths)), key=str)
+    results = {}
+
+    def run(tasks, dependencies=None):
+        def on_result(key, status, value):
+            results[key] = (status, value)
+            if status != "ok":
+                failed_modules.add(key.name)
+                logger.warning(
+                    "[autosummary] failed to import %s: %s", key.name, value
+                )
+
+        run_isolated(
+            tasks,
+            dependencies=dependencies,
+            workers=workers,
+            timeout=app.config.autosummary_import_timeout,
+            on_result=on_result,
+        )
+
+    def make_task(entry):
+        return functools.partial(render_stub, app, entry, imported_members)
+
+    # Render the recursive module trees up front, with each package after
+    # its submodules, so packages skip the submodules that failed
+    is_ignored = get_ignore_matcher(app)
+    tasks = {}
+    dependencies = {}
+    for entry in entries:
+        if entry.path is None or not entry.recursive:
+            continue
+        for modname, submodules in discover_modules(
+            entry.name, is_ignored
+        ).items():
+            key = entry._replace(name=modname, path=None)
+            tasks[key] = make_task(key)
+            dependencies[key] = {
+                entry._replace(name=submodule, path=None)
+                for submodule in submodules
+            }
+    logger.info(
+        "[autosummary] rendering %s stubs in %s worker processes",
+        len(tasks),
+        workers,
+    )
+    run(tasks, dependencies)
+
+    # Write the stubs, following the toctrees down from the sources
+    filename_map = app.config.autosummary_filename_map
+    all_files = []
+    seen = set()
+    while entries:
+        entry = entries.pop(0)
+        if entry.path is None or entry in seen:
+            continue
+        seen.add(entry)
+        key = entry._replace(path=None)
+        if key not in results:
+            run({key: make_task(key)})
+        status, value = results[key]
+        if status != "ok":
+            continue
+
+        name, content = value
+        path = Path(output_dir or Path(entry.path).resolve())
+        ensuredir(path)
+        file_path = path / f"{filename_map.get(name, name)}{suffix}"
+        all_files.append(file_path)
+        old_content = (
+            file_path.read_text(encoding=encoding)
+            if file_path.is_file()
+            else None
+        )
+        if old_content is None or (overwrite and content != old_content):
+            file_path.write_text(content, encoding=encoding)
+        entries += find_autosummary_in_lines(
+            content.splitlines(), filename=file_path
+        )
+    return all_files
+
+
+def wrap_get_modules(get_modules):
+    """Wrap autosummary's submodule finder to skip failed modules."""
+
+    @functools.wraps(get_modules)
+    def get_modules_skipping_failed(obj, *, skip, name, **kwargs):
+        failed = [
+            modname.rpartition(".")[2]
+            for modname in failed_modules
+            if modname.rpartition(".")[0] == name
+        ]
+        return get_modules(obj, skip=[*skip, *failed], name=name, **kwargs)
+
+    return get_modules_skipping_failed
+
+
+def get_unsupported_reason(generate):
+    """Get why this Sphinx's autosummary can't run in parallel, if it can't."""
+    if not hasattr(generate, "_get_modules"):
+        return "autosummary has no _get_modules to skip failed modules with"
+    parameters = inspect.signature(
+        generate.generate_autosummary_content
+    ).parameters
+    if not RENDER_KEYWORDS <= parameters.keys():
+        return "generate_autosummary_content has no config, events or registry"
+    return None
+
+
+def install_parallel_generation(app):
+    """Replace autosummary's stub generation with the parallel one."""
+    # pylint: disable = import-outside-toplevel, protected-access
+    # pylint: disable = unused-argument
+    from sphinx.ext.autosummary import generate
+
+    failed_modules.clear()
+    unsupported_reason = get_unsupported_reason(generate)
+    if unsupported_reason:
+        logger.info(
+            "[autosummary] generating stubs serially, as %s in Sphinx %s",
+            unsupported_reason,
+            sphinx.__version__,
+        )
+        return
+    generate_docs = generate.generate_autosummary_docs
+    if getattr(generate_docs, "func", None) is generate_stubs_parallel:
+        return
+    generate._get_modules = wrap_get_modules(generate._get_modules)
+    generate.generate_autosummary_docs = functools.partial(
+        generate_stubs_parallel, generate_docs
+    )
+
+
+def setup(app):
+    """Register parallel autosummary generation with Sphinx."""
+    app.setup_extension("sphinx.ext.autosummary")
+    app.add_config_value(
+        "autosummary_parallel_workers", None, "", types=[int, type(None)]
+    )
+    app.add_config_value("autosummary_import_timeout", 300, "", types=[int])
+    # Autosummary generates the stubs on builder-inited, at priority 500
+    app.connect("builder-inited", install_parallel_generation, priority=400)
+    return {
+        "version": "1.0",
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
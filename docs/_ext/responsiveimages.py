@@ -0,0 +1,295 @@
+"""Serve optimized, responsive and lazy-loaded versions of the doc images."""
+
+# Standard library imports
+import functools
+import hashlib
+import os
+import posixpath
+import shutil
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Third party imports
+from docutils import nodes
+from sphinx.util import logging
+from sphinx.util.images import get_image_size
+
+try:
+    from PIL import Image, ImageSequence
+except ImportError:
+    Image = ImageSequence = None
+
+# Local imports
+import sharedcache
+
+
+# Constants
+CACHE_DIRNAME = "responsive-images"
+CACHE_VERSION = 1
+OPTIMIZED_SUFFIXES = {".png", ".gif", ".jpg", ".jpeg"}
+WEBP_METHOD = 4
+
+logger = logging.getLogger(__name__)
+
+
+# --- Variants --- #
+
+
+def get_variant_widths(image_width, widths):
+    """Get the widths to generate for an image of the given width."""
+    return [width for width in sorted(widths) if width < image_width] + [
+        image_width
+    ]
+
+
+def get_variant_name(image_name, width):
+    """Get the output filename of a variant of an image."""
+    return f"{image_name}.{width}w.webp"
+
+
+def get_cache_key(source_path, width, quality):
+    """Get the cache key of a variant, from the source hash and settings."""
+    key_hash = hashlib.sha256(
+        f"v{CACHE_VERSION}\0{width}\0{quality}\0".encode()
+    )
+    key_hash.update(Path(source_path).read_bytes())
+    return key_hash.hexdigest()
+
+
+def convert_image(source_path, target_path, *, width, quality):
+    """Resize an image and save it as (animated, if needed) WebP."""
+    with Image.open(source_path) as image:
+        size = (width, round(image.height * width / image.width))
+        save_params = {"method": WEBP_METHOD}
+        if getattr(image, "is_animated", False):
+            # Screen recordings compress best losslessly, as GIFs do
+            frames = [
+                frame.convert("RGBA").resize(size, Image.Resampling.LANCZOS)
+                for frame in ImageSequence.Iterator(image)
+            ]
+            output = frames[0]
+            save_params.update(
+                lossless=True,
+                minimize_size=True,
+                save_all=True,
+                append_images=frames[1:],
+                duration=image.info.get("duration", 100),
+                loop=image.info.get("loop", 0),
+            )
+        else:
+            output = image.convert(
+                "RGBA" if image.mode in {"P", "LA", "RGBA"} else "RGB"
+            )
+            if output.size != size:
+                output = output.resize(size, Image.Resampling.LANCZOS)
+            save_params["quality"] = quality
+
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique per process, as the cache may be shared between builds
+        temp_path = target_path.with_name(
+            f".{target_path.name}.{os.getpid()}.tmp"
+        )
+        output.save(temp_path, "WEBP", **save_params)
+        temp_path.replace(target_path)
+
+
+def get_cached_variant(cache_dir, source_path, width, quality):
+    """Get the cached path of a variant, converting the image if needed."""
+    cache_key = get_cache_key(source_path, width, quality)
+    cache_path = Path(cache_dir) / cache_key[:2] / cache_key[2:]
+    if not cache_path.is_file():
+        convert_image(source_path, cache_path, width=width, quality=quality)
+    return cache_path
+
+
+@functools.lru_cache(maxsize=None)
+def read_image_variants(source_path, mtime_ns, cache_dir, widths, quality):
+    """Get the size of an image and the widths of its useful variants."""
+    # pylint: disable = unused-argument
+    if source_path.suffix.lower() not in OPTIMIZED_SUFFIXES:
+        return None, ()
+    size = get_image_size(source_path)
+    if size is None or Image is None:
+        return size, ()
+
+    # Only serve WebP if it actually beats the (often well-compressed) source
+    full_variant = get_cached_variant(cache_dir, source_path, size[0], quality)
+    if full_variant.stat().st_size >= source_path.stat().st_size:
+        return size, ()
+
+    # Resampled animation frames lose the inter-frame redundancy (and end up
+    # larger than the full-size animation), so only offer those at full size
+    with Image.open(source_path) as image:
+        if getattr(image, "is_animated", False):
+            return size, (size[0],)
+    return size, tuple(get_variant_widths(size[0], widths))
+
+
+def get_image_variants(app, image_uri):
+    """Get the intrinsic size and WebP variant widths of a source image."""
+    source_path = Path(app.srcdir) / image_uri
+    try:
+        mtime_ns = source_path.stat().st_mtime_ns
+    except OSError:
+        return None, ()
+    return read_image_variants(
+        source_path,
+        mtime_ns,
+        get_cache_dir(app),
+        tuple(app.config.responsive_image_widths),
+        app.config.responsive_image_quality,
+    )
+
+
+def get_cache_dir(app):
+    """Get the directory that converted images are cached in."""
+    return sharedcache.get_cache_dir(app, CACHE_DIRNAME)
+
+
+# --- HTML output --- #
+
+
+def visit_image_html(self, node):
+    """Render an image lazily, with dimensions and WebP sources."""
+    app = self.builder.app
+    image_uri = node["uri"]
+    if (
+        not app.config.responsive_images
+        or image_uri not in self.builder.images
+    ):
+        type(self).visit_image(self, node)
+        return
+
+    size, widths = get_image_variants(app, image_uri)
+    node.setdefault("loading", "lazy")
+    body_length = len(self.body)
+    type(self).visit_image(self, node)
+    if size is None:
+        return
+
+    element_idx = next(
+        (
+            idx
+            for idx in range(len(self.body) - 1, body_length - 1, -1)
+            if self.body[idx].startswith("<img ")
+        ),
+        None,
+    )
+    if element_idx is None:
+        return
+    element = self.body[element_idx]
+
+    # Explicit dimensions let the browser reserve space before loading
+    dimensions = ' decoding="async"'
+    if 'style="' not in element:
+        dimensions += f' width="{size[0]}" height="{size[1]}"'
+    element = element.replace("<img ", f"<img{dimensions} ", 1)
+
+    if widths:
+        image_name = self.builder.images[image_uri]
+        srcset = ", ".join(
+            posixpath.join(
+                self.builder.imgpath,
+                urllib.parse.quote(get_variant_name(image_name, width)),
+            )
+            + f" {width}w"
+            for width in widths
+        )
+        sizes = f"(max-width: {size[0]}px) 100vw, {size[0]}px"
+        suffix = "\n" if element.endswith("\n") else ""
+        element = (
+            "<picture>"
+            f'<source type="image/webp" srcset="{srcset}" sizes="{sizes}" />'
+            f"{element.rstrip()}</picture>{suffix}"
+        )
+    self.body[element_idx] = element
+
+
+def depart_image_html(self, node):
+    """Finish rendering an image."""
+    type(self).depart_image(self, node)
+
+
+def add_image_styles(app):
+    """Add the styles needed to lay out the picture elements."""
+    if app.config.responsive_images:
+        app.add_css_file("css/responsive-images.css")
+
+
+# --- Processing --- #
+
+
+def prepare_variants(app, env):
+    """Convert new or changed images in parallel, before they are written."""
+    if Image is None or not app.config.responsive_images:
+        return
+    with ThreadPoolExecutor() as executor:
+        list(
+            executor.map(
+                lambda image_uri: get_image_variants(app, image_uri),
+                env.images,
+            )
+        )
+
+
+def build_variant(app, image_uri, image_name, width):
+    """Copy a variant to the output, converting it if not yet cached."""
+    cache_path = get_cached_variant(
+        get_cache_dir(app),
+        Path(app.srcdir) / image_uri,
+        width,
+        app.config.responsive_image_quality,
+    )
+    shutil.copyfile(
+        cache_path,
+        Path(app.outdir)
+        / app.builder.imagedir
+        / get_variant_name(image_name, width),
+    )
+
+
+def build_variants(app, exception):
+    """Write the WebP variants of all images used in the output."""
+    if (
+        exception is not None
+        or Image is None
+        or not app.config.responsive_images
+        or app.builder.format != "html"
+    ):
+        return
+
+    jobs = []
+    for image_uri, image_name in app.builder.images.items():
+        widths = get_image_variants(app, image_uri)[1]
+        jobs += [(image_uri, image_name, width) for width in widths]
+    if not jobs:
+        return
+
+    with ThreadPoolExecutor() as executor:
+        list(executor.map(lambda job: build_variant(app, *job), jobs))
+    logger.info("optimized images: %s WebP variants", len(jobs))
+
+
+def setup(app):
+    """Register the responsive image extension with Sphinx."""
+    app.setup_extension("sharedcache")
+    app.add_config_value("responsive_images", True, "html", types=[bool])
+    app.add_config_value(
+        "responsive_image_widths", [480, 960, 1440], "html", types=[list]
+    )
+    app.add_config_value("responsive_image_quality", 80, "html", types=[int])
+    app.connect("builder-inited", add_image_styles)
+    app.connect("env-updated", prepare_variants)
+    app.connect("build-finished", build_variants)
+
+    app.add_node(
+        nodes.image,
+        override=True,
+        html=(visit_image_html, depart_image_html),
+    )
+    return {
+        "version": "1.0",
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
@@ -0,0 +1,126 @@
+"""Keep build caches in a dir that can be shared between builds."""
+
+# Standard library imports
+import hashlib
+import os
+import posixpath
+import tempfile
+import time
+from pathlib import Path
+
+# Third party imports
+from sphinx.util import logging, requests
+
+
+# Constants
+INVENTORY_DIRNAME = "intersphinx-inventories"
+INVENTORY_FILENAME = "objects.inv"
+
+logger = logging.getLogger(__name__)
+
+
+def get_cache_dir(app, name):
+    """Get a named cache dir, in shared_cache_dir if set, else doctreedir.
+
+    The caches are content-addressed and written atomically, so concurrent
+    builds (e.g. of other versions of the docs) can share them.
+    """
+    base_dir = app.config.shared_cache_dir or app.doctreedir
+    return Path(app.confdir, base_dir) / name
+
+
+def write_atomic(path, data):
+    """Write bytes to a temp file next to the path and move it into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    # pylint: disable-next = too-many-try-statements
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+def is_fresh(path, max_age_days):
+    """Check if a cached file exists and is newer than the given age."""
+    if not path.is_file():
+        return False
+    if max_age_days < 0:
+        return True
+    return time.time() - path.stat().st_mtime < max_age_days * 86400
+
+
+def fetch_inventory(inventory_url, timeout):
+    """Download an inventory, or get None if it can't be fetched."""
+    try:
+        response = requests.get(inventory_url, timeout=timeout)
+    except OSError as error:
+        logger.verbose(
+            "Could not fetch inventory %s: %s", inventory_url, error
+        )
+        return None
+    if not response.ok:
+        logger.verbose(
+            "Could not fetch inventory %s: HTTP %s",
+            inventory_url,
+            response.status_code,
+        )
+        return None
+    return response.content
+
+
+def use_cached_inventories(app):
+    """Fetch remote intersphinx inventories into the cache dir, and use them.
+
+    Inventories with an explicit location are left as they are. If an
+    inventory can't be fetched, a stale cached copy is used if there is one,
+    or else intersphinx falls back to fetching it itself as usual.
+    """
+    if "sphinx.ext.intersphinx" not in app.extensions:
+        return
+    config = app.config
+    cache_dir = get_cache_dir(app, INVENTORY_DIRNAME)
+    mapping = app.shared_intersphinx_mapping = dict(config.intersphinx_mapping)
+    for key, (name, (uri, locations)) in mapping.items():
+        if locations != (None,):
+            continue
+        inventory_url = posixpath.join(uri, INVENTORY_FILENAME)
+        url_hash = hashlib.sha256(inventory_url.encode()).hexdigest()
+        inventory_path = cache_dir / f"{url_hash[:16]}.inv"
+        if not is_fresh(inventory_path, config.intersphinx_cache_limit):
+            inventory = fetch_inventory(
+                inventory_url, config.intersphinx_timeout
+            )
+            if inventory is not None:
+                write_atomic(inventory_path, inventory)
+        config.intersphinx_mapping[key] = (
+            name,
+            (uri, (str(inventory_path), None)),
+        )
+
+
+def restore_intersphinx_mapping(app):
+    """Put back the configured mapping once intersphinx has loaded it.
+
+    The cache dir is machine and build specific, so it's kept out of the
+    config saved with the environment, which builds can then share.
+    """
+    mapping = getattr(app, "shared_intersphinx_mapping", None)
+    if mapping is not None:
+        app.config.intersphinx_mapping.clear()
+        app.config.intersphinx_mapping.update(mapping)
+
+
+def setup(app):
+    """Register the shared cache dir with Sphinx."""
+    app.add_config_value("shared_cache_dir", None, "", types=[str])
+    # Around intersphinx loading the mapping, at priority 500
+    app.connect("builder-inited", use_cached_inventories, priority=400)
+    app.connect("builder-inited", restore_intersphinx_mapping, priority=600)
+    return {
+        "version": "1.0",
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
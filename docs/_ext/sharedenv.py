@@ -0,0 +1,188 @@
+"""Reuse a build environment read by another variant of the docs build.
+
+The plain and autodoc variants of the docs only differ in a few config
+values that exclude or add the API reference pages. When the environment
+pickled by one variant is seeded into the doctree dir of the other, Sphinx
+would normally see the config change and re-read every page; this extension
+instead keeps the already-read shared pages and only reads the new ones.
+
+Only the differences listed in ``sharedenv_allowed_changes`` are bypassed,
+and only for the exact environment the other variant pickled. Anything else
+is left to Sphinx, which reads every page again as for any config change.
+Extensions may be listed under ``extensions`` to load them in one variant
+only; their config values may then be missing in the other.
+"""
+
+# Standard library imports
+import ast
+import hashlib
+import json
+
+# Third party imports
+from sphinx.application import ENV_PICKLE_FILENAME
+from sphinx.environment import (
+    CONFIG_CHANGED,
+    CONFIG_EXTENSIONS_CHANGED,
+    CONFIG_OK,
+)
+from sphinx.util import logging
+
+
+# Constants
+MARKER_FILENAME = "shared-env.json"
+
+logger = logging.getLogger(__name__)
+
+
+def get_env_pickle_hash(doctree_dir):
+    """Get the hash of the pickled environment in a doctree dir."""
+    try:
+        env_data = (doctree_dir / ENV_PICKLE_FILENAME).read_bytes()
+    except OSError:
+        return None
+    return hashlib.sha256(env_data).hexdigest()
+
+
+def get_env_config(config):
+    """Get a serializable snapshot of the config values affecting the env."""
+    env_config = {}
+    for item in config.filter("env"):
+        value = getattr(config, item.name)
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value, key=repr)
+        env_config[item.name] = repr(value)
+    env_config["extensions"] = repr(list(config.extensions))
+    return env_config
+
+
+def is_allowed_change(old_value, new_value, allowed_values):
+    """Check if a config value only changed by the allowed values.
+
+    A value missing on one side, as the extension adding it isn't loaded,
+    is allowed if the other side's is.
+    """
+    try:
+        old_value, new_value = (
+            None if value is None else ast.literal_eval(value)
+            for value in (old_value, new_value)
+        )
+    except (ValueError, SyntaxError):
+        return False
+    if old_value is None or new_value is None:
+        return (old_value if new_value is None else new_value) in (
+            allowed_values
+        )
+    # List values may differ by allowed items, with the rest the same
+    if isinstance(old_value, list) and isinstance(new_value, list):
+        return [item for item in old_value if item not in allowed_values] == [
+            item for item in new_value if item not in allowed_values
+        ]
+    return old_value in allowed_values and new_value in allowed_values
+
+
+def get_disallowed_changes(old_env_config, new_env_config, allowed_changes):
+    """Get the env config values changed by more than the allowed values."""
+    disallowed_keys = set()
+    for key in old_env_config.keys() | new_env_config.keys():
+        old_value = old_env_config.get(key)
+        new_value = new_env_config.get(key)
+        if old_value == new_value:
+            continue
+        if not is_allowed_change(
+            old_value, new_value, allowed_changes.get(key, [])
+        ):
+            disallowed_keys.add(key)
+    return disallowed_keys
+
+
+def reuse_shared_env(app):
+    """Keep pages read by the other variant if only page selection changed."""
+    env = app.env
+    if getattr(env, "config_status", None) not in (
+        CONFIG_CHANGED,
+        CONFIG_EXTENSIONS_CHANGED,
+    ):
+        return
+    if not hasattr(env, "toctree_includes"):
+        logger.warning(
+            "Can't reuse shared pages with this version of Sphinx",
+            type="sharedenv",
+        )
+        return
+
+    # pylint: disable-next = too-many-try-statements
+    try:
+        with open(
+            app.doctreedir / MARKER_FILENAME, encoding="utf-8"
+        ) as marker_file:
+            marker = json.load(marker_file)
+    except (OSError, ValueError):
+        return
+    # The env may have been pickled since by a build without this extension
+    if marker.get("env_hash") != get_env_pickle_hash(app.doctreedir):
+        logger.info("Not reusing shared pages: environment has changed")
+        return
+
+    disallowed_keys = get_disallowed_changes(
+        marker.get("config", {}),
+        get_env_config(app.config),
+        app.config.sharedenv_allowed_changes,
+    )
+    if disallowed_keys:
+        logger.info(
+            "Not reusing shared pages (changed: %s)",
+            ", ".join(sorted(disallowed_keys)),
+        )
+        return
+
+    logger.info("Reusing shared pages from seeded environment")
+    env.config_status = CONFIG_OK
+    env.shared_env_reused = True
+
+
+def get_toctree_parents(app, env, added, changed, removed):
+    """Re-read toctree parents whose entries depended on excluded pages."""
+    # pylint: disable = unused-argument
+    if not getattr(env, "shared_env_reused", False):
+        return []
+    env.shared_env_reused = False
+    return sorted(set(env.toctree_includes) - removed)
+
+
+def write_marker(app, exception):
+    """Record the env config and pickle this environment was read with."""
+    if exception is not None:
+        return
+    marker = {
+        "env_hash": get_env_pickle_hash(app.doctreedir),
+        "config": get_env_config(app.config),
+    }
+    with open(
+        app.doctreedir / MARKER_FILENAME, "w", encoding="utf-8"
+    ) as marker_file:
+        json.dump(marker, marker_file, indent=1)
+
+
+def unversion_allowed_extensions(app, config):
+    """Leave the extensions loaded in one variant out of the env version.
+
+    Sphinx discards an environment pickled with other extension env
+    versions, so one read without them could never be reused.
+    """
+    for name in config.sharedenv_allowed_changes.get("extensions", []):
+        if name in app.extensions:
+            app.extensions[name].metadata.pop("env_version", None)
+
+
+def setup(app):
+    """Set up the shared environment extension."""
+    app.add_config_value("sharedenv_allowed_changes", {}, "", types=[dict])
+    app.connect("config-inited", unversion_allowed_extensions)
+    app.connect("builder-inited", reuse_shared_env, priority=100)
+    app.connect("env-get-outdated", get_toctree_parents)
+    app.connect("build-finished", write_marker)
+    return {
+        "version": "1.0",
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
@@ -0,0 +1,146 @@
+"""Render the sidebar navigation once, as a fragment shared by all pages."""
+
+# Standard library imports
+import hashlib
+from pathlib import Path
+
+# Third party imports
+from bs4 import BeautifulSoup
+from pydata_sphinx_theme.toctree import add_collapse_checkboxes
+from sphinx.environment.adapters.toctree import global_toctree_for_doc
+from sphinx.util import logging
+
+# Local imports
+import sharedcache
+
+
+# Constants
+FRAGMENT_PATH = "_static/navigation.html"
+SCRIPT_PATH = "js/shared-nav.js"
+THEME_TEMPLATE = "sbt-sidebar-nav.html"
+SHARED_TEMPLATE = "shared-sidebar-nav.html"
+SINGLE_PAGE_BUILDERS = {"singlehtml"}
+
+logger = logging.getLogger(__name__)
+
+
+def is_enabled(app):
+    """Check if the shared navigation is enabled for the current builder."""
+    return (
+        app.config.shared_nav
+        and app.builder.format == "html"
+        and app.builder.name not in SINGLE_PAGE_BUILDERS
+    )
+
+
+def render_fragment(app, context):
+    """Render the whole sidebar navigation, linked relative to the root."""
+    root_doc = app.config.root_doc
+    toctree = global_toctree_for_doc(
+        app.env,
+        root_doc,
+        app.builder,
+        collapse=False,
+        includehidden=True,
+        maxdepth=int(context.get("theme_max_navbar_depth", 0)),
+        titles_only=True,
+    )
+    if toctree is None:
+        return ""
+    # The root doc is in the site's root dir, so are its relative links
+    fragment = app.builder.render_partial(toctree)["fragment"]
+
+    # Match the structure the theme gives the server-rendered sidebar
+    soup = BeautifulSoup(fragment, "html.parser")
+    for item in soup("li"):
+        link = item.find("a")
+        if link and "#" in link["href"] and link["href"] != "#":
+            item.decompose()
+    for item in soup("ul", recursive=False):
+        item["class"] = [*item.get("class", []), "nav", "bd-sidenav"]
+    add_collapse_checkboxes(soup)
+    for level in range(int(context.get("theme_show_navbar_depth", 1))):
+        for details in soup.select(f"li.toctree-l{level} > details"):
+            details["open"] = "open"
+    return str(soup)
+
+
+def write_fragment(app, context):
+    """Write the navigation fragment, returning its versioned path."""
+    fragment = render_fragment(app, context)
+    fragment_hash = hashlib.sha256(fragment.encode()).hexdigest()[:16]
+    sharedcache.write_atomic(
+        Path(app.outdir, FRAGMENT_PATH), fragment.encode()
+    )
+    logger.verbose("Wrote shared navigation to %s", FRAGMENT_PATH)
+    return f"{FRAGMENT_PATH}?v={fragment_hash}"
+
+
+def get_toctree_parents(env):
+    """Map each document to the (first) document including it in a toctree."""
+    parents = {}
+    for parent, children in env.toctree_includes.items():
+        for child in children:
+            parents.setdefault(child, parent)
+    return parents
+
+
+def get_breadcrumb(app, pagename):
+    """Get the (title, docname) of a page and its ancestors below the root."""
+    parents = app.builder.shared_nav_parents
+    breadcrumb = []
+    docname = pagename
+    while (
+        docname in app.env.titles
+        and docname != app.config.root_doc
+        and docname not in breadcrumb
+    ):
+        breadcrumb.insert(0, docname)
+        docname = parents.get(docname)
+    return [
+        (app.env.titles[docname].astext(), docname) for docname in breadcrumb
+    ]
+
+
+def add_shared_nav(app, pagename, templatename, context, doctree):
+    """Swap the sidebar navigation for one loading the shared fragment."""
+    # pylint: disable = unused-argument
+    if not is_enabled(app):
+        return
+    # Rendered on the first page written, as it needs the theme options
+    if app.builder.shared_nav_path is None:
+        app.builder.shared_nav_path = write_fragment(app, context)
+        app.builder.shared_nav_parents = get_toctree_parents(app.env)
+    fragment_path, __, query = app.builder.shared_nav_path.partition("?")
+    context["shared_nav_url"] = (
+        f"{context['pathto'](fragment_path, 1)}?{query}"
+    )
+    context["sidebars"] = [
+        SHARED_TEMPLATE if template == THEME_TEMPLATE else template
+        for template in context.get("sidebars", [])
+    ]
+    context["shared_nav_breadcrumb"] = [
+        (title, context["pathto"](docname))
+        for title, docname in get_breadcrumb(app, pagename)
+    ]
+
+
+def init_shared_nav(app):
+    """Add the navigation loader script, if enabled."""
+    app.builder.shared_nav_path = None
+    app.builder.shared_nav_parents = {}
+    if is_enabled(app):
+        app.add_js_file(SCRIPT_PATH, loading_method="defer")
+
+
+def setup(app):
+    """Register the shared navigation with Sphinx."""
+    app.add_config_value("shared_nav", False, "html", types=[bool])
+    app.connect("builder-inited", init_shared_nav)
+    # Before the theme checks the sidebar templates, at priority 500
+    app.connect("html-page-context", add_shared_nav, priority=400)
+    return {
+        "version": "1.0",
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
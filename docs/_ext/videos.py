@@ -0,0 +1,282 @@
+"""Directives for embedding videos, with a lazy-loading YouTube facade."""
+
+# Standard library imports
+import io
+import shutil
+import urllib.request
+from pathlib import Path
+
+# Third party imports
+from docutils import nodes
+from docutils.parsers.rst import Directive, directives
+from sphinx.util import logging
+
+# Local imports
+import sharedcache
+
+
+# Constants
+DEFAULT_VIDEO_WIDTH = 500
+DEFAULT_VIDEO_HEIGHT = 281
+DEFAULT_VIDEO_START = 0
+YOUTUBE_IFRAME_HTML = "".join(
+    [
+        '<div class="video-container-container">',
+        '<div class="video-container">',
+        '<iframe src="https://www.youtube.com/embed/%(video_id)s',
+        '?start=%(start)s" ',
+        'width="%(width)u" height="%(height)u" frameborder="0" ',
+        'loading="lazy" ',
+        "webkitAllowFullScreen mozallowfullscreen allowfullscreen ",
+        'class="align-%(align)s"></iframe></div></div>',
+    ]
+)
+THUMBNAIL_URL = "https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"
+THUMBNAIL_DIRNAME = "youtube-thumbnails"
+THUMBNAIL_PREFIX = "youtube-"
+THUMBNAIL_ASPECT_RATIO = 16 / 9
+THUMBNAIL_QUALITY = 80
+FETCH_TIMEOUT = 10
+WATCH_URL = "https://www.youtube.com/watch?v={video_id}&t={start}s"
+
+logger = logging.getLogger(__name__)
+
+
+# --- Directives --- #
+
+# ReST directive for embedding Youtube and Vimeo videos.
+# There are two directives added: ``youtube`` and ``vimeo``. The only
+# argument is the video id of the video to include.
+# Both directives have three optional arguments: ``height``, ``width``
+# and ``align``. Default height is 281 and default width is 500.
+# Example::
+#     .. youtube:: anwy2MPT5RE
+#         :height: 315
+#         :width: 560
+#         :align: left
+# :copyright: (c) 2012 by Danilo Bargen.
+# :license: BSD 3-clause
+
+
+def align(argument):
+    """Convert the "align" argument to one of the specified options."""
+    return directives.choice(argument, ("left", "center", "right"))
+
+
+class IFrameVideo(Directive):
+    """A general directive for injecting an iframe video in a Sphinx doc."""
+
+    has_content = False
+    required_arguments = 1
+    optional_arguments = 0
+    final_argument_whitespace = False
+    option_spec = {
+        "height": directives.nonnegative_int,
+        "width": directives.nonnegative_int,
+        "align": align,
+        "start": directives.nonnegative_int,
+    }
+
+    def get_iframe_html(self):
+        """Get the HTML template of the iframe, to fill in with the options."""
+        raise NotImplementedError
+
+    def run(self):
+        """Execute the iframe video directive."""
+        self.options["video_id"] = directives.uri(self.arguments[0])
+        if not self.options.get("width"):
+            self.options["width"] = DEFAULT_VIDEO_WIDTH
+        if not self.options.get("height"):
+            self.options["height"] = DEFAULT_VIDEO_HEIGHT
+        if not self.options.get("align"):
+            self.options["align"] = "left"
+        if not self.options.get("start"):
+            self.options["start"] = DEFAULT_VIDEO_START
+        return [
+            nodes.raw("", self.get_iframe_html() % self.options, format="html")
+        ]
+
+
+class Youtube(IFrameVideo):
+    """A specific directive for injecting a Youtube video in a Sphinx doc."""
+
+    def get_iframe_html(self):
+        """Get the HTML template of the YouTube player iframe."""
+        return YOUTUBE_IFRAME_HTML
+
+    def run(self):
+        """Execute the Youtube directive, rendering a facade if possible."""
+        iframe_nodes = super().run()
+        app = self.state.document.settings.env.app
+        if not app.config.youtube_facade:
+            return iframe_nodes
+
+        thumbnail = get_thumbnail(app, self.options["video_id"])
+        if thumbnail is None:
+            return iframe_nodes
+        return [
+            YoutubeFacade(
+                "",
+                thumbnail=thumbnail.name,
+                **{
+                    key: self.options[key]
+                    for key in (
+                        "video_id",
+                        "width",
+                        "height",
+                        "align",
+                        "start",
+                    )
+                },
+            )
+        ]
+
+
+# --- Facade --- #
+
+
+class YoutubeFacade(nodes.General, nodes.Element):
+    """Node for a YouTube video that only loads the player on demand."""
+
+
+def fetch_thumbnail(video_id):
+    """Download the thumbnail of a YouTube video."""
+    url = THUMBNAIL_URL.format(video_id=video_id)
+    with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT) as response:
+        return response.read()
+
+
+def optimize_thumbnail(image_data, *, width):
+    """Crop a thumbnail to 16:9, resize it and convert it to WebP."""
+    # pylint: disable = import-outside-toplevel
+    try:
+        from PIL import Image
+    except ImportError:
+        return image_data, ".jpg"
+
+    with Image.open(io.BytesIO(image_data)) as image:
+        crop_height = round(image.width / THUMBNAIL_ASPECT_RATIO)
+        top = max((image.height - crop_height) // 2, 0)
+        image = image.crop((0, top, image.width, top + crop_height))
+        if image.width > width:
+            image = image.resize(
+                (width, round(width / THUMBNAIL_ASPECT_RATIO)),
+                Image.Resampling.LANCZOS,
+            )
+        output = io.BytesIO()
+        image.save(output, "WEBP", quality=THUMBNAIL_QUALITY)
+    return output.getvalue(), ".webp"
+
+
+def get_thumbnail_dir(app):
+    """Get the directory that cached video thumbnails are stored in."""
+    return sharedcache.get_cache_dir(app, THUMBNAIL_DIRNAME)
+
+
+def get_thumbnail(app, video_id):
+    """Get the path to a cached video thumbnail, fetching it if needed."""
+    thumbnail_dir = get_thumbnail_dir(app)
+    cached = sorted(thumbnail_dir.glob(f"{THUMBNAIL_PREFIX}{video_id}.*"))
+    if cached:
+        return cached[0]
+
+    fetcher = app.config.youtube_thumbnail_fetcher
+    if fetcher is False:
+        return None
+    fetcher = fetcher or fetch_thumbnail
+    try:
+        image_data = fetcher(video_id)
+    except OSError as error:
+        # Not a warning, so offline -W builds fall back to the iframe
+        logger.info(
+            "Could not fetch thumbnail for YouTube video %s: %s",
+            video_id,
+            error,
+        )
+        return None
+    if not image_data:
+        return None
+
+    image_data, suffix = optimize_thumbnail(
+        image_data, width=app.config.youtube_thumbnail_width
+    )
+    thumbnail_path = thumbnail_dir / f"{THUMBNAIL_PREFIX}{video_id}{suffix}"
+    sharedcache.write_atomic(thumbnail_path, image_data)
+    return thumbnail_path
+
+
+def visit_youtube_facade_html(self, node):
+    """Render a YouTube facade node as a thumbnail link to the video."""
+    thumbnail_uri = f"{self.builder.imgpath}/{node['thumbnail']}"
+    watch_url = WATCH_URL.format(
+        video_id=node["video_id"], start=node["start"]
+    )
+    self.body.append(
+        '<div class="video-container-container">'
+        '<div class="video-container">'
+        f'<a class="youtube-facade align-{node["align"]}" '
+        f'href="{self.attval(watch_url)}" '
+        f'data-video-id="{self.attval(node["video_id"])}" '
+        f'data-start="{node["start"]}" '
+        f'data-width="{node["width"]}" data-height="{node["height"]}" '
+        'aria-label="Play video">'
+        f'<img src="{self.attval(thumbnail_uri)}" alt="" '
+        f'width="{node["width"]}" height="{node["height"]}" '
+        'loading="lazy" decoding="async">'
+        '<span class="youtube-facade-play" aria-hidden="true"></span>'
+        "</a></div></div>"
+    )
+    raise nodes.SkipNode
+
+
+def skip_youtube_facade(self, node):
+    """Skip YouTube facade nodes in non-HTML output."""
+    raise nodes.SkipNode
+
+
+def add_facade_assets(app, pagename, templatename, context, doctree):
+    """Add the facade script and styles to pages that contain a video."""
+    # pylint: disable = unused-argument
+    if doctree is None or not any(doctree.findall(YoutubeFacade)):
+        return
+    app.add_js_file("js/youtube-facade.js", loading_method="defer")
+    app.add_css_file("css/youtube-facade.css")
+
+
+def copy_thumbnails(app, exception):
+    """Copy the cached thumbnails into the HTML output."""
+    if exception is not None or app.builder.format != "html":
+        return
+    thumbnail_dir = get_thumbnail_dir(app)
+    if not thumbnail_dir.is_dir():
+        return
+    image_dir = Path(app.outdir) / app.builder.imagedir
+    image_dir.mkdir(parents=True, exist_ok=True)
+    for thumbnail_path in thumbnail_dir.iterdir():
+        shutil.copyfile(thumbnail_path, image_dir / thumbnail_path.name)
+
+
+def setup(app):
+    """Register the video directives and the YouTube facade."""
+    app.setup_extension("sharedcache")
+    app.add_config_value("youtube_facade", True, "env", types=[bool])
+    app.add_config_value(
+        "youtube_thumbnail_width", DEFAULT_VIDEO_WIDTH, "env", types=[int]
+    )
+    app.add_config_value("youtube_thumbnail_fetcher", None, "")
+    app.add_node(
+        YoutubeFacade,
+        html=(visit_youtube_facade_html, None),
+        latex=(skip_youtube_facade, None),
+        text=(skip_youtube_facade, None),
+        man=(skip_youtube_facade, None),
+        texinfo=(skip_youtube_facade, None),
+    )
+    app.add_directive("youtube", Youtube)
+    app.connect("html-page-context", add_facade_assets)
+    app.connect("build-finished", copy_thumbnails)
+    return {
+        "version": "1.0",
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
@@ -0,0 +1,170 @@
+/* Prefetch internal links and register the docs' service worker. */
+
+"use strict";
+
+// Long enough to skip links the pointer just passes over
+const HOVER_DELAY = 65;
+const MAX_VIEWPORT_PREFETCHES = 20;
+const VIEWPORT_LINK_SELECTOR = ".bd-article a[href], .prev-next-area a[href]";
+// Dirs of the site that hold resources rather than pages
+const RESOURCE_DIRS = ["_downloads", "_images", "_sources", "_static"];
+
+const instantNavScript = document.currentScript;
+const rootUrl = new URL(
+  document.documentElement.dataset.content_root || "./",
+  window.location.href,
+);
+const prefetchedUrls = new Set([getPageUrl(window.location.href)]);
+
+function getPageUrl(url) {
+  const pageUrl = new URL(url, window.location.href);
+  pageUrl.hash = "";
+  return pageUrl.href;
+}
+
+function isInternalPage(link) {
+  if (
+    (link.target && link.target !== "_self") ||
+    link.hasAttribute("download")
+  ) {
+    return false;
+  }
+  const url = new URL(link.href, window.location.href);
+  if (url.origin !== rootUrl.origin || !url.href.startsWith(rootUrl.href)) {
+    return false;
+  }
+  const relPath = url.pathname.slice(rootUrl.pathname.length);
+  return (
+    /(\.html|\/)$/.test(url.pathname) &&
+    !RESOURCE_DIRS.includes(relPath.split("/")[0])
+  );
+}
+
+function canPrefetch() {
+  const connection = navigator.connection;
+  return !(
+    connection &&
+    (connection.saveData || /2g/.test(connection.effectiveType || ""))
+  );
+}
+
+function prefetch(link) {
+  const url = getPageUrl(link.href);
+  if (prefetchedUrls.has(url)) {
+    return;
+  }
+  prefetchedUrls.add(url);
+  const hint = document.createElement("link");
+  if (hint.relList.supports("prefetch")) {
+    hint.rel = "prefetch";
+    hint.href = url;
+    document.head.append(hint);
+  } else {
+    fetch(url, { credentials: "same-origin", priority: "low" }).catch(
+      () => undefined,
+    );
+  }
+}
+
+function getLink(event) {
+  const link = event.target.closest && event.target.closest("a[href]");
+  return link && isInternalPage(link) ? link : null;
+}
+
+function prefetchOnHover() {
+  let hoverTimer = null;
+  document.addEventListener(
+    "pointerover",
+    (event) => {
+      const link = getLink(event);
+      if (link) {
+        clearTimeout(hoverTimer);
+        hoverTimer = setTimeout(() => prefetch(link), HOVER_DELAY);
+      }
+    },
+    { passive: true },
+  );
+  document.addEventListener(
+    "pointerout",
+    (event) => {
+      if (getLink(event)) {
+        clearTimeout(hoverTimer);
+      }
+    },
+    { passive: true },
+  );
+  // Touches and keyboard focus come right before a click
+  for (const eventType of ["touchstart", "focusin"]) {
+    document.addEventListener(
+      eventType,
+      (event) => {
+        const link = getLink(event);
+        if (link) {
+          prefetch(link);
+        }
+      },
+      { passive: true },
+    );
+  }
+}
+
+function prefetchInViewport() {
+  if (!("IntersectionObserver" in window)) {
+    return;
+  }
+  const whenIdle =
+    window.requestIdleCallback || ((callback) => setTimeout(callback, 1));
+  let prefetchCount = 0;
+  const observer = new IntersectionObserver((entries) => {
+    for (const entry of entries) {
+      if (!entry.isIntersecting) {
+        continue;
+      }
+      observer.unobserve(entry.target);
+      if (prefetchCount >= MAX_VIEWPORT_PREFETCHES) {
+        observer.disconnect();
+        return;
+      }
+      prefetchCount += 1;
+      whenIdle(() => prefetch(entry.target));
+    }
+  });
+  for (const link of document.querySelectorAll(VIEWPORT_LINK_SELECTOR)) {
+    if (isInternalPage(link) && !prefetchedUrls.has(getPageUrl(link.href))) {
+      observer.observe(link);
+    }
+  }
+}
+
+async function updateServiceWorker(serviceWorkerPath) {
+  if (serviceWorkerPath) {
+    await navigator.serviceWorker.register(
+      new URL(serviceWorkerPath, rootUrl),
+      { scope: rootUrl.href },
+    );
+    return;
+  }
+  // Offline reading was turned off after a deployment that enabled it
+  const registration = await navigator.serviceWorker.getRegistration(
+    rootUrl.href,
+  );
+  if (registration && registration.scope === rootUrl.href) {
+    await registration.unregister();
+  }
+}
+
+const prefetchMode = instantNavScript.dataset.prefetch;
+if (prefetchMode && canPrefetch()) {
+  prefetchOnHover();
+  if (prefetchMode === "viewport") {
+    prefetchInViewport();
+  }
+}
+
+if ("serviceWorker" in navigator && window.isSecureContext) {
+  window.addEventListener("load", () =>
+    updateServiceWorker(instantNavScript.dataset.serviceWorker).catch((error) =>
+      console.warn("Could not update the service worker:", error),
+    ),
+  );
+}
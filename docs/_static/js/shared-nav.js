@@ -0,0 +1,69 @@
+/* Load the shared sidebar navigation and expand it to the current page. */
+
+"use strict";
+
+const CURRENT_CLASSES = ["current", "active"];
+
+function getPageUrl(url) {
+  const pageUrl = new URL(url, window.location.href);
+  pageUrl.hash = "";
+  pageUrl.search = "";
+  return pageUrl.href.replace(/\/index\.html$/, "/");
+}
+
+function markCurrentPage(nav) {
+  const currentUrl = getPageUrl(window.location.href);
+  for (const link of nav.querySelectorAll("a.reference.internal")) {
+    if (getPageUrl(link.getAttribute("href")) !== currentUrl) {
+      continue;
+    }
+    link.classList.add("current");
+    let item = link.closest("li");
+    while (item) {
+      item.classList.add(...CURRENT_CLASSES);
+      const details = item.querySelector(":scope > details");
+      if (details) {
+        details.open = true;
+      }
+      item = item.parentElement.closest("li");
+    }
+    return link;
+  }
+  return null;
+}
+
+async function loadSharedNav(container) {
+  const response = await fetch(container.dataset.sharedNav);
+  if (!response.ok) {
+    throw new Error(`${response.status} ${response.statusText}`);
+  }
+  const template = document.createElement("template");
+  template.innerHTML = await response.text();
+
+  // The fragment's links are relative to the root of the docs, so make them
+  // absolute (the template's inert document has no base URL to resolve them)
+  const rootUrl = new URL(
+    document.documentElement.dataset.content_root || "./",
+    window.location.href,
+  );
+  for (const link of template.content.querySelectorAll("a[href]")) {
+    const href = link.getAttribute("href");
+    if (!/^([a-z][a-z0-9+.-]*:|\/|#)/i.test(href)) {
+      link.setAttribute("href", new URL(href, rootUrl).href);
+    }
+  }
+
+  const currentLink = markCurrentPage(template.content);
+  container.replaceChildren(template.content);
+  if (currentLink) {
+    currentLink.scrollIntoView({ block: "nearest" });
+  }
+}
+
+const sharedNavContainer = document.querySelector("[data-shared-nav]");
+if (sharedNavContainer) {
+  // Keep the breadcrumb if the navigation can't be loaded (e.g. from file://)
+  loadSharedNav(sharedNavContainer).catch((error) =>
+    console.warn("Could not load the shared navigation:", error),
+  );
+}
@@ -0,0 +1,34 @@
+/* Replace YouTube video facades with the real player when clicked. */
+
+"use strict";
+
+const EMBED_URL = "https://www.youtube.com/embed/";
+
+function loadVideo(facade) {
+  const iframe = document.createElement("iframe");
+  const params = new URLSearchParams({
+    autoplay: "1",
+    start: facade.dataset.start || "0",
+  });
+  iframe.src = `${EMBED_URL}${facade.dataset.videoId}?${params}`;
+  iframe.width = facade.dataset.width;
+  iframe.height = facade.dataset.height;
+  iframe.className = facade.className.replace("youtube-facade", "").trim();
+  iframe.title = facade.getAttribute("aria-label");
+  iframe.allow = "autoplay; encrypted-media; picture-in-picture";
+  iframe.allowFullscreen = true;
+  iframe.setAttribute("frameborder", "0");
+  facade.replaceWith(iframe);
+  iframe.focus();
+}
+
+document.addEventListener("click", (event) => {
+  if (event.button !== 0 || event.ctrlKey || event.metaKey) {
+    return;
+  }
+  const facade = event.target.closest("a.youtube-facade");
+  if (facade) {
+    event.preventDefault();
+    loadVideo(facade);
+  }
+});
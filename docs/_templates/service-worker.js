@@ -0,0 +1,118 @@
+{#- Rendered to the root of the site by the instantnav extension -#}
+/* Cache the docs' shell and visited pages, for instant and offline reading. */
+
+"use strict";
+
+// Changes on every deployment with different content, dropping old caches
+const VERSION = "{{ version }}";
+const PRECACHE_URLS = {{ precache_urls }};
+const MAX_CACHED_PAGES = {{ max_cached_pages }};
+
+// Other versions and languages of the docs share the origin, but not the scope
+const SCOPE = self.registration.scope;
+const CACHE_PREFIX = `instant-nav:${SCOPE}:`;
+const ASSET_CACHE = `${CACHE_PREFIX}assets:${VERSION}`;
+const PAGE_CACHE = `${CACHE_PREFIX}pages:${VERSION}`;
+// Static files are only ever replaced by a new deployment, so their version
+// query strings can be ignored
+const MATCH_OPTIONS = { ignoreSearch: true };
+
+function isPage(url) {
+  return /(\.html|\/)$/.test(url.pathname);
+}
+
+function getCacheKey(url) {
+  const key = new URL(url);
+  key.hash = "";
+  key.search = "";
+  return key.href;
+}
+
+async function precache() {
+  const cache = await caches.open(ASSET_CACHE);
+  // Missing files (e.g. ones pruned since) must not fail the install
+  await Promise.allSettled(
+    PRECACHE_URLS.map((url) => cache.add(new URL(url, SCOPE).href)),
+  );
+}
+
+async function dropOldCaches() {
+  const currentCaches = [ASSET_CACHE, PAGE_CACHE];
+  for (const name of await caches.keys()) {
+    if (name.startsWith(CACHE_PREFIX) && !currentCaches.includes(name)) {
+      await caches.delete(name);
+    }
+  }
+}
+
+async function trimPages(cache) {
+  const keys = await cache.keys();
+  const excessCount = Math.max(0, keys.length - MAX_CACHED_PAGES);
+  for (const key of keys.slice(0, excessCount)) {
+    await cache.delete(key);
+  }
+}
+
+async function fetchAndCache(request, cacheName) {
+  const response = await fetch(request);
+  if (response.ok && response.type === "basic") {
+    const cache = await caches.open(cacheName);
+    await cache.put(getCacheKey(request.url), response.clone());
+    if (cacheName === PAGE_CACHE) {
+      await trimPages(cache);
+    }
+  }
+  return response;
+}
+
+async function matchCached(request, cacheNames) {
+  for (const cacheName of cacheNames) {
+    const cache = await caches.open(cacheName);
+    const response = await cache.match(request, MATCH_OPTIONS);
+    if (response) {
+      return response;
+    }
+  }
+  return undefined;
+}
+
+async function respondWithPage(event) {
+  // Serve visited (or prefetched) pages at once, refreshing them behind
+  const cached = await matchCached(event.request, [PAGE_CACHE, ASSET_CACHE]);
+  const update = fetchAndCache(event.request, PAGE_CACHE);
+  if (cached) {
+    event.waitUntil(update.catch(() => undefined));
+    return cached;
+  }
+  return update;
+}
+
+async function respondWithAsset(event) {
+  const cached = await matchCached(event.request, [ASSET_CACHE]);
+  return cached || fetchAndCache(event.request, ASSET_CACHE);
+}
+
+self.addEventListener("install", (event) => {
+  event.waitUntil(precache().then(() => self.skipWaiting()));
+});
+
+self.addEventListener("activate", (event) => {
+  event.waitUntil(dropOldCaches().then(() => self.clients.claim()));
+});
+
+self.addEventListener("fetch", (event) => {
+  const url = new URL(event.request.url);
+  if (
+    event.request.method !== "GET" ||
+    url.origin !== self.location.origin ||
+    !url.href.startsWith(SCOPE) ||
+    url.href === self.location.href
+  ) {
+    return;
+  }
+  if (event.request.mode === "navigate" || isPage(url)) {
+    event.respondWith(respondWithPage(event));
+  } else {
+    event.respondWith(respondWithAsset(event));
+  }
+});
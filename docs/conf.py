@@ -21,16 +21,29 @@
 import sys
 from pathlib import Path
 
-# Third party imports
-from docutils import nodes
-from docutils.parsers.rst import Directive, directives
-
 
 # Constants
 UTC_DATE = datetime.datetime.now(datetime.timezone.utc)
 
+# Config values only the variant without the API reference adds
+REFERENCE_EXCLUDE_PATTERNS = ["reference.rst"]
+REFERENCE_SUPPRESS_WARNINGS = ["autodoc", "autosummary", "toc.excluded"]
+
+# Whether to load the extensions needed to generate the API reference
+# The combined build loads them in both of its variants, to share the pages
+# pylint: disable-next = undefined-variable
+LOAD_AUTODOC = "autodoc" in tags or "combined" in tags  # noqa: F821
+
 # Make Spyder available on $PATH for API documentation
-sys.path.insert(0, str(Path(__file__).parents[1].resolve() / "spyder"))
+# Multi-version builds use this config with other versions' Spyder checkouts
+sys.path.insert(
+    0,
+    os.environ.get("SPYDER_DOCS_SPYDER_PATH")
+    or str(Path(__file__).parents[1].resolve() / "spyder"),
+)
+
+# Make the local extensions importable
+sys.path.insert(0, str(Path(__file__).parent.resolve() / "_ext"))
 
 
 # -- General configuration ---------------------------------------------
@@ -43,14 +56,36 @@
 # extensions coming with Sphinx (named "sphinx.ext.*") or your custom ones.
 extensions = [
     "myst_parser",
-    "sphinx.ext.autodoc",
-    "sphinx.ext.autosummary",
     "sphinx.ext.githubpages",
     "sphinx.ext.intersphinx",
-    "sphinx.ext.napoleon",
-    "sphinx.ext.viewcode",
+    "highlightcache",
+    "instantnav",
+    "nitpickmatcher",
+    "responsiveimages",
+    "sharednav",
+    "videos",
 ]
 
+# Only load the API reference extensions when needed, to speed up start up
+if LOAD_AUTODOC:
+    extensions += [
+        "sphinx.ext.autodoc",
+        "sphinx.ext.autosummary",
+        "autosummaryprune",
+        "parallelautosummary",
+        "sphinx.ext.napoleon",
+        "sphinx.ext.viewcode",
+    ]
+# Only in the variant rendering the API reference, as it needs Qt bindings
+# pylint: disable-next = undefined-variable
+if "autodoc" in tags:  # noqa: F821
+    extensions.append("sphinx_qt_documentation")  # Errors out w/o Qt
+
+# Time the event handlers of each extension if the eventtiming tag is passed
+# pylint: disable-next = undefined-variable
+if "eventtiming" in tags:  # noqa: F821
+    extensions.append("eventtiming")
+
 # Add any paths that contain templates here, relative to this directory.
 templates_path = ["_templates"]
 
@@ -139,6 +174,16 @@
     ("py:class", "spyder.api.plugin_registration.registry.SpyderPluginClass"),
 }
 
+# Where to write the unresolved references of nitpicky builds, ranked by
+# count with the nitpick_ignore_regex pattern (if any) that matched each,
+# relative to the build's doctree dir (e.g. _build/html/.doctrees)
+nitpick_report = "reports/nitpick.json"
+
+# Where to write the event handler times of builds with the eventtiming tag,
+# totalled per extension and per event along with each handler's slowest
+# calls, relative to the build's doctree dir (e.g. _build/html/.doctrees)
+event_timing_report = "reports/event-timing.json"
+
 
 # -- Options for HTML output -------------------------------------------
 
@@ -157,6 +202,16 @@
     "use_issues_button": True,
     "use_edit_page_button": True,
 }
+
+# Opt in to prefetching internal links when hovered ("hover") or also when
+# scrolled into view ("viewport"), and to a service worker caching the theme
+# assets and visited pages for offline reading. The caches are versioned by
+# the built content, so each deployment drops the previous one's. To turn the
+# service worker off once deployed, keep instant_navigation on and set
+# instant_navigation_offline to False, so readers' browsers unregister it.
+instant_navigation = False
+instant_navigation_prefetch = "hover"
+instant_navigation_offline = True
 html_logo = "_static/images/spyder_logo.svg"
 
 # The name of an image file (within the static path) to use as favicon of the
@@ -169,6 +224,26 @@
 # so a file named "default.css" will overwrite the builtin "default.css".
 html_static_path = ["_static"]
 
+# Render the sidebar navigation once, as a fragment that every page loads and
+# expands to itself in the browser, with just a breadcrumb for readers without
+# JavaScript. Otherwise, each page of the API reference would embed it whole.
+# pylint: disable-next = undefined-variable
+shared_nav = "autodoc" in tags  # noqa: F821
+
+# Render YouTube videos as a thumbnail that only loads the player on click.
+# Set youtube_thumbnail_fetcher to False to never download thumbnails (the
+# videos then fall back to lazy-loading iframes), or to a callable taking a
+# video ID and returning the image bytes to stub it out.
+youtube_facade = True
+youtube_thumbnail_fetcher = None
+
+# Serve the doc images lazily, with WebP variants at these widths (in pixels)
+# for the browser to choose from. Converted images are cached by content hash
+# in the doctree dir, and the originals are kept as the fallback. Requires
+# Pillow; without it, images are only made lazy-loading with explicit sizes.
+responsive_images = True
+responsive_image_widths = [480, 960, 1440]
+
 
 # -- Options for HTMLHelp output ---------------------------------------
 
@@ -318,103 +393,56 @@
 
 # Monkeypatch to fix type aliases not working in classmethods with Sphinx
 # See sphinx-doc/sphinx#10333
-# pylint: disable-next = wrong-import-position
-from sphinx.util import inspect  # noqa: E402
-
-inspect.TypeAliasForwardRef.__repr__ = lambda self: self.name
-inspect.TypeAliasForwardRef.__hash__ = lambda self: hash(self.name)
-
-# Set list of modules and patterns to ignore in the autosummary template
-autosummary_context = {
-    "ignore_module_pattern": "tests",
-    "ignore_modules": [
-        "spyder.api.editor",
-        "spyder.api.plugins.enum",
-        "spyder.api.plugins.new_api",
-        "spyder.api.plugins.tests",
-    ],
-}
+if LOAD_AUTODOC:
+    from sphinx.util import inspect  # noqa: E402
+
+    inspect.TypeAliasForwardRef.__repr__ = lambda self: self.name
+    inspect.TypeAliasForwardRef.__hash__ = lambda self: hash(self.name)
+
+# Modules to leave out of the API reference, along with all their submodules.
+# Matched against the full module name as globs, or as regexes if prefixed
+# with "re:". Matching modules are skipped before autosummary imports them;
+# on Sphinx versions where that isn't possible, the module template leaves
+# out exact names and "*part*" globs instead, with an "autosummaryprune"
+# warning (add it to suppress_warnings to build with -W regardless).
+autosummary_ignore_modules = [
+    "*tests*",
+    "spyder.api.editor",
+    "spyder.api.plugins.enum",
+    "spyder.api.plugins.new_api",
+]
+
+# Module name prefixes to limit the API reference to (all if empty), as set
+# by "nox -s docs -- --only <modules>". References to the other modules are
+# rendered as unlinked stubs, so nitpicky builds still pass.
+autosummary_only_modules = []
+
+# Import and render each module's stub in its own worker process, running as
+# many at once as Sphinx's -j option allows. A module that crashes or takes
+# longer than this many seconds to import is left out with a warning.
+autosummary_import_timeout = 300
 
 # Generate autosummaries if the autodoc tag is passed
 # pylint: disable-next = undefined-variable
 if "autodoc" in tags:  # noqa: F821
     autosummary_generate = True
     os.environ["SPHINX_AUTODOC"] = "1"
-    extensions.append("sphinx_qt_documentation")  # Errors out w/o Qt installed
 else:
     autosummary_generate = False
-    exclude_patterns += ["reference.rst"]
-    suppress_warnings += ["autodoc", "autosummary", "toc.excluded"]
-
-
-# -- Additional Directives ---------------------------------------------------
-
-# ReST directive for embedding Youtube and Vimeo videos.
-# There are two directives added: ``youtube`` and ``vimeo``. The only
-# argument is the video id of the video to include.
-# Both directives have three optional arguments: ``height``, ``width``
-# and ``align``. Default height is 281 and default width is 500.
-# Example::
-#     .. youtube:: anwy2MPT5RE
-#         :height: 315
-#         :width: 560
-#         :align: left
-# :copyright: (c) 2012 by Danilo Bargen.
-# :license: BSD 3-clause
-
-
-def align(argument):
-    """Convert the "align" argument to one of the specified options."""
-    return directives.choice(argument, ("left", "center", "right"))
-
-
-class IFrameVideo(Directive):
-    """A general directive for injecting an iframe video in a Sphinx doc."""
-
-    has_content = False
-    required_arguments = 1
-    optional_arguments = 0
-    final_argument_whitespace = False
-    option_spec = {
-        "height": directives.nonnegative_int,
-        "width": directives.nonnegative_int,
-        "align": align,
-        "start": directives.nonnegative_int,
-    }
-    default_width = 500
-    default_height = 281
-    default_start = 0
-
-    def run(self):
-        """Execute the iframe video directive."""
-        self.options["video_id"] = directives.uri(self.arguments[0])
-        if not self.options.get("width"):
-            self.options["width"] = self.default_width
-        if not self.options.get("height"):
-            self.options["height"] = self.default_height
-        if not self.options.get("align"):
-            self.options["align"] = "left"
-        if not self.options.get("start"):
-            self.options["start"] = self.default_start
-        return [nodes.raw("", self.html % self.options, format="html")]
-
-
-class Youtube(IFrameVideo):
-    """A specific directive for injecting a Youtube video in a Sphinx doc."""
-
-    html = "".join(
-        [
-            '<div class="video-container-container">',
-            '<div class="video-container">',
-            '<iframe src="https://www.youtube.com/embed/%(video_id)s',
-            '?start=%(start)s" ',
-            'width="%(width)u" height="%(height)u" frameborder="0" ',
-            "webkitAllowFullScreen mozallowfullscreen allowfullscreen ",
-            'class="align-%(align)s"></iframe></div></div>',
-        ]
-    )
+    exclude_patterns += REFERENCE_EXCLUDE_PATTERNS
+    suppress_warnings += REFERENCE_SUPPRESS_WARNINGS
 
-
-def setup(builder):  # pylint: disable = unused-argument
-    """Register directives with Sphinx."""
-    directives.register_directive("youtube", Youtube)
+# Share the pages read by the plain variant with the autodoc one
+# pylint: disable-next = undefined-variable
+if "combined" in tags:  # noqa: F821
+    extensions.append("sharedenv")
+
+# The only differences between the variants' env config values; any other
+# change makes the seeded environment be read again from scratch
+sharedenv_allowed_changes = {
+    "autosummary_generate": [True, False],
+    "extensions": ["sphinx_qt_documentation"],
+    "qt_documentation": ["Qt5"],
+    "exclude_patterns": REFERENCE_EXCLUDE_PATTERNS,
+    "suppress_warnings": REFERENCE_SUPPRESS_WARNINGS,
+}
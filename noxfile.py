@@ -1,13 +1,17 @@
 """Common tasks to build, check and publish Spyder-API-Docs."""
 
+# pylint: disable = too-many-lines
+
 # Standard library imports
 import contextlib
+import json
 import logging
 import os
 import shutil
 import sys
 import tempfile
 import webbrowser
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Third party imports
@@ -30,16 +34,27 @@
 REPO_URL_SSH = "git@github.com:{user}/{repo}.git"
 
 # Build config
+ROOT_DIR = Path(__file__).resolve().parent
 BUILD_INVOCATION = ("python", "-I", "-m", "sphinx")
 SOURCE_DIR = Path("docs").resolve()
 BUILD_DIR = Path("docs/_build").resolve()
-BUILD_OPTIONS = ("-n", "-W", "--keep-going")
+BUILD_OPTIONS = ("-n", "-W", "--keep-going", "-j", "auto")
 
 # Builder-specific config
 CONF_PY = SOURCE_DIR / "conf.py"
 HTML_BUILDER = "html"
 HTML_BUILD_DIR = BUILD_DIR / HTML_BUILDER
 HTML_INDEX_PATH = HTML_BUILD_DIR / "index.html"
+DOCTREES_DIRNAME = ".doctrees"
+
+# Combined build config
+COMBINED_FLAG = "--combined"
+COMBINED_TAG = "combined"
+PLAIN_HTML_BUILD_DIR = BUILD_DIR / f"{HTML_BUILDER}-plain"
+
+# Selective API reference build config
+ONLY_OPTION = "--only"
+ONLY_HTML_BUILD_DIR = BUILD_DIR / f"{HTML_BUILDER}-only"
 
 # I18n config
 SOURCE_LANGUAGE = "en"
@@ -50,11 +65,37 @@
 GETTEXT_BUILD_DIR = BUILD_DIR / GETTEXT_BUILDER
 POT_DIR = LOCALE_DIR / "pot"
 PO_LINE_WIDTH = 0
+# Languages less translated than this are left out of the build
+MIN_TRANSLATION_COVERAGE = 0.1
+MIN_COVERAGE_OPTION = "--min-coverage"
+TRANSLATION_COVERAGE_PATH = BUILD_DIR / "reports" / "translation-coverage.json"
 
 # Deploy config
 LATEST_VERSION = 6
 DEFAULT_VERSION_NAME = "current"
+# Older versions to build alongside the latest, and their Git branches
+OLDER_VERSIONS = {5: "5.x", 4: "4.x"}
+WORKTREE_DIR = BUILD_DIR / "worktrees"
+SPYDER_PATH_ENV_VAR = "SPYDER_DOCS_SPYDER_PATH"
 BASE_URL = "https://spyder-ide.github.io/spyder-api-docs/"
+DEPLOY_BRANCH = "gh-pages"
+DEPLOY_DELTA_PATH = BUILD_DIR / "deploy-delta.json"
+PREVIOUS_MANIFEST_ENV_VAR = "SPYDER_DOCS_PREVIOUS_MANIFEST"
+PREVIOUS_MANIFEST_DEFAULT_LOCATION = f"{BASE_URL}deploy-manifest.json"
+
+# Sharded build config
+# Parts of the site that can be built on separate CI nodes, then merged
+SOURCE_PART = "source"
+VERSIONS_PART = "versions"
+SHARD_PARTS = (SOURCE_PART, *ALL_LANGUAGES, VERSIONS_PART)
+PART_OPTION = "--part"
+SHARD_DIR_ENV_VAR = "SPYDER_DOCS_SHARD_DIR"
+SHARD_DEFAULT_DIR = BUILD_DIR / "shards"
+
+# Page weight config
+# Max KiB sent (gzipped where that's smaller) per page type, resources included
+PAGE_WEIGHT_BUDGETS = {"api": 1200, "tutorial": 1600, "other": 1600}
+PAGE_WEIGHT_REPORT_PATH = BUILD_DIR / "reports" / "page-weight.json"
 
 # Other config
 # pylint: disable-next = consider-using-namedtuple-or-dataclass
@@ -72,13 +113,40 @@
 }
 IGNORE_REVS_FILE = ".git-blame-ignore-revs"
 PRE_COMMIT_VERSION_SPEC = ">=2.10.0,<4"
+PYTEST_VERSION_SPEC = ">=7,<10"
 
 # Custom config
 SCRIPT_DIR = Path("scripts").resolve()
+TEST_DIR = Path("tests").resolve()
 AUTOSUMMARY_DIR = SOURCE_DIR / "_autosummary"
 SPYDER_PATH = Path("spyder").resolve()
+SPYDER_BRANCH = "6.x"
+LEAN_FLAG = "--lean"
 DEPS_PATH = SPYDER_PATH / "external-deps"
 
+# Build cache config
+CACHE_ENV_VAR = "SPYDER_DOCS_CACHE"
+CACHE_DEFAULT_LOCATION = Path.home() / ".cache" / "spyder-api-docs"
+# Changes to these can change any page, so they invalidate the whole build
+CACHE_KEY_INPUTS = [
+    CONF_PY,
+    SOURCE_DIR / "_ext",
+    SOURCE_DIR / "_static",
+    SOURCE_DIR / "_templates",
+    Path("requirements.txt").resolve(),
+]
+CACHE_SOURCE_DIRS = {
+    "docs": SOURCE_DIR,
+    "spyder": SPYDER_PATH / "spyder" / "api",
+}
+NO_CACHE_FLAG = "--no-cache"
+CHANGED_SINCE_OPTION = "--changed-since"
+
+# Event timing config
+TIME_EVENTS_FLAG = "--time-events"
+# Handlers run in parallel worker processes can't be timed
+EVENT_TIMING_OPTIONS = ("-t", "eventtiming", "-j", "1")
+
 # Post config
 DIRS_TO_CLEAN = [BUILD_DIR, AUTOSUMMARY_DIR]
 
@@ -145,6 +213,25 @@ def extract_option_values(options, option_names, *, split_csv=False):
     return option_values, remaining_options
 
 
+def extract_flag(options, flag):
+    """Remove a boolean flag from a sequence of options, if present."""
+    options = list(options)
+    present = flag in options
+    remaining_options = [option for option in options if option != flag]
+    return present, remaining_options
+
+
+def get_only_options(only_modules):
+    """Get the Sphinx options to limit the API reference to some modules."""
+    if not only_modules:
+        return []
+    # Not passed as posargs, so nitpicky mode stays on for the reference
+    return [
+        *("-t", "autodoc"),
+        *("-D", f"autosummary_only_modules={','.join(only_modules)}"),
+    ]
+
+
 def construct_sphinx_invocation(
     posargs=(),
     *,
@@ -185,6 +272,58 @@ def construct_sphinx_invocation(
     return sphinx_invocation
 
 
+@contextlib.contextmanager
+def build_cache(
+    sphinx_invocation,
+    *,
+    enabled=True,
+    source_dirs=None,
+    autosummary_dir=AUTOSUMMARY_DIR,
+):
+    """Fetch a cached build before a Sphinx invocation and publish it after."""
+    # pylint: disable=import-outside-toplevel
+    if not enabled:
+        yield
+        return
+
+    sys.path.append(str(SCRIPT_DIR))
+    import buildcache
+
+    source_dirs = source_dirs or CACHE_SOURCE_DIRS
+    backend = buildcache.get_backend(
+        os.environ.get(CACHE_ENV_VAR) or CACHE_DEFAULT_LOCATION
+    )
+    separator_idx = sphinx_invocation.index("--")
+    build_dir = Path(sphinx_invocation[separator_idx + 2])
+    # Without the source and build dirs, which depend on the checkout's path
+    key_invocation = [
+        arg for arg in sphinx_invocation[:separator_idx] if arg != "--color"
+    ]
+    key = buildcache.compute_cache_key(
+        key_invocation, CACHE_KEY_INPUTS, base_dir=ROOT_DIR
+    )
+    output_dirs = {"build": build_dir, "autosummary": autosummary_dir}
+
+    if not (build_dir / DOCTREES_DIRNAME / "environment.pickle").exists():
+        buildcache.fetch(
+            backend,
+            key,
+            output_dirs=output_dirs,
+            source_dirs=source_dirs,
+            verbose=True,
+        )
+
+    yield
+
+    buildcache.publish(
+        backend,
+        key,
+        output_dirs=output_dirs,
+        source_dirs=source_dirs,
+        verbose=True,
+    )
+
+
 def list_spyder_dev_repos():
     """List the development repos included as subrepos of Spyder."""
     repos = []
@@ -239,7 +378,14 @@ def _execute(session):
     install_tags = set()
     for arg, properties in CANARY_COMMANDS.items():
         cmd = properties["cmd"]
-        if properties["default"] or arg in session.posargs:
+        if (
+            properties["default"]
+            or arg in session.posargs
+            or (
+                arg == "autodoc"
+                and {COMBINED_FLAG, ONLY_OPTION} & set(session.posargs[1:])
+            )
+        ):
             canary_commands[arg] = cmd
         env = properties["env"] if properties["env"] else None
 
@@ -269,6 +415,7 @@ def _execute(session):
 def _install_doc(session, posargs=()):
     """Install the basic documentation and dev dependencies."""
     session.install(f"pre-commit{PRE_COMMIT_VERSION_SPEC}")
+    session.install(f"pytest{PYTEST_VERSION_SPEC}")
     session.install("-r", "requirements.txt", *posargs)
 
 
@@ -370,11 +517,14 @@ def clean(session):
 
 def _sync_spyder(session):
     """Sync the latest docstrings from upstream Spyder into the submodule."""
-    foreach_cmd = ["git", "submodule", "--quiet", "foreach"]
+    # Lean checkouts only fetch the new commits and the blobs they need
     session.run(
-        *foreach_cmd,
-        "git fetch upstream 6.x && git rebase FETCH_HEAD",
-        external=True,
+        "python",
+        str(SCRIPT_DIR / "leansubmodule.py"),
+        "sync",
+        str(SPYDER_PATH),
+        "--branch",
+        SPYDER_BRANCH,
     )
 
 
@@ -534,6 +684,14 @@ def config_submodules(session):
 
 def _init_submodules(session):
     """Initialize and download all Git submodules."""
+    if LEAN_FLAG in session.posargs:
+        session.run(
+            "python",
+            str(SCRIPT_DIR / "leansubmodule.py"),
+            "init",
+            SPYDER_PATH.relative_to(Path.cwd()).as_posix(),
+        )
+        return
     session.run(
         "git",
         "submodule",
@@ -545,7 +703,7 @@ def _init_submodules(session):
 
 @nox.session(name="init-submodules")
 def init_submodules(session):
-    """Initialize and download all Git submodules."""
+    """Initialize and download all Git submodules (--lean for just needed)."""
     _init_submodules(session)
 
 
@@ -572,9 +730,9 @@ def setup(session):
 # ---- Build ---- #
 
 
-def _build(session):
+def _build(session, posargs=None):
     """Execute the docs build."""
-    _docs(session)
+    _docs(session, posargs)
 
 
 @nox.session
@@ -597,12 +755,97 @@ def autorebuild(session):
 # --- Docs --- #
 
 
-def _docs(session):
+def _docs(session, posargs=None):
     """Execute the docs build."""
+    posargs = session.posargs[1:] if posargs is None else posargs
+    no_cache, posargs = extract_flag(posargs, NO_CACHE_FLAG)
+    time_events, posargs = extract_flag(posargs, TIME_EVENTS_FLAG)
+    if time_events:
+        posargs = [*EVENT_TIMING_OPTIONS, *posargs]
+    combined, posargs = extract_flag(posargs, COMBINED_FLAG)
+    changed_since, posargs = extract_option_values(
+        posargs, CHANGED_SINCE_OPTION
+    )
+    only_modules, posargs = extract_option_values(
+        posargs, ONLY_OPTION, split_csv=True
+    )
+    only_options = get_only_options(only_modules)
+    if combined:
+        for option, value in (
+            (CHANGED_SINCE_OPTION, changed_since),
+            (ONLY_OPTION, only_options),
+        ):
+            if value:
+                session.error(f"{option} can't be used with {COMBINED_FLAG}")
+        _docs_combined(session, posargs, use_cache=not no_cache)
+        return
+
+    # Build only some modules separately, to not invalidate the full build
     sphinx_invocation = construct_sphinx_invocation(
-        posargs=session.posargs[1:]
+        posargs=posargs,
+        build_dir=ONLY_HTML_BUILD_DIR if only_options else None,
+        extra_options=only_options,
     )
-    session.run(*sphinx_invocation)
+    with build_cache(sphinx_invocation, enabled=not no_cache):
+        if changed_since:
+            sphinx_invocation += get_changed_docs(
+                session, changed_since[-1], sphinx_invocation
+            )
+        session.run(*sphinx_invocation)
+
+
+def get_changed_docs(session, ref, sphinx_invocation):
+    """Get the source files affected by changes since a Git ref."""
+    build_dir = Path(sphinx_invocation[sphinx_invocation.index("--") + 2])
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = Path(temp_dir) / "changed-docs.json"
+        session.run(
+            "python",
+            str(SCRIPT_DIR / "changeddocs.py"),
+            ref,
+            "--doctree-dir",
+            str(build_dir / DOCTREES_DIRNAME),
+            "--source-dir",
+            str(SOURCE_DIR),
+            "--submodule-dir",
+            str(SPYDER_PATH),
+            "--output",
+            str(output_path),
+        )
+        changed_docs = json.loads(output_path.read_text(encoding="utf-8"))
+    if changed_docs["full"]:
+        return []
+    if not changed_docs["filenames"]:
+        print(
+            f"No documents changed since {ref}; building outdated pages only"
+        )
+    return changed_docs["filenames"]
+
+
+def _docs_combined(session, posargs, *, use_cache=True):
+    """Build the plain and autodoc variants, reading shared pages once."""
+    print("\nBuilding shared pages and plain variant...\n")
+    plain_invocation = construct_sphinx_invocation(
+        posargs=["-t", COMBINED_TAG, *posargs],
+        build_dir=PLAIN_HTML_BUILD_DIR,
+    )
+    with build_cache(plain_invocation, enabled=use_cache):
+        session.run(*plain_invocation)
+
+    print("\nBuilding autodoc variant...\n")
+    autodoc_invocation = construct_sphinx_invocation(
+        posargs=["-t", "autodoc", "-t", COMBINED_TAG, *posargs]
+    )
+    with build_cache(autodoc_invocation, enabled=use_cache):
+        autodoc_doctree_dir = HTML_BUILD_DIR / DOCTREES_DIRNAME
+        if not (autodoc_doctree_dir / "environment.pickle").exists():
+            print("Seeding autodoc environment with shared pages")
+            shutil.copytree(
+                PLAIN_HTML_BUILD_DIR / DOCTREES_DIRNAME,
+                autodoc_doctree_dir,
+                dirs_exist_ok=True,
+            )
+        session.run(*autodoc_invocation)
 
 
 @nox.session
@@ -614,16 +857,25 @@ def docs(session):
 def _docs_autobuild(session):
     """Use Sphinx-Autobuild to rebuild the project and open in browser."""
     session.install("sphinx-autobuild")
+    only_modules, posargs = extract_option_values(
+        session.posargs[1:], ONLY_OPTION, split_csv=True
+    )
+    # Also rebuild on changes to the docstrings of the selected modules
+    module_watch_options = [
+        f"--watch={SPYDER_PATH.joinpath(*module.split('.'))}"
+        for module in only_modules
+    ]
 
     with tempfile.TemporaryDirectory() as destination:
         sphinx_invocation = construct_sphinx_invocation(
-            posargs=session.posargs[1:],
+            posargs=posargs,
             build_dir=destination,
-            extra_options=["-a"],
+            extra_options=["-a", *get_only_options(only_modules)],
             build_invocation=[
                 "sphinx-autobuild",
                 "--port=0",
                 f"--watch={SOURCE_DIR}",
+                *module_watch_options,
                 "--open-browser",
             ],
         )
@@ -636,21 +888,140 @@ def docs_autobuild(session):
     session.notify("_execute", posargs=([_docs_autobuild], *session.posargs))
 
 
-def _build_languages(session):
-    """Build the docs in multiple languages."""
+def _docs_server(session):
+    """Run a build server keeping Sphinx loaded between builds."""
+    session.run(
+        "python",
+        str(SCRIPT_DIR / "builddaemon.py"),
+        "serve",
+        *session.posargs[1:],
+    )
+
+
+@nox.session(name="docs-server")
+def docs_server(session):
+    """Run a local build server for fast repeated builds (see docs-client)."""
+    session.notify("_execute", posargs=([_docs_server], *session.posargs))
+
+
+@nox.session(name="docs-client")
+def docs_client(session):
+    """Build the docs via a running docs-server (--shutdown to stop it)."""
+    # pylint: disable=import-outside-toplevel
+    sys.path.append(str(SCRIPT_DIR))
+    import builddaemon
+
+    shutdown, posargs = extract_flag(session.posargs, "--shutdown")
+    # pylint: disable-next = too-many-try-statements
+    try:
+        if shutdown:
+            status = builddaemon.request_shutdown()
+        else:
+            sphinx_invocation = construct_sphinx_invocation(posargs=posargs)
+            status = builddaemon.request_build(
+                sphinx_invocation[len(BUILD_INVOCATION) :]
+            )
+    except ConnectionRefusedError:
+        session.error("No build server running; start one with docs-server")
+    if status:
+        session.error(f"Build failed with status {status}")
+
+
+def get_translation_coverage(session, languages):
+    """Get how much of each language is translated, writing the report."""
+    session.run(
+        "python",
+        str(SCRIPT_DIR / "translationcoverage.py"),
+        "coverage",
+        *languages,
+        "--source-dir",
+        str(SOURCE_DIR),
+        "--locale-dir",
+        str(LOCALE_DIR),
+        "--pot-dir",
+        str(POT_DIR),
+        "--output",
+        str(TRANSLATION_COVERAGE_PATH),
+    )
+    return json.loads(TRANSLATION_COVERAGE_PATH.read_text(encoding="utf-8"))
+
+
+def _build_languages(session, posargs=None):
+    """Build the docs in the languages translated enough."""
+    # pylint: disable=import-outside-toplevel
+    sys.path.append(str(SCRIPT_DIR))
+    import translationcoverage
+
+    posargs = session.posargs[1:] if posargs is None else posargs
+    no_cache, posargs = extract_flag(posargs, NO_CACHE_FLAG)
     languages, posargs = extract_option_values(
-        session.posargs[1:], ("--lang", "--language"), split_csv=True
+        posargs, ("--lang", "--language"), split_csv=True
+    )
+    min_coverage, posargs = extract_option_values(posargs, MIN_COVERAGE_OPTION)
+    min_coverage = (
+        float(min_coverage[-1]) if min_coverage else MIN_TRANSLATION_COVERAGE
     )
     languages = languages or ALL_LANGUAGES
+    translations = [
+        language for language in languages if language != SOURCE_LANGUAGE
+    ]
+    coverages = (
+        get_translation_coverage(session, translations) if translations else {}
+    )
 
+    source_build_dir = HTML_BUILD_DIR / SOURCE_LANGUAGE
     for language in languages:
+        build_dir = HTML_BUILD_DIR / language
+        coverage = coverages.get(language)
+        if coverage is not None and coverage["coverage"] < min_coverage:
+            print(
+                f"\nNot rendering {language} translation, "
+                f"{coverage['coverage']:.1%} translated (under "
+                f"{min_coverage:.1%})"
+            )
+            # Replace the pages of an earlier build, but keep its URLs working
+            if (source_build_dir / HTML_INDEX_PATH.name).exists():
+                print(f"Reusing the {SOURCE_LANGUAGE} build for all pages\n")
+                if build_dir.exists():
+                    shutil.rmtree(build_dir)
+                shutil.copytree(
+                    source_build_dir,
+                    build_dir,
+                    ignore=shutil.ignore_patterns(DOCTREES_DIRNAME),
+                )
+                continue
+            print(f"No {SOURCE_LANGUAGE} build to reuse; rendering all pages")
+            coverage = None
+
         print(f"\nBuilding {language} translation...\n")
+        filenames = (
+            translationcoverage.get_translated_filenames(
+                coverage,
+                source_dir=SOURCE_DIR,
+                source_build_dir=source_build_dir,
+            )
+            if coverage
+            else []
+        )
         sphinx_invocation = construct_sphinx_invocation(
             posargs=posargs,
-            build_dir=HTML_BUILD_DIR / language,
+            build_dir=build_dir,
             extra_options=["-D", f"language={language}"],
         )
-        session.run(*sphinx_invocation)
+        with build_cache(sphinx_invocation, enabled=not no_cache):
+            session.run(*sphinx_invocation, *filenames)
+            if filenames:
+                session.run(
+                    "python",
+                    str(SCRIPT_DIR / "translationcoverage.py"),
+                    "reuse",
+                    str(HTML_BUILD_DIR / SOURCE_LANGUAGE),
+                    str(build_dir),
+                    "--coverage",
+                    str(TRANSLATION_COVERAGE_PATH),
+                    "--language",
+                    language,
+                )
 
 
 @nox.session(name="build-languages")
@@ -667,6 +1038,174 @@ def build_multilanguage(session):
     )
 
 
+def get_version_ref(session, branch):
+    """Get the Git ref of a version branch, fetching it if not present."""
+    git_cmd = ("git", "rev-parse", "--verify", "--quiet")
+    for attempt in range(2):
+        for ref in (f"origin/{branch}", branch):
+            if session.run(
+                *git_cmd,
+                f"{ref}^{{commit}}",
+                external=True,
+                silent=True,
+                log=False,
+                success_codes=[0, 1],
+            ):
+                return ref
+        if not attempt:
+            session.run(
+                "git",
+                "fetch",
+                "--quiet",
+                "--depth=1",
+                "origin",
+                f"+refs/heads/{branch}:refs/remotes/origin/{branch}",
+                external=True,
+                success_codes=[0, 128],
+            )
+    return None
+
+
+def prepare_version_worktree(session, version, *, with_submodule=False):
+    """Check out a version's branch into its own (reused) Git worktree."""
+    branch = OLDER_VERSIONS[version]
+    ref = get_version_ref(session, branch)
+    if ref is None:
+        session.warn(
+            f"Branch {branch!r} not found; skipping version {version}"
+        )
+        return None
+
+    worktree_dir = WORKTREE_DIR / str(version)
+    session.run("git", "worktree", "prune", external=True)
+    if (worktree_dir / ".git").exists():
+        # Unchanged files keep their mtimes, so rebuilds stay incremental
+        session.run(
+            *("git", "-C", str(worktree_dir), "checkout"),
+            *("--quiet", "--force", "--detach", ref),
+            external=True,
+        )
+    else:
+        session.run(
+            *("git", "worktree", "add", "--quiet", "--force", "--detach"),
+            *(str(worktree_dir), ref),
+            external=True,
+        )
+
+    if not with_submodule:
+        return worktree_dir
+    sys.path.append(str(SCRIPT_DIR))
+    import leansubmodule  # pylint: disable = import-outside-toplevel
+
+    if (SPYDER_PATH / ".git").exists() and leansubmodule.is_lean(SPYDER_PATH):
+        session.run(
+            *("python", str(SCRIPT_DIR / "leansubmodule.py"), "init"),
+            *(SPYDER_PATH.name, "--repo-dir", str(worktree_dir)),
+        )
+        return worktree_dir
+    # Borrow objects from the main submodule rather than cloning anew
+    reference = (
+        ["--reference", str(SPYDER_PATH)]
+        if (SPYDER_PATH / ".git").exists()
+        else []
+    )
+    session.run(
+        *("git", "-C", str(worktree_dir), "submodule", "update"),
+        *("--init", *reference),
+        external=True,
+    )
+    return worktree_dir
+
+
+def _build_versions(session, posargs=None):
+    """Build the older versions of the docs concurrently, from worktrees."""
+    posargs = session.posargs[1:] if posargs is None else posargs
+    no_cache, posargs = extract_flag(posargs, NO_CACHE_FLAG)
+    combined, posargs = extract_flag(posargs, COMBINED_FLAG)
+    __, posargs = extract_option_values(posargs, CHANGED_SINCE_OPTION)
+    if combined:
+        posargs = ["-t", "autodoc", *posargs]
+
+    builds = {}
+    for version in OLDER_VERSIONS:
+        worktree_dir = prepare_version_worktree(
+            session, version, with_submodule="autodoc" in posargs
+        )
+        if worktree_dir is None:
+            continue
+        # Use the current config and extensions, so the versions share the
+        # site chrome and the content-addressed caches of the latest build
+        sphinx_invocation = construct_sphinx_invocation(
+            posargs=posargs,
+            source_dir=worktree_dir / SOURCE_DIR.name,
+            build_dir=HTML_BUILD_DIR / str(version),
+            extra_options=[
+                *("-c", str(SOURCE_DIR)),
+                *("-D", f"version={version}", "-D", f"release={version}"),
+                "-D",
+                f"shared_cache_dir={HTML_BUILD_DIR / DOCTREES_DIRNAME}",
+            ],
+        )
+        builds[version] = (worktree_dir, sphinx_invocation)
+
+    def build_version(version):
+        worktree_dir, sphinx_invocation = builds[version]
+        source_dir = worktree_dir / SOURCE_DIR.name
+        with build_cache(
+            sphinx_invocation,
+            enabled=not no_cache,
+            source_dirs={
+                "docs": source_dir,
+                "spyder": worktree_dir / "spyder" / "spyder" / "api",
+            },
+            autosummary_dir=source_dir / AUTOSUMMARY_DIR.name,
+        ):
+            return session.run(
+                *sphinx_invocation,
+                env={SPYDER_PATH_ENV_VAR: str(worktree_dir / "spyder")},
+                silent=True,
+            )
+
+    # Fetch the inventories once, so the concurrent builds don't each do it
+    if builds:
+        session.run(
+            "python",
+            str(SCRIPT_DIR / "fetchinventories.py"),
+            *("--source-dir", str(SOURCE_DIR)),
+            *("--cache-dir", str(HTML_BUILD_DIR / DOCTREES_DIRNAME)),
+        )
+
+    version_names = ", ".join(str(version) for version in builds)
+    print(f"\nBuilding versions {version_names} concurrently...\n")
+    with ThreadPoolExecutor(max_workers=max(len(builds), 1)) as executor:
+        results = {
+            version: executor.submit(build_version, version)
+            for version in builds
+        }
+    failed = []
+    for version, result in results.items():
+        try:
+            print(f"\nVersion {version} build output:\n{result.result()}")
+        except nox.command.CommandFailed:
+            failed.append(str(version))
+    if failed:
+        session.error(f"Failed to build versions {', '.join(failed)}")
+
+
+@nox.session(name="build-versions")
+def build_versions(session):
+    """Build the older versions of the docs, concurrently."""
+    session.notify("_execute", posargs=([_build_versions], *session.posargs))
+
+
+@nox.session(name="build-multiversion")
+def build_multiversion(session):
+    """Build the latest version, then the older ones reusing its caches."""
+    session.notify(
+        "_execute", posargs=([_build, _build_versions], *session.posargs)
+    )
+
+
 # ---- Deploy ---- #
 
 
@@ -701,8 +1240,17 @@ def _prepare_multiversion(_session=None):
     import safecopy
 
     latest_version_dir = HTML_BUILD_DIR / str(LATEST_VERSION)
+    version_dirnames = {str(version) for version in OLDER_VERSIONS}
     shutil.copytree(
-        HTML_BUILD_DIR, latest_version_dir, copy_function=shutil.move
+        HTML_BUILD_DIR,
+        latest_version_dir,
+        copy_function=shutil.move,
+        # Leave the older versions' builds in place
+        ignore=lambda dirpath, names: (
+            version_dirnames.intersection(names)
+            if Path(dirpath) == HTML_BUILD_DIR
+            else set()
+        ),
     )
     safecopy.copy_dir_if_not_existing(
         source_dir=str(LATEST_VERSION),
@@ -724,18 +1272,248 @@ def prepare_multiversion(_session):
     _prepare_multiversion()
 
 
+def _write_deploy_manifest(session):
+    """Write the deploy manifest and the delta from the last deployment."""
+    session.run(
+        "python",
+        str(SCRIPT_DIR / "deploydelta.py"),
+        "manifest",
+        str(HTML_BUILD_DIR),
+        "--previous",
+        os.environ.get(PREVIOUS_MANIFEST_ENV_VAR)
+        or PREVIOUS_MANIFEST_DEFAULT_LOCATION,
+        "--delta",
+        str(DEPLOY_DELTA_PATH),
+    )
+
+
+@nox.session(name="write-deploy-manifest")
+def write_deploy_manifest(session):
+    """Write the manifest of the built site and its delta for deployment."""
+    session.notify(
+        "_execute", posargs=([_write_deploy_manifest], *session.posargs)
+    )
+
+
+def _prune_assets(session):
+    """Prune unused CSS, subset fonts and defer scripts in the built site."""
+    session.run(
+        "python",
+        str(SCRIPT_DIR / "pruneassets.py"),
+        str(HTML_BUILD_DIR),
+        *session.posargs[1:],
+    )
+
+
+@nox.session(name="prune-assets")
+def prune_assets(session):
+    """Prune the theme assets of the built docs for deployment."""
+    session.notify("_execute", posargs=([_prune_assets], *session.posargs))
+
+
+def _fingerprint_assets(session):
+    """Fingerprint the built site's assets and write its cache headers."""
+    session.run(
+        "python",
+        str(SCRIPT_DIR / "fingerprintassets.py"),
+        str(HTML_BUILD_DIR),
+        *session.posargs[1:],
+    )
+
+
+@nox.session(name="fingerprint-assets")
+def fingerprint_assets(session):
+    """Fingerprint the assets of the built docs for long-lived caching."""
+    session.notify(
+        "_execute", posargs=([_fingerprint_assets], *session.posargs)
+    )
+
+
+def _check_page_weight(session):
+    """Report the heaviest built pages and check them against budgets."""
+    budget_options = [
+        f"--budget={page_type}={budget}"
+        for page_type, budget in PAGE_WEIGHT_BUDGETS.items()
+    ]
+    session.run(
+        "python",
+        str(SCRIPT_DIR / "pageweight.py"),
+        str(HTML_BUILD_DIR),
+        *budget_options,
+        # A copy of the latest version after prepare-multiversion
+        f"--exclude={DEFAULT_VERSION_NAME}",
+        f"--output={PAGE_WEIGHT_REPORT_PATH}",
+        *session.posargs[1:],
+    )
+
+
+@nox.session(name="check-page-weight")
+def check_page_weight(session):
+    """Check the built pages' sizes, with resources, against budgets."""
+    session.notify(
+        "_execute", posargs=([_check_page_weight], *session.posargs)
+    )
+
+
+def _prepare_deployment(session):
+    """Prune and fingerprint the built site's assets, and check its weight."""
+    _prune_assets(session)
+    _fingerprint_assets(session)
+    _check_page_weight(session)
+
+
+@nox.session(name="prepare-deployment")
+def prepare_deployment(session):
+    """Prepare the built docs' assets for deployment, as CI does."""
+    session.notify(
+        "_execute", posargs=([_prepare_deployment], *session.posargs)
+    )
+
+
+def get_shard_dir():
+    """Get the dir the shards of the site are exported to and merged from."""
+    return Path(
+        os.environ.get(SHARD_DIR_ENV_VAR) or SHARD_DEFAULT_DIR
+    ).resolve()
+
+
+def get_part_dirs(part):
+    """Get the dirs of the built site, relative to it, holding a part."""
+    if part == SOURCE_PART:
+        return ["."]
+    if part == VERSIONS_PART:
+        # Versions whose branch wasn't found are skipped by build-versions
+        return [
+            str(version)
+            for version in OLDER_VERSIONS
+            if (HTML_BUILD_DIR / str(version)).is_dir()
+        ]
+    return [part] if (HTML_BUILD_DIR / part).is_dir() else []
+
+
+def _build_shard(session):
+    """Build some parts of the site and export them as a shard."""
+    parts, posargs = extract_option_values(
+        session.posargs[1:], PART_OPTION, split_csv=True
+    )
+    unknown_parts = sorted(set(parts) - set(SHARD_PARTS))
+    if not parts or unknown_parts:
+        session.error(
+            f"Pass {PART_OPTION} with some of {', '.join(SHARD_PARTS)}"
+            + (f", not {', '.join(unknown_parts)}" if unknown_parts else "")
+        )
+    parts = [part for part in SHARD_PARTS if part in parts]
+
+    if SOURCE_PART in parts:
+        _build(session, posargs)
+    languages = [part for part in parts if part in ALL_LANGUAGES]
+    if languages:
+        _build_languages(session, ["--lang", ",".join(languages), *posargs])
+    if VERSIONS_PART in parts:
+        _build_versions(session, posargs)
+
+    # The root part must leave out the dirs the other parts are built to
+    reserved_dirs = [
+        *ALL_LANGUAGES,
+        *(str(version) for version in OLDER_VERSIONS),
+        str(LATEST_VERSION),
+        DEFAULT_VERSION_NAME,
+    ]
+    session.run(
+        "python",
+        str(SCRIPT_DIR / "buildshards.py"),
+        "export",
+        str(HTML_BUILD_DIR),
+        str(get_shard_dir() / "-".join(parts)),
+        *(f"--part={part}={','.join(get_part_dirs(part))}" for part in parts),
+        *(f"--reserve={dirname}" for dirname in reserved_dirs),
+    )
+
+
+@nox.session(name="build-shard")
+def build_shard(session):
+    """Build parts of the site (pass '--part') as a shard to merge later."""
+    session.notify("_execute", posargs=([_build_shard], *session.posargs))
+
+
+def _merge_shards(session):
+    """Merge the shards into the built site, checking none is missing."""
+    shard_dir = get_shard_dir()
+    shard_dirs = (
+        sorted(path for path in shard_dir.iterdir() if path.is_dir())
+        if shard_dir.is_dir()
+        else []
+    )
+    if not shard_dirs:
+        session.error(f"No shards in {shard_dir}; build them with build-shard")
+    session.run(
+        "python",
+        str(SCRIPT_DIR / "buildshards.py"),
+        "merge",
+        *(str(path) for path in shard_dirs),
+        f"--output={HTML_BUILD_DIR}",
+        f"--expect={','.join(SHARD_PARTS)}",
+        "--clean",
+    )
+
+
+@nox.session(name="merge-shards")
+def merge_shards(session):
+    """Merge the built shards and prepare the site for deployment."""
+    session.notify(
+        "_execute",
+        posargs=(
+            [
+                _merge_shards,
+                _prepare_multiversion,
+                _prepare_deployment,
+                _write_deploy_manifest,
+            ],
+            *session.posargs,
+        ),
+    )
+
+
 @nox.session(name="build-deployment")
 def build_deployment(session):
     """Build and prepare the project for production deployment."""
     session.notify(
         "_execute",
         posargs=(
-            [_build, _build_languages, _prepare_multiversion],
+            [
+                _build,
+                _build_languages,
+                _build_versions,
+                _prepare_multiversion,
+                _prepare_deployment,
+                _write_deploy_manifest,
+            ],
             *session.posargs,
         ),
     )
 
 
+def _deploy(session):
+    """Apply the deploy delta to a target dir or Git branch."""
+    session.run(
+        "python",
+        str(SCRIPT_DIR / "deploydelta.py"),
+        "apply",
+        str(HTML_BUILD_DIR),
+        "--delta",
+        str(DEPLOY_DELTA_PATH),
+        "--branch",
+        DEPLOY_BRANCH,
+        *session.posargs[1:],
+    )
+
+
+@nox.session
+def deploy(session):
+    """Deploy only what changed (pass '--target-dir' or '--repo')."""
+    session.notify("_execute", posargs=([_deploy], *session.posargs))
+
+
 # ---- Check ---- #
 
 
@@ -788,6 +1566,19 @@ def lint(session):
     session.notify("_execute", posargs=([_lint], *session.posargs))
 
 
+def _test(session):
+    """Run the tests of the build scripts and Sphinx extensions."""
+    session.run(
+        "python", "-m", "pytest", *(session.posargs[1:] or [str(TEST_DIR)])
+    )
+
+
+@nox.session
+def test(session):
+    """Run the tests (passes through args to pytest)."""
+    session.notify("_execute", posargs=([_test], *session.posargs))
+
+
 def _linkcheck(session):
     """Run Sphinx linkcheck on the docs."""
     sphinx_invocation = construct_sphinx_invocation(
@@ -802,6 +1593,36 @@ def linkcheck(session):
     session.notify("_execute", posargs=([_linkcheck], *session.posargs))
 
 
+def _profile_startup(session):
+    """Report the import and setup time of conf.py and each extension."""
+    session.run(
+        "python",
+        str(SCRIPT_DIR / "profilestartup.py"),
+        "--source-dir",
+        str(SOURCE_DIR),
+        *session.posargs[1:],
+    )
+
+
+@nox.session(name="profile-startup")
+def profile_startup(session):
+    """Profile the docs build start-up time (pass -t to set tags)."""
+    session.notify("_execute", posargs=([_profile_startup], *session.posargs))
+
+
+def _benchmark_plugin(session):
+    """Time the tutorial plugin's start-up steps against a stand-in host."""
+    session.run(
+        "python", str(SCRIPT_DIR / "benchmarkplugin.py"), *session.posargs[1:]
+    )
+
+
+@nox.session(name="benchmark-plugin")
+def benchmark_plugin(session):
+    """Benchmark a plugin's start-up (and a task, passed with --task)."""
+    session.notify("_execute", posargs=([_benchmark_plugin], *session.posargs))
+
+
 # ---- Translation ---- #
 
 
@@ -845,6 +1666,22 @@ def update_pot(session):
     )
 
 
+def _translation_coverage(session):
+    """Report how much of each language is translated."""
+    languages, __ = extract_option_values(
+        session.posargs[1:], ("--lang", "--language"), split_csv=True
+    )
+    get_translation_coverage(session, languages or TRANSLATION_LANGUAGES)
+
+
+@nox.session(name="translation-coverage")
+def translation_coverage(session):
+    """Report the translation coverage of each language (see '--lang')."""
+    session.notify(
+        "_execute", posargs=([_translation_coverage], *session.posargs)
+    )
+
+
 def _update_po(session):
     """Run sphinx-intl update to update po files from pot for languages."""
     session.install("sphinx-intl")
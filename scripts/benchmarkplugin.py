@@ -0,0 +1,710 @@
+"""Time a Spyder plugin's start-up and tasks, against a stand-in host."""
+
+# Standard library imports
+import argparse
+import contextlib
+import functools
+import importlib
+import io
+import json
+import queue
+import statistics
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+# Local imports
+import plaintable
+
+
+# --- Constants --- #
+
+DEFAULT_PLUGIN = "my_spyder_plugin.plugin:MySpyderPlugin"
+DEFAULT_PLUGIN_PATH = (
+    Path(__file__).resolve().parents[1] / "tutorial" / "my-spyder-plugin"
+)
+DEFAULT_ROUNDS = 20
+# In the order Spyder goes through them when loading a plugin
+STEPS = (
+    ("import", "Import plugin module"),
+    ("init", "Create plugin"),
+    ("metadata", "Get name, description and icon"),
+    ("register", "Register (plugin's own code)"),
+    ("create_action", "  create_action"),
+    ("create_icon", "  create_icon"),
+    ("get_plugin", "  get_plugin"),
+    ("menu", "  Insert into menus"),
+)
+TABLE_HEADER = ("Step", "Calls", "First (ms)", "Median (ms)", "Max (ms)")
+DEFAULT_TICK = 10
+# Ticks to keep running after a task is done, for its last signals to arrive
+FINISH_GRACE_TICKS = 5
+
+
+# --- Stand-in Qt --- #
+
+
+class StandInEventLoop:
+    """Run calls posted from other threads on the main thread, when asked.
+
+    This is how Qt delivers signals emitted from other threads to the
+    objects living in the main thread.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def post(self, func, args):
+        """Call a function on the main thread, right away if already on it."""
+        if threading.current_thread() is threading.main_thread():
+            func(*args)
+        else:
+            self._queue.put((func, args))
+
+    def process_events(self):
+        """Run the calls posted so far, returning how many were run."""
+        event_count = 0
+        while True:
+            try:
+                func, args = self._queue.get_nowait()
+            except queue.Empty:
+                return event_count
+            func(*args)
+            event_count += 1
+
+
+EVENT_LOOP = StandInEventLoop()
+
+
+class Signal:
+    """Stand-in for Qt signals, with their slots called on the main thread."""
+
+    def __init__(self, *arg_types):
+        self.arg_types = arg_types
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return instance.__dict__.setdefault(
+            f"_signal_{self.name}", BoundSignal()
+        )
+
+
+class BoundSignal:
+    """The signal of an object, holding its connected slots."""
+
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        """Connect a slot to the signal."""
+        self.slots.append(slot)
+
+    def disconnect(self, slot):
+        """Disconnect a slot from the signal."""
+        self.slots.remove(slot)
+
+    def emit(self, *args):
+        """Call the connected slots with the arguments, on the main thread."""
+        for slot in self.slots:
+            EVENT_LOOP.post(slot, args)
+
+
+# --- Stand-in Spyder host --- #
+
+# Named as in Spyder, for plugins to use them the same way
+# pylint: disable = invalid-name
+
+
+class Plugins:
+    """Stand-in for the names of Spyder's core plugins."""
+
+    Core = "core"
+
+
+class ApplicationMenus:
+    """Stand-in for the names of Spyder's application menus."""
+
+    File = "file_menu"
+    Edit = "edit_menu"
+    Tools = "tools_menu"
+    View = "view_menu"
+    Help = "help_menu"
+
+
+class HelpMenuSections:
+    """Stand-in for the sections of Spyder's Help menu."""
+
+    Documentation = "documentation_section"
+    Support = "support_section"
+    About = "about_section"
+
+
+class StandInIcon:
+    """An icon, named but never loaded from an icon font."""
+
+    def __init__(self, name):
+        self.name = name
+
+
+class StandInAction:
+    """An action, holding what it was created with but drawing nothing."""
+
+    def __init__(self, name, text, *, icon=None, triggered=None, **kwargs):
+        self.name = name
+        self.text = text
+        self.icon = icon
+        self.triggered = triggered
+        self.options = kwargs
+
+
+class StandInMenu:
+    """An application menu, listing its items by section."""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = []
+
+
+class StandInCore:
+    """Stand-in for the Core plugin, which holds the application menus."""
+
+    NAME = Plugins.Core
+
+    def __init__(self):
+        self.menus = {}
+
+    def get_application_menu(self, menu_id):
+        """Get an application menu by name, creating it if needed."""
+        return self.menus.setdefault(menu_id, StandInMenu(menu_id))
+
+    def add_item_to_application_menu(
+        self, item, menu=None, section=None, before=None
+    ):
+        """Add an item to an application menu, given by name or itself."""
+        if not isinstance(menu, StandInMenu):
+            menu = self.get_application_menu(menu)
+        menu.items.append((section, item, before))
+
+
+class StandInMainWindow:
+    """The stand-in host the plugins are loaded in."""
+
+    def __init__(self):
+        self.core = StandInCore()
+
+    def get_plugin(self, plugin_name):
+        """Get a loaded plugin, or an application menu by its name.
+
+        The tutorial plugin looks the Help menu up as a plugin.
+        """
+        if plugin_name == Plugins.Core:
+            return self.core
+        if plugin_name in vars(ApplicationMenus).values():
+            return self.core.get_application_menu(plugin_name)
+        raise KeyError(f"No stand-in for plugin {plugin_name!r}")
+
+
+class SpyderPluginV2:
+    """Stand-in for Spyder's plugin base class, without Qt or a display."""
+
+    NAME = None
+    REQUIRES = []
+    OPTIONAL = []
+
+    def __init__(self, parent=None, configuration=None):
+        self.main = parent
+        self.configuration = configuration
+        self.actions = {}
+        self.icons = []
+        self.status_messages = []
+
+    def create_action(self, name, text, **kwargs):
+        """Create an action, registered by name on the plugin."""
+        action = StandInAction(name, text, **kwargs)
+        self.actions[name] = action
+        return action
+
+    def create_icon(self, name):
+        """Create an icon by name."""
+        icon = StandInIcon(name)
+        self.icons.append(icon)
+        return icon
+
+    def get_plugin(self, plugin_name):
+        """Get a plugin from the host."""
+        return self.main.get_plugin(plugin_name)
+
+    def show_status_message(self, message, timeout=0):
+        """Show a message in the status bar, noting if on the main thread."""
+        on_main_thread = threading.current_thread() is threading.main_thread()
+        self.status_messages.append((message, timeout, on_main_thread))
+
+    def on_close(self, cancelable=False):
+        """Stop the plugin's work as Spyder closes."""
+        del cancelable
+        return True
+
+
+# pylint: enable = invalid-name
+
+
+def create_stand_in_modules():
+    """Create the Spyder and Qt modules a plugin imports, as stand-ins."""
+    modules = {
+        name: types.ModuleType(name)
+        for name in (
+            "spyder",
+            "spyder.api",
+            "spyder.api.plugins",
+            "spyder.plugins",
+            "spyder.plugins.core",
+            "spyder.plugins.core.api",
+            "qtpy",
+            "qtpy.QtCore",
+        )
+    }
+    modules["qtpy.QtCore"].Signal = Signal
+    modules["spyder.api.plugins"].Plugins = Plugins
+    modules["spyder.api.plugins"].SpyderPluginV2 = SpyderPluginV2
+    modules["spyder.plugins.core.api"].ApplicationMenus = ApplicationMenus
+    modules["spyder.plugins.core.api"].HelpMenuSections = HelpMenuSections
+    for name, module in modules.items():
+        parent_name, __, child_name = name.rpartition(".")
+        if parent_name:
+            setattr(modules[parent_name], child_name, module)
+    return modules
+
+
+@contextlib.contextmanager
+def stand_in_spyder():
+    """Make the stand-in Spyder modules importable, restoring any after."""
+    modules = create_stand_in_modules()
+    saved_modules = {name: sys.modules.get(name) for name in modules}
+    sys.modules.update(modules)
+    try:
+        yield
+    finally:
+        for name, module in saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+# --- Benchmarking --- #
+
+
+class StepTimer:
+    """Record the time of each step, less that of the steps nested in it."""
+
+    def __init__(self):
+        self.times = {}
+        self.calls = {}
+        self._nested_times = [0.0]
+
+    def wrap(self, step, func):
+        """Wrap a function to time its calls as a step."""
+
+        @functools.wraps(func)
+        def timed_func(*args, **kwargs):
+            self._nested_times.append(0.0)
+            start_time = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                total_time = time.perf_counter() - start_time
+                nested_time = self._nested_times.pop()
+                self._nested_times[-1] += total_time
+                self.times[step] = (
+                    self.times.get(step, 0.0) + total_time - nested_time
+                )
+                self.calls[step] = self.calls.get(step, 0) + 1
+
+        return timed_func
+
+
+@contextlib.contextmanager
+def timed_host_calls(timer):
+    """Time the calls the plugin makes to the stand-in host."""
+    patches = [
+        (SpyderPluginV2, "create_action", "create_action"),
+        (SpyderPluginV2, "create_icon", "create_icon"),
+        (SpyderPluginV2, "get_plugin", "get_plugin"),
+        (StandInCore, "add_item_to_application_menu", "menu"),
+    ]
+    originals = [getattr(cls, name) for cls, name, __ in patches]
+    for (cls, name, step), original in zip(patches, originals):
+        setattr(cls, name, timer.wrap(step, original))
+    try:
+        yield
+    finally:
+        for (cls, name, __), original in zip(patches, originals):
+            setattr(cls, name, original)
+
+
+def unload_package(module_name):
+    """Remove a module's top-level package from the imported modules."""
+    package_name = module_name.partition(".")[0]
+    for name in list(sys.modules):
+        if name == package_name or name.startswith(f"{package_name}."):
+            del sys.modules[name]
+
+
+def load_plugin(module_name, class_name, timer):
+    """Import, create and register a plugin in a new stand-in host."""
+    unload_package(module_name)
+    module = timer.wrap("import", importlib.import_module)(module_name)
+    plugin_class = getattr(module, class_name)
+
+    main_window = StandInMainWindow()
+    plugin = timer.wrap("init", plugin_class)(parent=main_window)
+    with timed_host_calls(timer):
+        timer.wrap("metadata", get_metadata)(plugin)
+        required = [main_window.get_plugin(name) for name in plugin.REQUIRES]
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            timer.wrap("register", plugin.register)(*required)
+    return main_window, plugin, output.getvalue()
+
+
+def get_metadata(plugin):
+    """Get what Spyder shows of a plugin before registering it."""
+    return plugin.get_name(), plugin.get_description(), plugin.get_icon()
+
+
+@contextlib.contextmanager
+def plugin_environment(module_name, plugin_path=None):
+    """Make a plugin importable with the stand-ins, unloading it after."""
+    if plugin_path:
+        sys.path.insert(0, str(plugin_path))
+    with stand_in_spyder():
+        try:
+            yield
+        finally:
+            if plugin_path:
+                sys.path.remove(str(plugin_path))
+            unload_package(module_name)
+
+
+def benchmark_plugin(plugin_spec, *, plugin_path=None, rounds=DEFAULT_ROUNDS):
+    """Load a plugin a number of times, timing each step of its start-up.
+
+    The plugin package is imported afresh each round, with the first round
+    also paying for compiling it and importing its dependencies.
+    """
+    module_name, __, class_name = plugin_spec.partition(":")
+    timings = []
+    with plugin_environment(module_name, plugin_path):
+        for __ in range(rounds):
+            timer = StepTimer()
+            main_window, plugin, output = load_plugin(
+                module_name, class_name, timer
+            )
+            plugin.on_close()
+            timings.append({"times": timer.times, "calls": timer.calls})
+
+    menu_items = sum(
+        len(menu.items) for menu in main_window.core.menus.values()
+    )
+    return {
+        "plugin": plugin_spec,
+        "rounds": timings,
+        "created": {
+            "actions": len(plugin.actions),
+            "icons": len(plugin.icons),
+            "menu_items": menu_items,
+            "printed_lines": len(output.splitlines()),
+        },
+    }
+
+
+def summarize(report):
+    """Get the calls and first, median and max time of each step."""
+    step_times = {
+        step: [timing["times"].get(step, 0.0) for timing in report["rounds"]]
+        for step, __ in STEPS
+    }
+    step_times["total"] = [
+        sum(timing["times"].values()) for timing in report["rounds"]
+    ]
+    summary = {}
+    for step, times in step_times.items():
+        summary[step] = {
+            "calls": report["rounds"][0]["calls"].get(step, 0),
+            "first": times[0],
+            "median": statistics.median(times),
+            "max": max(times),
+        }
+    return summary
+
+
+def format_report(report, summary):
+    """Format a start-up report as a plain-text table of its steps."""
+    table_rows = [
+        (
+            label,
+            str(summary[step]["calls"]) if step != "total" else "",
+            *(
+                f"{summary[step][key] * 1000:.3f}"
+                for key in ("first", "median", "max")
+            ),
+        )
+        for step, label in (*STEPS, ("total", "Total"))
+    ]
+    created = report["created"]
+    lines = [
+        f"Plugin: {report['plugin']} ({len(report['rounds'])} rounds)",
+        "",
+    ]
+    lines.append(plaintable.format_table(TABLE_HEADER, table_rows))
+    lines += [
+        "",
+        f"Created {created['actions']} actions and {created['icons']} "
+        f"icons, added {created['menu_items']} menu items and printed "
+        f"{created['printed_lines']} lines.",
+        "Host calls are near-free stand-ins; in Spyder, each also costs "
+        + "the Qt work behind it.",
+    ]
+    return "\n".join(lines)
+
+
+# --- Responsiveness --- #
+
+
+def run_task(
+    plugin, task_name, *, cancel_name=None, cancel_after=None, tick=0.01
+):
+    """Run a plugin's background task, timing how often the UI could run.
+
+    The task method must return a concurrent.futures.Future. Every tick,
+    the main thread runs the calls posted to it, like Qt's event loop does,
+    so how late each tick comes is how long the UI would have been frozen.
+    """
+    finish_times = []
+    start_time = time.perf_counter()
+    future = getattr(plugin, task_name)()
+    start_call_time = time.perf_counter() - start_time
+    future.add_done_callback(
+        lambda __: finish_times.append(time.perf_counter())
+    )
+
+    latencies = []
+    event_count = 0
+    cancel_time = None
+    grace_ticks = FINISH_GRACE_TICKS
+    next_tick_time = time.perf_counter() + tick
+    while grace_ticks:
+        time.sleep(max(0.0, next_tick_time - time.perf_counter()))
+        tick_time = time.perf_counter()
+        event_count += EVENT_LOOP.process_events()
+        if (
+            cancel_after is not None
+            and cancel_time is None
+            and not future.done()
+            and tick_time - start_time >= cancel_after
+        ):
+            getattr(plugin, cancel_name)()
+            cancel_time = tick_time - start_time
+        latencies.append(time.perf_counter() - next_tick_time)
+        next_tick_time = time.perf_counter() + tick
+        if future.done():
+            grace_ticks -= 1
+
+    return {
+        "task": task_name,
+        "start_call": start_call_time,
+        "duration": finish_times[0] - start_time,
+        "cancelled_after": cancel_time,
+        "error": repr(future.exception()) if future.exception() else None,
+        "tick": tick,
+        "ticks": len(latencies),
+        "latency": {
+            "median": statistics.median(latencies),
+            "p95": statistics.quantiles(latencies, n=20, method="inclusive")[
+                -1
+            ],
+            "max": max(latencies),
+        },
+        "delivered_calls": event_count,
+        "status_messages": [
+            message for message, __, __ in plugin.status_messages
+        ],
+        "off_main_thread": sum(
+            not on_main_thread
+            for __, __, on_main_thread in plugin.status_messages
+        ),
+    }
+
+
+def measure_responsiveness(
+    plugin_spec, task_name, *, plugin_path=None, **kwargs
+):
+    """Load a plugin and run one of its tasks, timing the main thread."""
+    module_name, __, class_name = plugin_spec.partition(":")
+    with plugin_environment(module_name, plugin_path):
+        __, plugin, __ = load_plugin(module_name, class_name, StepTimer())
+        try:
+            return run_task(plugin, task_name, **kwargs)
+        finally:
+            plugin.on_close()
+
+
+def format_task_report(task_report):
+    """Format a responsiveness report as plain text."""
+    latency = task_report["latency"]
+    cancelled_after = task_report["cancelled_after"]
+    if task_report["error"]:
+        outcome = f"failed with {task_report['error']}"
+    elif cancelled_after is not None:
+        outcome = f"cancelled after {cancelled_after * 1000:.1f} ms"
+    else:
+        outcome = "completed"
+    messages = task_report["status_messages"]
+    start_call_ms = task_report["start_call"] * 1000
+    duration_ms = task_report["duration"] * 1000
+    return "\n".join(
+        [
+            f"Task: {task_report['task']} ({outcome})",
+            "",
+            f"Start task (blocking): {start_call_ms:9.3f} ms",
+            f"Task duration:         {duration_ms:9.3f} ms",
+            f"Main thread ticks:     {task_report['ticks']:9d} "
+            f"(every {task_report['tick'] * 1000:g} ms)",
+            f"Tick latency, median:  {latency['median'] * 1000:9.3f} ms",
+            f"Tick latency, 95%:     {latency['p95'] * 1000:9.3f} ms",
+            f"Tick latency, max:     {latency['max'] * 1000:9.3f} ms",
+            "",
+            f"Delivered {task_report['delivered_calls']} calls from other "
+            f"threads to the main thread and showed {len(messages)} status "
+            f"messages, {task_report['off_main_thread']} of them from "
+            "other threads.",
+            f"Last status message: {messages[-1] if messages else None}",
+        ]
+    )
+
+
+def check_budgets(args, summary, task_report):
+    """Get the problems with a benchmark, against the budgets given."""
+    problems = []
+    median_total = summary["total"]["median"] * 1000
+    if args.budget is not None and median_total > args.budget:
+        problems.append(
+            f"Median start-up time {median_total:.3f} ms is over the "
+            f"budget of {args.budget:.3f} ms"
+        )
+    if task_report is None:
+        return problems
+    # Doing the work in the method starting it blocks the UI just the same
+    max_latency = (
+        max(task_report["latency"]["max"], task_report["start_call"]) * 1000
+    )
+    if args.max_latency is not None and max_latency > args.max_latency:
+        problems.append(
+            f"The main thread was blocked for up to {max_latency:.3f} ms, "
+            f"over the limit of {args.max_latency:.3f} ms"
+        )
+    if task_report["off_main_thread"]:
+        problems.append(
+            f"{task_report['off_main_thread']} status messages were shown "
+            "from other threads than the main one"
+        )
+    if task_report["error"]:
+        problems.append(f"The task failed with {task_report['error']}")
+    return problems
+
+
+def main(argv=None):
+    """Benchmark a plugin's start-up and print a report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "plugin",
+        nargs="?",
+        default=DEFAULT_PLUGIN,
+        help=f"plugin class, as module:Class (default: {DEFAULT_PLUGIN})",
+    )
+    parser.add_argument(
+        "--path",
+        default=DEFAULT_PLUGIN_PATH,
+        help="dir to import the plugin from (default: the tutorial plugin)",
+    )
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="fail if the median total start-up time is over this, in ms",
+    )
+    parser.add_argument(
+        "--task",
+        help="plugin method starting a background task and returning its "
+        "future, to check the main thread stays responsive while it runs",
+    )
+    parser.add_argument("--cancel", help="plugin method cancelling the task")
+    parser.add_argument(
+        "--cancel-after",
+        type=float,
+        default=None,
+        help="ms after starting the task to cancel it",
+    )
+    parser.add_argument(
+        "--tick",
+        type=float,
+        default=DEFAULT_TICK,
+        help=f"ms between main thread ticks (default: {DEFAULT_TICK})",
+    )
+    parser.add_argument(
+        "--max-latency",
+        type=float,
+        default=None,
+        help="fail if a main thread tick is later than this while the task "
+        "runs, in ms",
+    )
+    parser.add_argument("--output", help="path to write the report JSON to")
+    args = parser.parse_args(argv)
+    if args.cancel_after is not None and not args.cancel:
+        parser.error("--cancel-after needs the --cancel method")
+
+    plugin_path = Path(args.path).resolve()
+    report = benchmark_plugin(
+        args.plugin, plugin_path=plugin_path, rounds=max(args.rounds, 1)
+    )
+    summary = summarize(report)
+    print(format_report(report, summary))
+
+    task_report = None
+    if args.task:
+        task_report = measure_responsiveness(
+            args.plugin,
+            args.task,
+            plugin_path=plugin_path,
+            cancel_name=args.cancel,
+            cancel_after=(
+                None if args.cancel_after is None else args.cancel_after / 1000
+            ),
+            tick=args.tick / 1000,
+        )
+        print(f"\n{format_task_report(task_report)}")
+
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps(
+                {**report, "summary": summary, "task": task_report}, indent=2
+            ),
+            encoding="utf-8",
+        )
+
+    problems = check_budgets(args, summary, task_report)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
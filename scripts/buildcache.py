@@ -0,0 +1,383 @@
+"""Content-addressed cache of Sphinx build outputs, shared between builds."""
+
+# Standard library imports
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+
+# --- Constants --- #
+
+CACHE_VERSION = 1
+HASH_ALGORITHM = "sha256"
+HASH_CHUNK_SIZE = 2**20
+OBJECTS_DIRNAME = "objects"
+MANIFESTS_DIRNAME = "manifests"
+SOURCE_EXCLUDE_DIRS = {"_build", "_autosummary", "__pycache__", ".git"}
+# Manifests kept when saving, the most recently used first
+MAX_MANIFESTS = 20
+# Unreferenced objects younger than this may be about to be referenced by a
+# build publishing concurrently, so aren't removed yet
+OBJECT_GRACE_PERIOD = 60 * 60
+
+
+# --- Hashing --- #
+
+
+def hash_file(path):
+    """Return the hex content hash of a file, read in chunks."""
+    file_hash = hashlib.new(HASH_ALGORITHM)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def make_relative(text, base_dir):
+    """Replace the base dir in a path or option with a relative one."""
+    base_dir = str(base_dir)
+    if text == base_dir:
+        return "."
+    return text.replace(base_dir + os.sep, "")
+
+
+def compute_cache_key(invocation, input_paths=(), *, base_dir=None):
+    """Compute the cache key for a build invocation and its global inputs.
+
+    Paths under the base dir (e.g. the repo root) are hashed relative to it,
+    so checkouts at other paths share the key.
+    """
+    key_hash = hashlib.new(HASH_ALGORITHM)
+    key_hash.update(f"v{CACHE_VERSION}\0".encode())
+    if base_dir is not None:
+        invocation = [make_relative(str(arg), base_dir) for arg in invocation]
+    key_hash.update("\0".join(str(arg) for arg in invocation).encode())
+    for input_path in sorted(Path(path) for path in input_paths):
+        paths = (
+            sorted(
+                p
+                for p in input_path.rglob("*")
+                if p.is_file()
+                and not SOURCE_EXCLUDE_DIRS.intersection(
+                    p.relative_to(input_path).parts
+                )
+            )
+            if input_path.is_dir()
+            else [input_path] if input_path.exists() else []
+        )
+        for path in paths:
+            key_path = path.as_posix()
+            if base_dir is not None and path.is_relative_to(base_dir):
+                key_path = path.relative_to(base_dir).as_posix()
+            key_hash.update(f"\0{key_path}\0".encode())
+            key_hash.update(hash_file(path).encode())
+    return key_hash.hexdigest()
+
+
+def snapshot_dir(base_dir, *, exclude_dirs=()):
+    """Map each file under a dir to its content hash and mtime.
+
+    Nested build output dirs (e.g. translations) are skipped, as they are
+    cached separately under their own key.
+    """
+    base_dir = Path(base_dir)
+    snapshot = {}
+    if not base_dir.is_dir():
+        return snapshot
+    for dirpath, dirnames, filenames in os.walk(base_dir):
+        dirnames[:] = sorted(
+            dirname
+            for dirname in dirnames
+            if dirname not in exclude_dirs
+            and not (Path(dirpath) / dirname / ".doctrees").is_dir()
+        )
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            if path.is_symlink():
+                continue
+            relpath = path.relative_to(base_dir).as_posix()
+            snapshot[relpath] = [hash_file(path), path.stat().st_mtime_ns]
+    return snapshot
+
+
+# --- Backends --- #
+
+
+class CacheBackend:
+    """Base class for cache storage backends."""
+
+    def has_object(self, object_hash):
+        """Return whether an object with the given hash is stored."""
+        raise NotImplementedError
+
+    def get_object(self, object_hash, target_path):
+        """Copy the stored object with the given hash to the target path."""
+        raise NotImplementedError
+
+    def put_object(self, object_hash, source_path):
+        """Store the file at the source path under the given hash."""
+        raise NotImplementedError
+
+    def get_manifest(self, key):
+        """Return the manifest stored under the given key, or None."""
+        raise NotImplementedError
+
+    def put_manifest(self, key, manifest):
+        """Store a manifest under the given key."""
+        raise NotImplementedError
+
+    def touch_manifest(self, key):
+        """Mark the manifest stored under the given key as just used."""
+        raise NotImplementedError
+
+    def list_manifests(self):
+        """Return the keys of the stored manifests, last used first."""
+        raise NotImplementedError
+
+    def delete_manifest(self, key):
+        """Remove the manifest stored under the given key."""
+        raise NotImplementedError
+
+    def list_objects(self, *, older_than=None):
+        """Return the hashes of the stored objects, optionally by age (s)."""
+        raise NotImplementedError
+
+    def delete_object(self, object_hash):
+        """Remove the stored object with the given hash."""
+        raise NotImplementedError
+
+
+class LocalDirectoryBackend(CacheBackend):
+    """Store the cache in a local (or mounted shared) directory."""
+
+    def __init__(self, root):
+        self.root = Path(root).expanduser().resolve()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.root.as_posix()!r})"
+
+    def _object_path(self, object_hash):
+        return self.root / OBJECTS_DIRNAME / object_hash[:2] / object_hash[2:]
+
+    def _manifest_path(self, key):
+        return self.root / MANIFESTS_DIRNAME / f"{key}.json"
+
+    @staticmethod
+    def _atomic_write(target_path, write_func):
+        """Write to a temp file next to the target and move it into place."""
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(
+            dir=target_path.parent, prefix=f".{target_path.name}."
+        )
+        # pylint: disable-next = too-many-try-statements
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                write_func(temp_file)
+            os.replace(temp_path, target_path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+    def has_object(self, object_hash):
+        return self._object_path(object_hash).is_file()
+
+    def get_object(self, object_hash, target_path):
+        target_path = Path(target_path)
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(self._object_path(object_hash), target_path)
+
+    def put_object(self, object_hash, source_path):
+        if self.has_object(object_hash):
+            # Reused objects count as new, for the grace period
+            os.utime(self._object_path(object_hash))
+            return
+        with open(source_path, "rb") as source_file:
+            self._atomic_write(
+                self._object_path(object_hash),
+                lambda temp_file: shutil.copyfileobj(source_file, temp_file),
+            )
+
+    def get_manifest(self, key):
+        # pylint: disable-next = too-many-try-statements
+        try:
+            with open(self._manifest_path(key), encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def put_manifest(self, key, manifest):
+        data = json.dumps(manifest, indent=1, sort_keys=True).encode()
+        self._atomic_write(
+            self._manifest_path(key), lambda temp_file: temp_file.write(data)
+        )
+
+    def touch_manifest(self, key):
+        self._manifest_path(key).touch()
+
+    def list_manifests(self):
+        manifest_paths = (self.root / MANIFESTS_DIRNAME).glob("*.json")
+        return [
+            path.stem
+            for path in sorted(
+                manifest_paths, key=lambda path: path.stat().st_mtime_ns
+            )[::-1]
+        ]
+
+    def delete_manifest(self, key):
+        self._manifest_path(key).unlink(missing_ok=True)
+
+    def list_objects(self, *, older_than=None):
+        min_age_time = time.time() - (older_than or 0)
+        return [
+            f"{path.parent.name}{path.name}"
+            for path in (self.root / OBJECTS_DIRNAME).glob("*/*")
+            if not path.name.startswith(".")
+            and (older_than is None or path.stat().st_mtime < min_age_time)
+        ]
+
+    def delete_object(self, object_hash):
+        self._object_path(object_hash).unlink(missing_ok=True)
+
+
+BACKENDS = {
+    "file": LocalDirectoryBackend,
+}
+
+
+def get_backend(location):
+    """Get a cache backend from a location, e.g. a path or file:// URL."""
+    location = str(location)
+    scheme, sep, path = location.partition("://")
+    if not sep:
+        scheme, path = "file", location
+    try:
+        backend_class = BACKENDS[scheme]
+    except KeyError:
+        raise ValueError(
+            f"Unknown build cache backend {scheme!r} "
+            f"(available: {', '.join(BACKENDS)})"
+        ) from None
+    return backend_class(path)
+
+
+# --- Fetch and publish --- #
+
+
+def collect_garbage(
+    backend,
+    *,
+    max_manifests=MAX_MANIFESTS,
+    grace_period=OBJECT_GRACE_PERIOD,
+    verbose=False,
+):
+    """Evict the least recently used manifests, and the objects left over."""
+    keys = backend.list_manifests()
+    for key in keys[max_manifests:]:
+        backend.delete_manifest(key)
+
+    referenced_hashes = set()
+    for key in keys[:max_manifests]:
+        manifest = backend.get_manifest(key) or {}
+        for snapshot in manifest.get("outputs", {}).values():
+            referenced_hashes.update(
+                object_hash for object_hash, __ in snapshot.values()
+            )
+    removed_count = 0
+    for object_hash in backend.list_objects(older_than=grace_period):
+        if object_hash not in referenced_hashes:
+            backend.delete_object(object_hash)
+            removed_count += 1
+    if verbose and (removed_count or len(keys) > max_manifests):
+        print(
+            f"Evicted {max(len(keys) - max_manifests, 0)} builds and "
+            f"{removed_count} unused objects from the build cache"
+        )
+    return removed_count
+
+
+def publish(backend, key, *, output_dirs, source_dirs, verbose=False):
+    """Store the given build outputs and the state of their sources."""
+    manifest = {
+        "version": CACHE_VERSION,
+        "outputs": {},
+        "sources": {},
+    }
+    stored_count = 0
+    for name, output_dir in output_dirs.items():
+        snapshot = snapshot_dir(output_dir)
+        for relpath, file_info in snapshot.items():
+            object_hash = file_info[0]
+            stored_count += not backend.has_object(object_hash)
+            backend.put_object(object_hash, Path(output_dir) / relpath)
+        manifest["outputs"][name] = snapshot
+    for name, source_dir in source_dirs.items():
+        manifest["sources"][name] = snapshot_dir(
+            source_dir, exclude_dirs=SOURCE_EXCLUDE_DIRS
+        )
+
+    backend.put_manifest(key, manifest)
+    if verbose:
+        print(f"Published build {key[:12]} ({stored_count} new objects)")
+    collect_garbage(backend, verbose=verbose)
+    return manifest
+
+
+def fetch(backend, key, *, output_dirs, source_dirs, verbose=False):
+    """Restore cached build outputs and mark unchanged sources as built."""
+    manifest = backend.get_manifest(key)
+    if manifest is None or manifest.get("version") != CACHE_VERSION:
+        if verbose:
+            print(f"Build cache miss for {key[:12]}")
+        return False
+    # Objects can be evicted after the manifest is read by a concurrent build
+    missing_count = sum(
+        not backend.has_object(object_hash)
+        for snapshot in manifest["outputs"].values()
+        for object_hash, __ in snapshot.values()
+    )
+    if missing_count:
+        if verbose:
+            print(
+                f"Build cache miss for {key[:12]} "
+                f"({missing_count} objects evicted)"
+            )
+        return False
+
+    for name, output_dir in output_dirs.items():
+        for relpath, (object_hash, mtime_ns) in (
+            manifest["outputs"].get(name, {}).items()
+        ):
+            target_path = Path(output_dir) / relpath
+            backend.get_object(object_hash, target_path)
+            os.utime(target_path, ns=(mtime_ns, mtime_ns))
+    backend.touch_manifest(key)
+
+    # Sphinx decides what to rebuild by mtime, so sources identical to the
+    # cached build get their original mtimes back; changed ones are rebuilt
+    unchanged_count = changed_count = 0
+    for name, source_dir in source_dirs.items():
+        for relpath, (object_hash, mtime_ns) in (
+            manifest["sources"].get(name, {}).items()
+        ):
+            source_path = Path(source_dir) / relpath
+            try:
+                source_stat = source_path.stat()
+            except OSError:
+                continue
+            if hash_file(source_path) != object_hash:
+                changed_count += 1
+                continue
+            unchanged_count += 1
+            if source_stat.st_mtime_ns > mtime_ns:
+                os.utime(source_path, ns=(source_stat.st_atime_ns, mtime_ns))
+
+    if verbose:
+        print(
+            f"Build cache hit for {key[:12]} "
+            f"({unchanged_count} unchanged, {changed_count} changed sources)"
+        )
+    return True
@@ -0,0 +1,363 @@
+"""Long-running local Sphinx build server that keeps applications warm."""
+
+# Standard library imports
+import argparse
+import contextlib
+import hmac
+import io
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+# --- Constants --- #
+
+DEFAULT_HOST = "127.0.0.1"
+# Any free port; clients find it in the server info file
+DEFAULT_PORT = 0
+ENCODING = "utf-8"
+# Only readable by the user, so only they can find and use the server
+SERVER_INFO_DIR = (
+    Path(os.environ["XDG_RUNTIME_DIR"])
+    if os.environ.get("XDG_RUNTIME_DIR")
+    else Path.home() / ".cache"
+) / "spyder-docs"
+SERVER_INFO_PATH = SERVER_INFO_DIR / "build-server.json"
+# Files in the conf dir whose changes need a new app to be picked up
+CONFIG_INPUTS = ("conf.py", "_ext", "_templates")
+
+
+# --- Server --- #
+
+
+class RelayStream:
+    """File-like object forwarding Sphinx output to the current client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._target = None
+
+    @contextlib.contextmanager
+    def relay_to(self, target):
+        """Send all output written to this stream to the target, for a time."""
+        with self._lock:
+            self._target = target
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._target = None
+
+    def write(self, text):
+        """Forward text to the current target, or to stdout if none."""
+        target = self._target
+        if target is None:
+            sys.stdout.write(text)
+        else:
+            target(text)
+        return len(text)
+
+    def flush(self):
+        """Flush the fallback stream."""
+        sys.stdout.flush()
+
+    @staticmethod
+    def isatty():
+        """Never report being a terminal, so no color codes are sent."""
+        return False
+
+
+def get_config_fingerprint(confdir):
+    """Get the modification times of the files an app is configured by."""
+    fingerprint = []
+    for name in CONFIG_INPUTS:
+        path = Path(confdir) / name
+        paths = sorted(path.rglob("*")) if path.is_dir() else [path]
+        for file_path in paths:
+            if file_path.is_file() and "__pycache__" not in file_path.parts:
+                file_stat = file_path.stat()
+                fingerprint.append(
+                    (str(file_path), file_stat.st_mtime_ns, file_stat.st_size)
+                )
+    return fingerprint
+
+
+def is_module_in(module, module_dir):
+    """Check if a module was imported from a file under a dir."""
+    module_file = getattr(module, "__file__", None)
+    return bool(module_file) and (
+        Path(module_dir).resolve() in Path(module_file).resolve().parents
+    )
+
+
+def unload_modules(module_dir):
+    """Forget the modules imported from a dir, so they're imported again."""
+    for name, module in list(sys.modules.items()):
+        if is_module_in(module, module_dir):
+            del sys.modules[name]
+
+
+def rerun_builder_inited(app):
+    """Run the conf dir extensions' builder-inited handlers for a new build.
+
+    They reset the per-build state of their extension; the handlers of
+    other extensions only run when the app is created.
+    """
+    for listener in sorted(
+        app.events.listeners["builder-inited"],
+        key=lambda listener: listener.priority,
+    ):
+        module = sys.modules.get(getattr(listener.handler, "__module__", ""))
+        if is_module_in(module, app.confdir):
+            listener.handler(app)
+
+
+def parse_build_args(sphinx_args):
+    """Parse sphinx-build arguments into Sphinx application parameters."""
+    # pylint: disable = import-outside-toplevel
+    from sphinx.cmd.build import get_parser
+
+    args = get_parser().parse_args(sphinx_args)
+    confoverrides = {}
+    for define in args.define or ():
+        key, value = define.split("=", 1)
+        confoverrides[key] = value
+    for define in args.htmldefine or ():
+        key, value = define.split("=", 1)
+        confoverrides[f"html_context.{key}"] = value
+    if args.nitpicky:
+        confoverrides["nitpicky"] = True
+
+    outdir = Path(args.outputdir).resolve()
+    app_params = {
+        "srcdir": Path(args.sourcedir).resolve(),
+        "confdir": Path(args.confdir or args.sourcedir).resolve(),
+        "outdir": outdir,
+        "doctreedir": Path(args.doctreedir or outdir / ".doctrees").resolve(),
+        "buildername": args.builder,
+        "confoverrides": confoverrides,
+        "warningiserror": args.warningiserror,
+        "tags": tuple(args.tags or ()),
+        "verbosity": args.verbosity,
+        "keep_going": getattr(args, "keep_going", False),
+        "parallel": args.jobs,
+    }
+    build_params = {
+        "force_all": args.force_all,
+        "filenames": list(args.filenames),
+        "freshenv": args.freshenv,
+        "quiet": args.quiet or args.really_quiet,
+    }
+    return app_params, build_params
+
+
+class BuildServer(socketserver.TCPServer):
+    """Serve build requests one at a time, reusing warm Sphinx apps."""
+
+    allow_reuse_address = True
+
+    def __init__(self, server_address):
+        super().__init__(server_address, BuildRequestHandler)
+        self.stream = RelayStream()
+        self.token = secrets.token_urlsafe()
+        self.apps = {}
+
+    def get_app(self, app_params, *, freshenv=False, quiet=False):
+        """Get a cached Sphinx application for the params, or create one."""
+        # pylint: disable = import-outside-toplevel
+        from sphinx.application import Sphinx
+        from sphinx.util import logging as sphinx_logging
+
+        # Not None, which the logging set up for a reused app can't write to
+        status = io.StringIO() if quiet else self.stream
+        app_key = json.dumps([app_params, quiet], default=str, sort_keys=True)
+        fingerprint = get_config_fingerprint(app_params["confdir"])
+        app, app_fingerprint = self.apps.get(app_key, (None, None))
+        if app is not None and app_fingerprint != fingerprint:
+            self.stream.write("Config or extensions changed; reloading\n")
+            unload_modules(app_params["confdir"])
+            app = None
+        if app is None or freshenv:
+            app = Sphinx(
+                **app_params,
+                status=status,
+                warning=self.stream,
+                freshenv=freshenv,
+            )
+            self.apps[app_key] = (app, fingerprint)
+        else:
+            # Logging is global, so point it back at this app's state
+            sphinx_logging.setup(app, status, self.stream)
+            app._warncount = 0  # pylint: disable = protected-access
+            app.statuscode = 0
+            rerun_builder_inited(app)
+        return app_key, app
+
+    def build(self, sphinx_args, write):
+        """Run a build with the given sphinx-build arguments."""
+        app_params, build_params = parse_build_args(sphinx_args)
+        start_time = time.perf_counter()
+        with self.stream.relay_to(write):
+            app_key, app = self.get_app(
+                app_params,
+                freshenv=build_params["freshenv"],
+                quiet=build_params["quiet"],
+            )
+            try:
+                app.build(build_params["force_all"], build_params["filenames"])
+            except Exception:
+                # The app state is unknown after a failure, so start over
+                self.apps.pop(app_key, None)
+                raise
+            write(f"Build took {time.perf_counter() - start_time:.2f} s\n")
+        return app.statuscode
+
+
+class BuildRequestHandler(socketserver.StreamRequestHandler):
+    """Handle a single JSON-lines build request."""
+
+    def send(self, message):
+        """Send a JSON message to the client."""
+        self.wfile.write(json.dumps(message).encode(ENCODING) + b"\n")
+        self.wfile.flush()
+
+    def handle(self):
+        request = json.loads(self.rfile.readline().decode(ENCODING))
+        if not hmac.compare_digest(
+            str(request.get("token", "")).encode(ENCODING),
+            self.server.token.encode(ENCODING),
+        ):
+            self.send({"output": "Invalid build server token\n"})
+            self.send({"status": 2})
+            return
+        command = request.get("command", "build")
+
+        if command == "shutdown":
+            self.send({"status": 0})
+            threading.Thread(target=self.server.shutdown).start()
+            return
+        if command != "build":
+            self.send({"output": f"Unknown command {command!r}\n"})
+            self.send({"status": 2})
+            return
+
+        try:
+            status = self.server.build(
+                request["args"], lambda text: self.send({"output": text})
+            )
+        except Exception as error:
+            self.send({"output": f"{type(error).__name__}: {error}\n"})
+            status = 2
+        self.send({"status": status})
+
+
+def write_server_info(info, info_path=SERVER_INFO_PATH):
+    """Write the address and token of the server, readable only by the user."""
+    info_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info_path.unlink(missing_ok=True)
+    info_fd = os.open(info_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(info_fd, "w", encoding=ENCODING) as info_file:
+        json.dump(info, info_file)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, info_path=SERVER_INFO_PATH):
+    """Run the build server until it is shut down."""
+    # pylint: disable-next = import-outside-toplevel
+    from sphinx.util.console import nocolor
+
+    nocolor()
+    with BuildServer((host, port)) as server:
+        host, port = server.server_address[:2]
+        write_server_info(
+            {"host": host, "port": port, "token": server.token}, info_path
+        )
+        print(f"Build server listening on {host}:{port}")
+        try:
+            server.serve_forever()
+        finally:
+            info_path.unlink(missing_ok=True)
+
+
+# --- Client --- #
+
+
+def send_request(request, *, info_path=SERVER_INFO_PATH):
+    """Send a request to the build server, relaying output; return status."""
+    try:
+        info = json.loads(info_path.read_text(encoding=ENCODING))
+    except FileNotFoundError:
+        raise ConnectionRefusedError(
+            f"No build server info found at {info_path}"
+        ) from None
+    request = {**request, "token": info["token"]}
+    with socket.create_connection((info["host"], info["port"])) as connection:
+        connection.sendall(json.dumps(request).encode(ENCODING) + b"\n")
+        with connection.makefile("r", encoding=ENCODING) as response:
+            for line in response:
+                message = json.loads(line)
+                if "output" in message:
+                    sys.stdout.write(message["output"])
+                    sys.stdout.flush()
+                if "status" in message:
+                    return message["status"]
+    return 2
+
+
+def request_build(sphinx_args, **options):
+    """Request a build with the given sphinx-build arguments."""
+    return send_request(
+        {"command": "build", "args": list(sphinx_args)}, **options
+    )
+
+
+def request_shutdown(**options):
+    """Request the build server to shut down."""
+    return send_request({"command": "shutdown"}, **options)
+
+
+def main(argv=None):
+    """Run the build server or client from the command line."""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    sphinx_args = []
+    if "--" in argv:
+        sphinx_args = argv[argv.index("--") + 1 :]
+        argv = argv[: argv.index("--")]
+
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        epilog="Pass sphinx-build arguments to 'build' after a '--'.",
+    )
+    parser.add_argument("command", choices=("serve", "build", "shutdown"))
+    parser.add_argument(
+        "--host", default=DEFAULT_HOST, help="address to serve on"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help="port to serve on (default: any free port)",
+    )
+    parser.add_argument(
+        "--info-path",
+        type=Path,
+        default=SERVER_INFO_PATH,
+        help="where the server writes its address and token for clients",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.info_path)
+        return 0
+    if args.command == "shutdown":
+        return request_shutdown(info_path=args.info_path)
+    return request_build(sphinx_args, info_path=args.info_path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
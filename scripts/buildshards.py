@@ -0,0 +1,274 @@
+"""Export parts of a built site as shards, and merge shards into a site."""
+
+# Standard library imports
+import argparse
+import json
+import os
+import shutil
+import sys
+from pathlib import Path, PurePosixPath
+
+# Local imports
+import buildcache
+import deploydelta
+
+
+# --- Constants --- #
+
+SHARD_MANIFEST_FILENAME = "shard.json"
+SHARD_SITE_DIRNAME = "html"
+SHARD_VERSION = 1
+
+
+# --- Exporting --- #
+
+
+def get_part_files(site_dir, part_dir, reserved_dirs=()):
+    """Get the deployable files of a part, relative to the site dir.
+
+    The reserved dirs at the root of the site belong to other parts, so are
+    left out of the part built at the root.
+    """
+    relpaths = []
+    for dirpath, dirnames, filenames in os.walk(site_dir / part_dir):
+        current_dir = Path(dirpath).resolve()
+        dirnames[:] = sorted(
+            name
+            for name in dirnames
+            if name not in deploydelta.EXCLUDE_DIRS
+            and not (current_dir == site_dir and name in reserved_dirs)
+        )
+        for filename in sorted(filenames):
+            relpath = (current_dir / filename).relative_to(site_dir).as_posix()
+            if relpath not in deploydelta.EXCLUDE_FILES:
+                relpaths.append(relpath)
+    return relpaths
+
+
+def export_shard(site_dir, shard_dir, parts, *, reserved_dirs=()):
+    """Copy parts of a built site to a self-contained shard dir."""
+    site_dir = Path(site_dir).resolve()
+    shard_dir = Path(shard_dir)
+    if shard_dir.exists():
+        shutil.rmtree(shard_dir)
+    output_dir = shard_dir / SHARD_SITE_DIRNAME
+
+    manifest = {"version": SHARD_VERSION, "parts": {}}
+    for name, part_dirs in parts.items():
+        files = {}
+        for part_dir in part_dirs:
+            if not (site_dir / part_dir).is_dir():
+                raise RuntimeError(
+                    f"Part {name!r} wasn't built to {site_dir / part_dir}"
+                )
+            for relpath in get_part_files(site_dir, part_dir, reserved_dirs):
+                output_path = output_dir / relpath
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(site_dir / relpath, output_path)
+                files[relpath] = buildcache.hash_file(output_path)
+        manifest["parts"][name] = {"dirs": part_dirs, "files": files}
+        print(f"Exported part {name!r}: {len(files)} files")
+    deploydelta.write_json(shard_dir / SHARD_MANIFEST_FILENAME, manifest)
+    return manifest
+
+
+# --- Merging --- #
+
+
+def load_shard(shard_dir):
+    """Load the manifest of a shard dir."""
+    manifest_path = Path(shard_dir) / SHARD_MANIFEST_FILENAME
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as error:
+        raise RuntimeError(
+            f"Not a valid shard: {shard_dir} ({error})"
+        ) from error
+    if manifest.get("version") != SHARD_VERSION:
+        raise RuntimeError(f"Unsupported shard version in {shard_dir}")
+    return manifest
+
+
+def is_site_relpath(relpath):
+    """Check a manifest path stays inside the site it's merged into."""
+    path = PurePosixPath(relpath)
+    return bool(relpath) and not path.is_absolute() and ".." not in path.parts
+
+
+def check_part(shard_dir, name, part, file_parts):
+    """Check a shard part's files are there, intact and in no other part."""
+    problems = []
+    if part["dirs"] and not part["files"]:
+        problems.append(f"Part {name!r} in {shard_dir} has no files")
+    for relpath, file_hash in part["files"].items():
+        path = Path(shard_dir) / SHARD_SITE_DIRNAME / relpath
+        if not is_site_relpath(relpath):
+            problems.append(f"{relpath} of part {name!r} is outside the site")
+            continue
+        if relpath in file_parts:
+            problems.append(
+                f"{relpath} is in both part {file_parts[relpath]!r} "
+                f"and part {name!r}"
+            )
+        elif not path.is_file():
+            problems.append(f"{relpath} of part {name!r} is missing")
+        elif buildcache.hash_file(path) != file_hash:
+            problems.append(f"{relpath} of part {name!r} doesn't match")
+        file_parts.setdefault(relpath, name)
+    return problems
+
+
+def check_shards(shard_dirs, expected_parts):
+    """Check the shards make up the expected parts, once each, in full.
+
+    Returns the shard dir of each part and the problems found.
+    """
+    problems = []
+    part_shards = {}
+    file_parts = {}
+    for shard_dir in shard_dirs:
+        try:
+            manifest = load_shard(shard_dir)
+        except RuntimeError as error:
+            problems.append(str(error))
+            continue
+        for name, part in manifest["parts"].items():
+            if name in part_shards:
+                problems.append(
+                    f"Part {name!r} is in both {part_shards[name][0]} "
+                    f"and {shard_dir}"
+                )
+                continue
+            part_shards[name] = (shard_dir, part)
+            problems += check_part(shard_dir, name, part, file_parts)
+
+    missing_parts = [
+        name for name in expected_parts if name not in part_shards
+    ]
+    if missing_parts:
+        problems.append(f"Missing parts: {', '.join(missing_parts)}")
+    unexpected_parts = sorted(set(part_shards) - set(expected_parts))
+    if expected_parts and unexpected_parts:
+        problems.append(f"Unexpected parts: {', '.join(unexpected_parts)}")
+    return part_shards, problems
+
+
+def clean_output_dir(output_dir):
+    """Remove the contents of a dir, except the non-deployed build caches."""
+    for path in output_dir.iterdir():
+        if path.name in deploydelta.EXCLUDE_DIRS:
+            continue
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+
+
+def merge_shards(shard_dirs, output_dir, *, expected_parts=(), clean=False):
+    """Merge shards into a site dir, if they make up the complete site.
+
+    Raises a RuntimeError listing the problems found otherwise.
+    """
+    output_dir = Path(output_dir)
+    part_shards, problems = check_shards(shard_dirs, expected_parts)
+    if problems:
+        raise RuntimeError(
+            "\n  ".join([f"Can't merge {len(shard_dirs)} shards:", *problems])
+        )
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if clean:
+        clean_output_dir(output_dir)
+    file_count = 0
+    for shard_dir, part in part_shards.values():
+        for relpath in part["files"]:
+            output_path = output_dir / relpath
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(
+                Path(shard_dir) / SHARD_SITE_DIRNAME / relpath, output_path
+            )
+        file_count += len(part["files"])
+    print(
+        f"Merged parts {', '.join(part_shards)} from {len(shard_dirs)} "
+        f"shards: {file_count} files into {output_dir}"
+    )
+
+
+# --- CLI --- #
+
+
+def parse_part(value):
+    """Parse a NAME=DIR[,DIR...] part option; the dirs may be empty."""
+    name, __, dirs = value.partition("=")
+    if not name:
+        raise argparse.ArgumentTypeError(f"Part must be NAME=DIRS: {value!r}")
+    return name, [part_dir for part_dir in dirs.split(",") if part_dir]
+
+
+def main(argv=None):
+    """Export a shard of a built site, or merge shards into a site."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser(
+        "export", help="copy parts of a built site to a shard dir"
+    )
+    export_parser.add_argument("site_dir")
+    export_parser.add_argument("shard_dir")
+    export_parser.add_argument(
+        "--part",
+        action="append",
+        required=True,
+        type=parse_part,
+        help="part name and its dirs in the site, like es=es or source=.",
+    )
+    export_parser.add_argument(
+        "--reserve",
+        action="append",
+        default=[],
+        help="root dir of the site belonging to another part",
+    )
+
+    merge_parser = subparsers.add_parser(
+        "merge", help="merge shard dirs into a site, checking they're all in"
+    )
+    merge_parser.add_argument("shard_dirs", nargs="+")
+    merge_parser.add_argument("--output", required=True, help="site dir")
+    merge_parser.add_argument(
+        "--expect",
+        action="append",
+        default=[],
+        help="part the shards must include (comma-separated)",
+    )
+    merge_parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="empty the site dir first, keeping its build caches",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export_shard(
+            args.site_dir,
+            args.shard_dir,
+            dict(args.part),
+            reserved_dirs=set(args.reserve),
+        )
+        return
+    expected_parts = [
+        name for value in args.expect for name in value.split(",") if name
+    ]
+    try:
+        merge_shards(
+            args.shard_dirs,
+            args.output,
+            expected_parts=expected_parts,
+            clean=args.clean,
+        )
+    except RuntimeError as error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
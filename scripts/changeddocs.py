@@ -0,0 +1,301 @@
+"""Find the documents affected by the changes since a given Git ref."""
+
+# Standard library imports
+import argparse
+import json
+import pickle
+import posixpath
+import subprocess
+import sys
+from pathlib import Path
+
+
+# --- Constants --- #
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_SOURCE_DIR = ROOT_DIR / "docs"
+DEFAULT_SUBMODULE_DIR = ROOT_DIR / "spyder"
+ENV_FILENAME = "environment.pickle"
+DOCTREE_SUFFIX = ".doctree"
+AUTOSUMMARY_DIRNAME = "_autosummary"
+# Build output under the source dir, which isn't a change to the sources
+BUILD_DIRNAME = "_build"
+# Holds the extensions whose nodes can be pickled in the doctrees
+EXTENSION_DIRNAME = "_ext"
+# Raised by pickles referring to classes that can't be imported, or corrupt
+UNPICKLING_ERRORS = (
+    AttributeError,
+    EOFError,
+    ImportError,
+    pickle.UnpicklingError,
+)
+SUBMODULE_MODE = "160000"
+# Changes to these affect every page, so need a full build
+GLOBAL_INPUTS = ("conf.py", "_templates", "_static", "_ext", "locales")
+DOC_REF_TYPES = {"doc"}
+LABEL_REF_TYPES = {"ref", "numref", "keyword", "any"}
+
+
+# --- Git --- #
+
+
+def run_git(*args, cwd):
+    """Run a Git command and return its output lines."""
+    result = subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return [line for line in result.stdout.splitlines() if line.strip()]
+
+
+def has_commit(commit, *, cwd):
+    """Check if a commit is available, unlike old ones in shallow clones."""
+    result = subprocess.run(
+        ["git", "cat-file", "-e", f"{commit}^{{commit}}"],
+        cwd=cwd,
+        check=False,
+        capture_output=True,
+    )
+    return not result.returncode
+
+
+def get_changed_files(ref, *, source_dir, submodule_dir):
+    """Get the changed files under the source dir and submodule since a ref.
+
+    Includes uncommitted and untracked changes. Submodule changes are
+    expanded to the files changed between the old and new submodule commit;
+    returns None if the old commit isn't available to compare to.
+    """
+    repo_dir = Path(run_git("rev-parse", "--show-toplevel", cwd=source_dir)[0])
+    source_rel = source_dir.relative_to(repo_dir).as_posix()
+    changed = [
+        repo_dir / path
+        for path in run_git(
+            "diff", "--name-only", ref, "--", source_rel, cwd=repo_dir
+        )
+        + run_git(
+            "ls-files",
+            "--others",
+            "--exclude-standard",
+            "--",
+            source_rel,
+            f":(exclude){source_rel}/{BUILD_DIRNAME}",
+            cwd=repo_dir,
+        )
+    ]
+
+    submodule_rel = submodule_dir.relative_to(repo_dir).as_posix()
+    for line in run_git(
+        "diff", "--raw", ref, "--", submodule_rel, cwd=repo_dir
+    ):
+        old_mode, __, old_commit = line.lstrip(":").split()[:3]
+        if old_mode != SUBMODULE_MODE:
+            continue
+        if not has_commit(old_commit, cwd=submodule_dir):
+            print(
+                f"Submodule commit {old_commit} isn't available to compare to "
+                "(e.g. in a shallow clone); building everything"
+            )
+            return None
+        changed += [
+            submodule_dir / path
+            for path in run_git(
+                "diff", "--name-only", old_commit, cwd=submodule_dir
+            )
+        ]
+    return changed
+
+
+# --- Mapping --- #
+
+
+def add_extension_path(source_dir):
+    """Make the local extensions importable, as conf.py does for builds."""
+    extension_dir = str(Path(source_dir) / EXTENSION_DIRNAME)
+    if extension_dir not in sys.path:
+        sys.path.insert(0, extension_dir)
+
+
+def load_pickle(path):
+    """Load a pickled Sphinx environment or doctree, or None if unreadable."""
+    # pylint: disable-next = too-many-try-statements
+    try:
+        with open(path, "rb") as file:
+            return pickle.load(file)
+    except UNPICKLING_ERRORS as error:
+        print(f"Could not read {path}: {type(error).__name__}: {error}")
+        return None
+
+
+def get_module_name(path, submodule_dir):
+    """Get the dotted module name of a Python file in the submodule."""
+    relpath = path.relative_to(submodule_dir).with_suffix("")
+    parts = list(relpath.parts)
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def get_toctree_parents(env):
+    """Map each document to the documents including it in a toctree."""
+    parents = {}
+    for parent, children in env.toctree_includes.items():
+        for child in children:
+            parents.setdefault(child, set()).add(parent)
+    return parents
+
+
+def get_referenced_docs(env, node):
+    """Get the document a pending cross-reference points to, if known."""
+    ref_type = node.get("reftype")
+    target = node.get("reftarget", "")
+    if ref_type in DOC_REF_TYPES:
+        if target.startswith("/"):
+            return {target.lstrip("/")}
+        refdoc_dir = posixpath.dirname(node.get("refdoc", ""))
+        return {posixpath.normpath(posixpath.join(refdoc_dir, target))}
+    if ref_type in LABEL_REF_TYPES:
+        labels = env.domaindata.get("std", {}).get("labels", {})
+        if target.lower() in labels:
+            return {labels[target.lower()][0]}
+    if node.get("refdomain") == "py":
+        objects = env.domaindata.get("py", {}).get("objects", {})
+        for name in (target, f"{node.get('py:module')}.{target}"):
+            if name in objects:
+                return {objects[name][0]}
+    return set()
+
+
+def get_referencing_docs(env, doctree_dir, docnames):
+    """Get the documents cross-referencing any of the given documents.
+
+    Returns None if a doctree can't be read, as the references are unknown.
+    """
+    # pylint: disable = import-outside-toplevel
+    from sphinx import addnodes
+
+    referencing = set()
+    for docname in env.all_docs:
+        doctree_path = Path(doctree_dir) / f"{docname}{DOCTREE_SUFFIX}"
+        if docname in docnames or not doctree_path.is_file():
+            continue
+        doctree = load_pickle(doctree_path)
+        if doctree is None:
+            return None
+        for node in doctree.findall(addnodes.pending_xref):
+            if get_referenced_docs(env, node) & docnames:
+                referencing.add(docname)
+                break
+    return referencing
+
+
+def find_affected_docs(
+    env, changed_files, *, doctree_dir, source_dir, submodule_dir
+):
+    """Map changed files to the documents that need rebuilding.
+
+    Returns None if a full build is needed.
+    """
+    changed_docs = set()
+    for path in changed_files:
+        if submodule_dir in path.parents:
+            if path.suffix != ".py":
+                continue
+            module_name = get_module_name(path, submodule_dir)
+            stub_docname = f"{AUTOSUMMARY_DIRNAME}/{module_name}"
+            if stub_docname in env.all_docs:
+                changed_docs.add(stub_docname)
+            continue
+
+        relpath = path.relative_to(source_dir)
+        if relpath.parts[0] in GLOBAL_INPUTS:
+            print(f"Global input {relpath.as_posix()} changed")
+            return None
+        docname = relpath.with_suffix("").as_posix()
+        if docname in env.all_docs or path.suffix in env.config.source_suffix:
+            changed_docs.add(docname)
+        # Documents including or depending on the changed file
+        changed_docs |= {
+            dep_docname
+            for dep_docname, deps in env.dependencies.items()
+            if relpath.as_posix() in {str(dep) for dep in deps}
+        }
+
+    affected_docs = set(changed_docs)
+    toctree_parents = get_toctree_parents(env)
+    for docname in changed_docs:
+        affected_docs |= toctree_parents.get(docname, set())
+    referencing_docs = get_referencing_docs(env, doctree_dir, changed_docs)
+    if referencing_docs is None:
+        return None
+    affected_docs |= referencing_docs
+
+    return sorted(affected_docs)
+
+
+def get_doc_paths(docnames, source_dir, source_suffixes):
+    """Get the source paths of the documents, skipping deleted ones."""
+    return [
+        str(source_dir / f"{docname}{suffix}")
+        for docname in docnames
+        for suffix in source_suffixes
+        if (source_dir / f"{docname}{suffix}").is_file()
+    ]
+
+
+def main(argv=None):
+    """Write the source files of the documents affected by changes."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("ref", help="Git ref to compare the working tree to")
+    parser.add_argument("--doctree-dir", required=True)
+    parser.add_argument("--source-dir", default=DEFAULT_SOURCE_DIR)
+    parser.add_argument("--submodule-dir", default=DEFAULT_SUBMODULE_DIR)
+    parser.add_argument(
+        "--output", help="JSON file to write the results to (default stdout)"
+    )
+    args = parser.parse_args(argv)
+
+    source_dir = Path(args.source_dir).resolve()
+    submodule_dir = Path(args.submodule_dir).resolve()
+    env_path = Path(args.doctree_dir) / ENV_FILENAME
+    result = {"full": True, "filenames": []}
+    add_extension_path(source_dir)
+    env = load_pickle(env_path) if env_path.is_file() else None
+    if env is not None:
+        changed_files = get_changed_files(
+            args.ref, source_dir=source_dir, submodule_dir=submodule_dir
+        )
+        docnames = (
+            None
+            if changed_files is None
+            else find_affected_docs(
+                env,
+                changed_files,
+                doctree_dir=args.doctree_dir,
+                source_dir=source_dir,
+                submodule_dir=submodule_dir,
+            )
+        )
+        if docnames is not None:
+            result["full"] = False
+            result["filenames"] = get_doc_paths(
+                docnames, source_dir, env.config.source_suffix
+            )
+            print(
+                f"{len(changed_files)} changed files affect "
+                f"{len(docnames)} documents: {', '.join(docnames) or 'none'}"
+            )
+    else:
+        print("No readable build environment found; building everything")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(result), encoding="utf-8")
+    else:
+        json.dump(result, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Compute and apply minimal deltas between deployments of the built docs."""
+
+# Standard library imports
+import argparse
+import hashlib
+import json
+import shutil
+import subprocess
+import tempfile
+import urllib.request
+from pathlib import Path
+
+# Local imports
+import buildcache
+
+
+# --- Constants --- #
+
+MANIFEST_FILENAME = "deploy-manifest.json"
+DELTA_FILENAME = "deploy-delta.json"
+MANIFEST_VERSION = 1
+EXCLUDE_DIRS = {".doctrees", ".git"}
+EXCLUDE_FILES = {".buildinfo", MANIFEST_FILENAME}
+DELTA_KEYS = ("changed", "new", "deleted")
+FETCH_TIMEOUT = 30
+GIT_USER_NAME = "github-actions[bot]"
+GIT_USER_EMAIL = "41898282+github-actions[bot]@users.noreply.github.com"
+
+
+# --- Manifests --- #
+
+
+def compute_manifest(site_dir):
+    """Map each deployable file under a dir to its content hash."""
+    site_dir = Path(site_dir)
+    files = {}
+    for path in sorted(site_dir.rglob("*")):
+        relpath = path.relative_to(site_dir)
+        if (
+            not path.is_file()
+            or EXCLUDE_DIRS.intersection(relpath.parts[:-1])
+            or relpath.as_posix() in EXCLUDE_FILES
+        ):
+            continue
+        files[relpath.as_posix()] = buildcache.hash_file(path)
+    return {"version": MANIFEST_VERSION, "files": files}
+
+
+def hash_manifest(manifest):
+    """Return a short identifier for a manifest's contents."""
+    if manifest is None:
+        return None
+    encoded = json.dumps(manifest["files"], sort_keys=True).encode()
+    return hashlib.new(buildcache.HASH_ALGORITHM, encoded).hexdigest()
+
+
+def read_location(location):
+    """Read the text of a local file or URL."""
+    if not location.startswith(("http://", "https://")):
+        return Path(location).read_text(encoding="utf-8")
+    with urllib.request.urlopen(location, timeout=FETCH_TIMEOUT) as response:
+        return response.read().decode("utf-8")
+
+
+def load_manifest(location):
+    """Load a manifest from a local path or URL, or None if unavailable."""
+    location = str(location)
+    try:
+        manifest = json.loads(read_location(location))
+    except (OSError, json.JSONDecodeError) as error:
+        print(f"No previous manifest loaded from {location}: {error}")
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        print(f"Ignoring manifest with unsupported version from {location}")
+        return None
+    return manifest
+
+
+def write_json(path, data):
+    """Write data to a JSON file, with a stable key order."""
+    Path(path).write_text(
+        json.dumps(data, indent=1, sort_keys=True), encoding="utf-8"
+    )
+
+
+def compare_manifests(old, new):
+    """Compute the changed, new and deleted files between two manifests."""
+    old_files = old["files"] if old else {}
+    new_files = new["files"]
+    return {
+        "base": hash_manifest(old),
+        "changed": sorted(
+            path
+            for path, file_hash in new_files.items()
+            if path in old_files and old_files[path] != file_hash
+        ),
+        "new": sorted(path for path in new_files if path not in old_files),
+        "deleted": sorted(path for path in old_files if path not in new_files),
+    }
+
+
+def summarize_delta(delta):
+    """Return a one-line summary of a delta."""
+    return ", ".join(f"{len(delta[key])} {key}" for key in DELTA_KEYS)
+
+
+def write_manifest(site_dir, *, previous=None, delta_path=None):
+    """Write a site's manifest and its delta from the previous deployment."""
+    previous_manifest = load_manifest(previous) if previous else None
+    manifest = compute_manifest(site_dir)
+    write_json(Path(site_dir) / MANIFEST_FILENAME, manifest)
+    delta = compare_manifests(previous_manifest, manifest)
+    if delta_path:
+        write_json(delta_path, delta)
+    print(
+        f"Wrote manifest of {len(manifest['files'])} files; "
+        f"delta from previous deployment: {summarize_delta(delta)}"
+    )
+    return delta
+
+
+# --- Applying --- #
+
+
+def get_target_delta(site_dir, target_dir, delta):
+    """Get the delta to apply to a target, recomputing it if out of date.
+
+    If the target wasn't deployed from the manifest the delta is based on,
+    or has no manifest, the delta is recomputed against the target's actual
+    files, so files not in the new site are always removed.
+    """
+    new_manifest = load_manifest(Path(site_dir) / MANIFEST_FILENAME)
+    if new_manifest is None:
+        raise RuntimeError(f"No manifest in {site_dir}; run 'manifest' first")
+    target_manifest_path = Path(target_dir) / MANIFEST_FILENAME
+    target_manifest = (
+        load_manifest(target_manifest_path)
+        if target_manifest_path.is_file()
+        else None
+    )
+    # A delta with no base only lists additions, so never trust it alone
+    if (
+        delta is not None
+        and target_manifest is not None
+        and delta["base"] == hash_manifest(target_manifest)
+    ):
+        return delta
+    print("Target doesn't match the delta's base; comparing target files")
+    return compare_manifests(compute_manifest(target_dir), new_manifest)
+
+
+def apply_delta(site_dir, target_dir, delta=None):
+    """Copy the changed and new files to a target dir and delete the rest."""
+    site_dir = Path(site_dir)
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    delta = get_target_delta(site_dir, target_dir, delta)
+
+    for relpath in delta["deleted"]:
+        path = target_dir / relpath
+        path.unlink(missing_ok=True)
+        # Remove dirs left empty, but never the target itself
+        for parent in path.parents:
+            if parent == target_dir or any(parent.iterdir()):
+                break
+            parent.rmdir()
+    for relpath in delta["changed"] + delta["new"]:
+        (target_dir / relpath).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(site_dir / relpath, target_dir / relpath)
+    shutil.copy2(site_dir / MANIFEST_FILENAME, target_dir / MANIFEST_FILENAME)
+
+    print(f"Applied delta to {target_dir}: {summarize_delta(delta)}")
+    return delta
+
+
+def run_git(*args, cwd=None):
+    """Run a Git command, returning its stripped output."""
+    result = subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    )
+    return result.stdout.strip()
+
+
+def checkout_branch(repo, branch, work_dir):
+    """Shallow-clone a branch, or start it as an orphan if it doesn't exist."""
+    if run_git("ls-remote", "--heads", repo, branch):
+        run_git(
+            "clone",
+            "--quiet",
+            "--depth=1",
+            "--single-branch",
+            f"--branch={branch}",
+            repo,
+            str(work_dir),
+        )
+        return
+    run_git("init", "--quiet", str(work_dir))
+    run_git("remote", "add", "origin", repo, cwd=work_dir)
+    run_git("checkout", "--quiet", "--orphan", branch, cwd=work_dir)
+
+
+def deploy_to_branch(
+    site_dir, repo, branch, delta=None, *, message=None, push=True
+):
+    """Commit a delta to a Git branch and push it, if anything changed."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir) / "deploy"
+        checkout_branch(repo, branch, work_dir)
+        delta = apply_delta(site_dir, work_dir, delta)
+
+        run_git("add", "--all", cwd=work_dir)
+        if not run_git("status", "--porcelain", cwd=work_dir):
+            print(f"Nothing to deploy to {branch}")
+            return delta
+        identity = []
+        for key, default in (
+            ("user.name", GIT_USER_NAME),
+            ("user.email", GIT_USER_EMAIL),
+        ):
+            try:
+                run_git("config", key, cwd=work_dir)
+            except subprocess.CalledProcessError:
+                identity += ["-c", f"{key}={default}"]
+        run_git(
+            *identity,
+            "commit",
+            "--quiet",
+            "-m",
+            message or f"Deploy docs ({summarize_delta(delta)})",
+            cwd=work_dir,
+        )
+        if push:
+            run_git("push", "--quiet", "origin", branch, cwd=work_dir)
+            print(f"Pushed delta to {branch}")
+        else:
+            print(f"Dry run; not pushing to {branch}")
+    return delta
+
+
+# --- CLI --- #
+
+
+def main(argv=None):
+    """Write a deployment manifest, or apply a delta to a deploy target."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    manifest_parser = subparsers.add_parser(
+        "manifest", help="write the manifest and delta of a built site"
+    )
+    manifest_parser.add_argument("site_dir")
+    manifest_parser.add_argument(
+        "--previous", help="path or URL of the previous deployment's manifest"
+    )
+    manifest_parser.add_argument("--delta", help="file to write the delta to")
+
+    apply_parser = subparsers.add_parser(
+        "apply", help="apply a site's delta to a target dir or Git branch"
+    )
+    apply_parser.add_argument("site_dir")
+    apply_parser.add_argument("--delta", help="delta file to apply")
+    target_group = apply_parser.add_mutually_exclusive_group(required=True)
+    target_group.add_argument("--target-dir")
+    target_group.add_argument("--repo", help="Git repo to push a branch to")
+    apply_parser.add_argument("--branch", default="gh-pages")
+    apply_parser.add_argument("--message", help="deploy commit message")
+    apply_parser.add_argument(
+        "--dry-run", action="store_true", help="commit, but don't push"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "manifest":
+        write_manifest(
+            args.site_dir, previous=args.previous, delta_path=args.delta
+        )
+        return
+
+    delta = None
+    if args.delta and Path(args.delta).is_file():
+        delta = json.loads(Path(args.delta).read_text(encoding="utf-8"))
+    if args.target_dir:
+        apply_delta(args.site_dir, args.target_dir, delta)
+    else:
+        deploy_to_branch(
+            args.site_dir,
+            args.repo,
+            args.branch,
+            delta,
+            message=args.message,
+            push=not args.dry_run,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Fetch the intersphinx inventories of the docs into a shared cache dir."""
+
+# Standard library imports
+import argparse
+import io
+import tempfile
+from pathlib import Path
+
+
+# --- Constants --- #
+
+DEFAULT_SOURCE_DIR = Path(__file__).resolve().parents[1] / "docs"
+# Sets up the app without reading or writing any pages
+BUILDER = "dummy"
+# Same as in the sharedcache extension
+INVENTORY_DIRNAME = "intersphinx-inventories"
+
+
+def fetch_inventories(source_dir, cache_dir):
+    """Set up a Sphinx app, which fetches the inventories into the cache.
+
+    The sharedcache extension fetches any stale inventories when the builder
+    is set up, so builds started afterwards with the same cache dir find
+    fresh copies and don't fetch them again.
+    """
+    # pylint: disable-next = import-outside-toplevel
+    import sphinx.application
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        sphinx.application.Sphinx(
+            srcdir=source_dir,
+            confdir=source_dir,
+            outdir=build_dir,
+            doctreedir=Path(build_dir) / ".doctrees",
+            buildername=BUILDER,
+            confoverrides={"shared_cache_dir": str(cache_dir)},
+            status=None,
+            warning=io.StringIO(),
+            freshenv=True,
+        )
+    return sorted((cache_dir / INVENTORY_DIRNAME).glob("*.inv"))
+
+
+def main(argv=None):
+    """Fetch the inventories and list the cached ones."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source-dir", default=DEFAULT_SOURCE_DIR)
+    parser.add_argument(
+        "--cache-dir", required=True, help="shared_cache_dir of the builds"
+    )
+    args = parser.parse_args(argv)
+
+    inventory_paths = fetch_inventories(
+        Path(args.source_dir).resolve(), Path(args.cache_dir).resolve()
+    )
+    print(f"{len(inventory_paths)} inventories cached in {args.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
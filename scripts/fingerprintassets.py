@@ -0,0 +1,232 @@
+"""Fingerprint the static assets of a built site and write cache headers."""
+
+# Standard library imports
+import argparse
+import re
+import shutil
+import urllib.parse
+from pathlib import Path
+
+# Local imports
+import buildcache
+import pruneassets
+
+
+# --- Constants --- #
+
+# Dirs whose files are only ever referenced by the pages, never linked to
+ASSET_DIRS = {"_images", "_static"}
+EXCLUDE_DIRS = {".doctrees", "_sources"}
+HEADERS_FILENAME = "_headers"
+# Fetched by browsers at a fixed URL, to check for a new deployment
+NO_CACHE_FILENAMES = {"service-worker.js"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+NO_CACHE_CONTROL = "no-cache"
+DEFAULT_HTML_MAX_AGE = 60
+
+URL_CHARACTER = r"[^\s\"'`()<>?#,\\]"
+# Relative URLs (like ../_static/x.css) of assets in pages and scripts
+ASSET_URL_PATTERN = (
+    r"(?<![\w/.:%-])(?P<asset_url>(?:\.\.?/)*(?:[\w.-]+/)*?"
+    + rf"(?:_images|_static)/{URL_CHARACTER}*[^\s\"'`()<>?#,\\/.])"
+)
+REFERENCE_PATTERNS = {
+    ".html": re.compile(ASSET_URL_PATTERN),
+    ".css": re.compile(
+        r"url\(\s*([\"']?)(?P<css_url>[^\"')]+)\1\s*\)"
+        + r"|@import\s+([\"'])(?P<import_url>[^\"']+)\3",
+        re.I,
+    ),
+    ".js": re.compile(
+        ASSET_URL_PATTERN + r"|sourceMappingURL=(?P<map_url>\S+)"
+    ),
+}
+
+
+# --- Fingerprinting --- #
+
+
+def is_in_dirs(path, base_dir, dirnames):
+    """Check if a path is in one of the named dirs, below a base dir."""
+    return bool(dirnames.intersection(path.relative_to(base_dir).parts[:-1]))
+
+
+def get_url_path(path, base_dir):
+    """Get the URL path of a file, relative to the root of the deployment."""
+    return f"/{urllib.parse.quote(path.relative_to(base_dir).as_posix())}"
+
+
+class AssetFingerprinter:
+    """Make content-hashed copies of the assets files refer to, on demand.
+
+    The copies of stylesheets and scripts refer to those of their own
+    assets in turn, so a changed font also changes the name of its CSS.
+    """
+
+    def __init__(self, build_dir):
+        self.build_dir = build_dir
+        self.fingerprinted = {}
+        self._pending = set()
+
+    def is_asset(self, path):
+        """Check if a path is a file in one of the asset dirs."""
+        return (
+            path.is_relative_to(self.build_dir)
+            and is_in_dirs(path, self.build_dir, ASSET_DIRS)
+            and path.is_file()
+        )
+
+    def fingerprint(self, path):
+        """Get the fingerprinted copy of an asset, or None if it's not one."""
+        if path in self.fingerprinted:
+            return self.fingerprinted[path]
+        # Assets referring to each other keep their original names
+        if path in self._pending or not self.is_asset(path):
+            return None
+        self._pending.add(path)
+        if path.suffix in REFERENCE_PATTERNS:
+            text = path.read_text(encoding="utf-8", errors="surrogateescape")
+            data = self.rewrite(text, path).encode("utf-8", "surrogateescape")
+            fingerprinted_path = pruneassets.write_fingerprinted(path, data)
+        else:
+            fingerprinted_path = pruneassets.with_fingerprint(
+                path, buildcache.hash_file(path)
+            )
+            if not fingerprinted_path.exists():
+                shutil.copy2(path, fingerprinted_path)
+        self._pending.discard(path)
+        self.fingerprinted[path] = fingerprinted_path
+        return fingerprinted_path
+
+    def rewrite(self, text, path):
+        """Point the asset URLs in the text of a file to their copies."""
+
+        def replace_url(match):
+            group_name = next(
+                name
+                for name, value in match.groupdict().items()
+                if value is not None
+            )
+            url = match.group(group_name)
+            parsed = urllib.parse.urlsplit(url)
+            if parsed.scheme or parsed.netloc or parsed.path[:1] in {"", "/"}:
+                return match.group(0)
+            asset_path = (
+                path.parent / urllib.parse.unquote(parsed.path)
+            ).resolve()
+            fingerprinted_path = self.fingerprint(asset_path)
+            if fingerprinted_path in {None, asset_path}:
+                return match.group(0)
+            head, slash, __ = parsed.path.rpartition("/")
+            new_name = urllib.parse.quote(fingerprinted_path.name)
+            new_url = urllib.parse.urlunsplit(
+                (
+                    "",
+                    "",
+                    f"{head}{slash}{new_name}",
+                    parsed.query,
+                    parsed.fragment,
+                )
+            )
+            start, end = (
+                pos - match.start() for pos in match.span(group_name)
+            )
+            return f"{match.group(0)[:start]}{new_url}{match.group(0)[end:]}"
+
+        return REFERENCE_PATTERNS[path.suffix].sub(replace_url, text)
+
+
+def fingerprint_build(build_dir):
+    """Rewrite every page and script outside the asset dirs in one pass."""
+    fingerprinter = AssetFingerprinter(build_dir)
+    rewritten_count = 0
+    for path in sorted(build_dir.rglob("*")):
+        if (
+            path.suffix not in REFERENCE_PATTERNS
+            or is_in_dirs(path, build_dir, ASSET_DIRS | EXCLUDE_DIRS)
+            or not path.is_file()
+        ):
+            continue
+        text = path.read_text(encoding="utf-8", errors="surrogateescape")
+        new_text = fingerprinter.rewrite(text, path)
+        if new_text != text:
+            path.write_text(
+                new_text, encoding="utf-8", errors="surrogateescape"
+            )
+            rewritten_count += 1
+    return fingerprinter.fingerprinted, rewritten_count
+
+
+# --- Headers --- #
+
+
+def get_cache_rules(build_dir, fingerprinted, *, html_max_age):
+    """Map the URL paths of the deployment to their Cache-Control header.
+
+    Every rule is for an exact path, as rules matching the same path would
+    have their headers combined.
+    """
+    html_cache_control = f"public, max-age={html_max_age}, must-revalidate"
+    rules = {}
+    for path in sorted(build_dir.rglob("*")):
+        if (
+            is_in_dirs(path, build_dir, ASSET_DIRS | EXCLUDE_DIRS)
+            or not path.is_file()
+        ):
+            continue
+        if path.name in NO_CACHE_FILENAMES:
+            rules[get_url_path(path, build_dir)] = NO_CACHE_CONTROL
+        elif path.suffix == ".html":
+            url_path = get_url_path(path, build_dir)
+            rules[url_path] = html_cache_control
+            if path.name == "index.html":
+                rules[url_path[: -len(path.name)]] = html_cache_control
+    for path in sorted(set(fingerprinted.values())):
+        rules[get_url_path(path, build_dir)] = IMMUTABLE_CACHE_CONTROL
+    return rules
+
+
+def format_headers(rules):
+    """Format cache rules as a Netlify _headers file."""
+    return "".join(
+        f"{url_path}\n  Cache-Control: {cache_control}\n"
+        for url_path, cache_control in rules.items()
+    )
+
+
+# --- CLI --- #
+
+
+def main(argv=None):
+    """Fingerprint the assets of a built HTML dir and write its headers."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("build_dir", help="built HTML dir, as deployed")
+    parser.add_argument(
+        "--html-max-age",
+        type=int,
+        default=DEFAULT_HTML_MAX_AGE,
+        help="seconds browsers may cache pages before revalidating them",
+    )
+    parser.add_argument(
+        "--headers",
+        help=f"path to write the headers to (default: <build_dir>/"
+        f"{HEADERS_FILENAME})",
+    )
+    args = parser.parse_args(argv)
+
+    build_dir = Path(args.build_dir).resolve()
+    fingerprinted, rewritten_count = fingerprint_build(build_dir)
+    rules = get_cache_rules(
+        build_dir, fingerprinted, html_max_age=args.html_max_age
+    )
+    headers_path = Path(args.headers or build_dir / HEADERS_FILENAME)
+    headers_path.write_text(format_headers(rules), encoding="utf-8")
+    print(
+        f"Fingerprinted {len(fingerprinted)} assets referenced from "
+        f"{rewritten_count} files; wrote {len(rules)} header rules to "
+        f"{headers_path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
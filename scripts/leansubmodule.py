@@ -0,0 +1,175 @@
+"""Check out a submodule shallowly, blobless and sparsely, and sync it."""
+
+# Standard library imports
+import argparse
+import subprocess
+from pathlib import Path
+
+
+# --- Constants --- #
+
+# Gitignore-style patterns of the paths needed to install and document
+# Spyder: its packaging files, requirements, package and external deps
+SPARSE_PATTERNS = (
+    "/*",
+    "!/*/",
+    "/requirements/",
+    "/external-deps/",
+    "/spyder/",
+    # Installed as data files on Linux by Spyder's setup.py
+    "/scripts/",
+    "/img_src/spyder.png",
+    "!tests/",
+)
+BLOB_FILTER = "blob:none"
+PARTIAL_CLONE_KEY = "extensions.partialClone"
+
+
+# --- Git --- #
+
+
+def run_git(*args, cwd):
+    """Run a Git command, returning its stripped output."""
+    result = subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    )
+    return result.stdout.strip()
+
+
+def get_config(key, *, cwd, file=None):
+    """Get a Git config value, or None if not set."""
+    file_args = ["--file", file] if file else []
+    try:
+        return run_git("config", *file_args, "--get", key, cwd=cwd)
+    except subprocess.CalledProcessError:
+        return None
+
+
+def get_submodule_name(repo_dir, submodule_path):
+    """Get the name of the submodule at a path, from .gitmodules."""
+    for line in run_git(
+        "config",
+        "--file",
+        ".gitmodules",
+        "--get-regexp",
+        r"^submodule\..*\.path$",
+        cwd=repo_dir,
+    ).splitlines():
+        key, path = line.split(maxsplit=1)
+        if path == Path(submodule_path).as_posix():
+            return key[len("submodule.") : -len(".path")]
+    raise ValueError(f"No submodule at {submodule_path} in .gitmodules")
+
+
+def is_lean(submodule_dir):
+    """Check if a submodule was checked out in lean (partial) mode."""
+    return get_config(PARTIAL_CLONE_KEY, cwd=submodule_dir) is not None
+
+
+# --- Commands --- #
+
+
+def init_lean(repo_dir, submodule_path, *, patterns=SPARSE_PATTERNS, url=None):
+    """Check out just the needed paths of a submodule's pinned commit.
+
+    Only the pinned commit's trees are fetched (depth 1, no blobs), and
+    the blobs of the sparse paths are then fetched on checkout. An existing
+    checkout is just narrowed down to the sparse paths.
+    """
+    repo_dir = Path(repo_dir)
+    submodule_dir = repo_dir / submodule_path
+    name = get_submodule_name(repo_dir, submodule_path)
+    run_git("submodule", "init", "--", str(submodule_path), cwd=repo_dir)
+    url = url or get_config(f"submodule.{name}.url", cwd=repo_dir)
+    commit = run_git("rev-parse", f"HEAD:{submodule_path}", cwd=repo_dir)
+
+    if (submodule_dir / ".git").exists():
+        print(
+            f"Submodule {name} already checked out; applying the sparse paths"
+        )
+        run_git(
+            "sparse-checkout", "set", "--no-cone", *patterns, cwd=submodule_dir
+        )
+        return
+
+    submodule_dir.mkdir(parents=True, exist_ok=True)
+    run_git("init", "--quiet", cwd=submodule_dir)
+    run_git("remote", "add", "origin", url, cwd=submodule_dir)
+    # Mark the remote as a promisor, so missing blobs are fetched on demand
+    run_git("config", "core.repositoryFormatVersion", "1", cwd=submodule_dir)
+    run_git("config", PARTIAL_CLONE_KEY, "origin", cwd=submodule_dir)
+    run_git("config", "remote.origin.promisor", "true", cwd=submodule_dir)
+    run_git(
+        "config",
+        "remote.origin.partialCloneFilter",
+        BLOB_FILTER,
+        cwd=submodule_dir,
+    )
+    run_git(
+        "sparse-checkout", "set", "--no-cone", *patterns, cwd=submodule_dir
+    )
+    run_git(
+        "fetch",
+        "--quiet",
+        "--depth=1",
+        f"--filter={BLOB_FILTER}",
+        "origin",
+        commit,
+        cwd=submodule_dir,
+    )
+    run_git("checkout", "--quiet", "--detach", commit, cwd=submodule_dir)
+    # Move the Git dir under the superproject's, like a regular submodule
+    run_git(
+        "submodule", "absorbgitdirs", "--", str(submodule_path), cwd=repo_dir
+    )
+    print(f"Checked out lean submodule {name} at {commit[:12]}")
+
+
+def sync(submodule_dir, *, remote="upstream", branch):
+    """Fetch a branch and rebase the submodule checkout onto it.
+
+    Lean checkouts only fetch the new commits and trees, and the blobs of
+    the sparse paths that changed.
+    """
+    filter_args = [f"--filter={BLOB_FILTER}"] if is_lean(submodule_dir) else []
+    run_git(
+        "fetch", "--quiet", *filter_args, remote, branch, cwd=submodule_dir
+    )
+    run_git("rebase", "--quiet", "FETCH_HEAD", cwd=submodule_dir)
+    print(
+        f"Synced {submodule_dir} to {remote}/{branch} at "
+        + run_git("rev-parse", "--short", "HEAD", cwd=submodule_dir)
+    )
+
+
+# --- CLI --- #
+
+
+def main(argv=None):
+    """Initialize a lean submodule checkout, or sync one."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    init_parser = subparsers.add_parser(
+        "init", help="check out the submodule's needed paths only"
+    )
+    init_parser.add_argument("path", help="submodule path in the repo")
+    init_parser.add_argument("--repo-dir", default=".")
+    init_parser.add_argument("--url", help="override the submodule URL")
+
+    sync_parser = subparsers.add_parser(
+        "sync", help="fetch and rebase onto a branch"
+    )
+    sync_parser.add_argument("path", help="submodule checkout dir")
+    sync_parser.add_argument("--remote", default="upstream")
+    sync_parser.add_argument("--branch", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "init":
+        init_lean(args.repo_dir, args.path, url=args.url)
+    else:
+        sync(args.path, remote=args.remote, branch=args.branch)
+
+
+if __name__ == "__main__":
+    main()
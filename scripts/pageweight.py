@@ -0,0 +1,332 @@
+"""Report the transfer size of each built page and check it against budgets."""
+
+# Standard library imports
+import argparse
+import fnmatch
+import functools
+import gzip
+import html.parser
+import json
+import os
+import re
+import sys
+import urllib.parse
+from pathlib import Path
+
+# Local imports
+import plaintable
+
+
+# --- Constants --- #
+
+# Page types, checked in order against the page paths relative to the site
+PAGE_TYPES = (
+    ("api", ("*_autosummary/*", "*reference.html", "*_modules/*")),
+    ("tutorial", ("*tutorial*",)),
+    ("other", ("*",)),
+)
+# Pages that are never rendered themselves, just redirecting elsewhere
+REDIRECT_PATTERN = re.compile(r"<meta[^>]+http-equiv=[\"']?refresh", re.I)
+FONT_FACE_PATTERN = re.compile(r"@font-face\s*{([^}]*)}", re.I)
+CSS_URL_PATTERN = re.compile(r"url\(\s*[\"']?([^\"')]+)[\"']?\s*\)", re.I)
+CSS_IMPORT_PATTERN = re.compile(
+    r"@import\s+(?:url\(\s*)?[\"']?([^\"')\s;]+)", re.I
+)
+LINK_RELS = {"stylesheet", "preload", "modulepreload", "icon"}
+# Dirs of the site that only hold resources or page fragments
+EXCLUDE_DIRS = {"_images", "_sources", "_static", ".doctrees"}
+DEFAULT_VIEWPORT_WIDTH = 1280
+DEFAULT_TOP = 10
+GZIP_LEVEL = 6
+KIB = 1024
+TABLE_HEADER = ("Page", "Type", "Files", "Raw (KiB)", "Sent (KiB)", "Budget")
+
+
+# --- Parsing --- #
+
+
+def pick_srcset_candidate(srcset, viewport_width):
+    """Pick the srcset candidate a browser would load at a viewport width."""
+    candidates = []
+    for candidate in srcset.split(","):
+        url, __, descriptor = candidate.strip().partition(" ")
+        descriptor = descriptor.strip()
+        width = int(descriptor[:-1]) if descriptor.endswith("w") else 0
+        candidates.append((width, url))
+    if not candidates:
+        return None
+    wide_enough = [item for item in candidates if item[0] >= viewport_width]
+    return min(wide_enough)[1] if wide_enough else max(candidates)[1]
+
+
+class ResourceParser(html.parser.HTMLParser):
+    """Collect the URLs of the resources an HTML page loads."""
+
+    def __init__(self, viewport_width):
+        super().__init__(convert_charrefs=True)
+        self.viewport_width = viewport_width
+        self.urls = []
+        self._picture_source = None
+        self._in_picture = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        # The sidebar navigation fragment loaded by the sharednav extension
+        if attrs.get("data-shared-nav"):
+            self.urls.append(attrs["data-shared-nav"])
+        handler = getattr(self, f"_start_{tag}", None)
+        if handler is not None:
+            handler(attrs)
+
+    def _start_link(self, attrs):
+        rels = set((attrs.get("rel") or "").lower().split())
+        if rels & LINK_RELS and attrs.get("href"):
+            self.urls.append(attrs["href"])
+
+    def _start_script(self, attrs):
+        if attrs.get("src"):
+            self.urls.append(attrs["src"])
+
+    def _start_picture(self, _attrs):
+        self._in_picture = True
+        self._picture_source = None
+
+    def _start_source(self, attrs):
+        # The browser loads the first matching source (assumed to be the
+        # first one) of a picture instead of its fallback image
+        if (
+            self._in_picture
+            and self._picture_source is None
+            and attrs.get("srcset")
+        ):
+            self._picture_source = pick_srcset_candidate(
+                attrs["srcset"], self.viewport_width
+            )
+
+    def _start_img(self, attrs):
+        url = self._picture_source if self._in_picture else None
+        if url is None and attrs.get("srcset"):
+            url = pick_srcset_candidate(attrs["srcset"], self.viewport_width)
+        url = url or attrs.get("src")
+        if url:
+            self.urls.append(url)
+
+    def _start_video(self, attrs):
+        if attrs.get("poster"):
+            self.urls.append(attrs["poster"])
+
+    def handle_endtag(self, tag):
+        if tag == "picture":
+            self._in_picture = False
+            self._picture_source = None
+
+
+def resolve_url(url, base_path, site_dir):
+    """Resolve a resource URL to a local path, or None if external."""
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme or parsed.netloc or not parsed.path:
+        return None
+    relpath = urllib.parse.unquote(parsed.path)
+    if relpath.startswith("/"):
+        return (site_dir / relpath.lstrip("/")).resolve()
+    return (base_path.parent / relpath).resolve()
+
+
+def get_css_urls(css_text):
+    """Get the imports and the fonts (first source per face) of a CSS file."""
+    urls = CSS_IMPORT_PATTERN.findall(css_text)
+    for font_face in FONT_FACE_PATTERN.findall(css_text):
+        font_urls = CSS_URL_PATTERN.findall(font_face)
+        if font_urls:
+            urls.append(font_urls[0])
+    return urls
+
+
+# --- Measuring --- #
+
+
+@functools.lru_cache(maxsize=None)
+def get_file_sizes(path):
+    """Get the raw and transferred (gzipped if smaller) size of a file."""
+    data = path.read_bytes()
+    gzip_size = len(gzip.compress(data, compresslevel=GZIP_LEVEL))
+    # Already compressed files (e.g. images and fonts) are sent as they are
+    return len(data), min(len(data), gzip_size)
+
+
+@functools.lru_cache(maxsize=None)
+def get_css_dependencies(path, site_dir):
+    """Get the local files a stylesheet loads, recursively."""
+    dependencies = set()
+    pending = [path]
+    while pending:
+        css_path = pending.pop()
+        css_text = css_path.read_text(encoding="utf-8", errors="replace")
+        for url in get_css_urls(css_text):
+            dependency = resolve_url(url, css_path, site_dir)
+            if dependency is None or dependency in dependencies:
+                continue
+            dependencies.add(dependency)
+            if dependency.suffix == ".css" and dependency.is_file():
+                pending.append(dependency)
+    return frozenset(dependencies)
+
+
+def get_page_type(relpath):
+    """Get the type of a page from its path relative to the site dir."""
+    for page_type, patterns in PAGE_TYPES:
+        if any(fnmatch.fnmatch(relpath, pattern) for pattern in patterns):
+            return page_type
+    return PAGE_TYPES[-1][0]
+
+
+def measure_page(path, site_dir, *, viewport_width=DEFAULT_VIEWPORT_WIDTH):
+    """Measure a page and the local resources it loads, raw and as sent."""
+    page_text = path.read_text(encoding="utf-8", errors="replace")
+    if REDIRECT_PATTERN.search(page_text):
+        return None
+    parser = ResourceParser(viewport_width)
+    parser.feed(page_text)
+
+    resources = {path.resolve()}
+    external = set()
+    for url in parser.urls:
+        resource = resolve_url(url, path, site_dir)
+        if resource is None:
+            external.add(url)
+            continue
+        resources.add(resource)
+        if resource.suffix == ".css" and resource.is_file():
+            resources |= get_css_dependencies(resource, site_dir)
+
+    raw_size = sent_size = 0
+    missing = []
+    for resource in sorted(resources):
+        if not resource.is_file():
+            missing.append(
+                Path(os.path.relpath(resource, site_dir)).as_posix()
+            )
+            continue
+        resource_raw_size, resource_sent_size = get_file_sizes(resource)
+        raw_size += resource_raw_size
+        sent_size += resource_sent_size
+
+    relpath = path.relative_to(site_dir).as_posix()
+    return {
+        "page": relpath,
+        "type": get_page_type(relpath),
+        "files": len(resources) - len(missing),
+        "raw": raw_size,
+        "sent": sent_size,
+        "missing": missing,
+        "external": sorted(external),
+    }
+
+
+def measure_site(site_dir, *, exclude=(), viewport_width=None):
+    """Measure every page under a built site dir, heaviest first."""
+    site_dir = Path(site_dir).resolve()
+    pages = []
+    for path in sorted(site_dir.rglob("*.html")):
+        relpath = path.relative_to(site_dir)
+        if EXCLUDE_DIRS.union(exclude).intersection(relpath.parts[:-1]):
+            continue
+        page = measure_page(
+            path,
+            site_dir,
+            viewport_width=viewport_width or DEFAULT_VIEWPORT_WIDTH,
+        )
+        if page is not None:
+            pages.append(page)
+    return sorted(pages, key=lambda page: page["sent"], reverse=True)
+
+
+def check_budgets(pages, budgets):
+    """Get the pages whose sent size exceeds their type's budget."""
+    return [
+        page
+        for page in pages
+        if page["type"] in budgets
+        and page["sent"] > budgets[page["type"]] * KIB
+    ]
+
+
+# --- CLI --- #
+
+
+def format_table(pages, budgets):
+    """Format the page sizes as a plain-text table."""
+    table_rows = [
+        (
+            page["page"],
+            page["type"],
+            str(page["files"]),
+            f"{page['raw'] / KIB:.0f}",
+            f"{page['sent'] / KIB:.0f}",
+            str(budgets.get(page["type"], "-")),
+        )
+        for page in pages
+    ]
+    return plaintable.format_table(TABLE_HEADER, table_rows, text_columns=2)
+
+
+def parse_budget(value):
+    """Parse a TYPE=KIB budget option."""
+    page_type, __, size = value.partition("=")
+    try:
+        return page_type, int(size)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(
+            f"Budget must be TYPE=KIB, not {value!r}"
+        ) from error
+
+
+def main(argv=None):
+    """Report the heaviest pages and fail if any is over its budget."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("site_dir", help="built HTML site dir")
+    parser.add_argument(
+        "--budget",
+        action="append",
+        default=[],
+        type=parse_budget,
+        help="max KiB sent for a page type (api, tutorial or other)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        help="dir to skip (such as a copy of another version)",
+    )
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP)
+    parser.add_argument(
+        "--viewport-width", type=int, default=DEFAULT_VIEWPORT_WIDTH
+    )
+    parser.add_argument("--output", help="path to write the JSON report to")
+    args = parser.parse_args(argv)
+
+    budgets = dict(args.budget)
+    pages = measure_site(
+        args.site_dir,
+        exclude=set(args.exclude),
+        viewport_width=args.viewport_width,
+    )
+    over_budget = check_budgets(pages, budgets)
+    print(f"Heaviest of {len(pages)} pages:")
+    print(format_table(pages[: args.top], budgets))
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        report = {"budgets": budgets, "pages": pages}
+        output_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Page weight report written to {output_path}")
+
+    if over_budget:
+        print(f"\n{len(over_budget)} pages over budget:", file=sys.stderr)
+        print(format_table(over_budget, budgets), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""Format rows of text cells as an aligned plain-text table."""
+
+
+def format_table(header, rows, *, text_columns=1):
+    """Format a table, left-aligning the text columns and right the rest."""
+    rows = [header, *rows]
+    widths = [max(len(row[idx]) for row in rows) for idx in range(len(header))]
+    return "\n".join(
+        "  ".join(
+            cell.ljust(width) if idx < text_columns else cell.rjust(width)
+            for idx, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in rows
+    )
@@ -0,0 +1,161 @@
+"""Break down Sphinx start-up time by conf.py and extension import/setup."""
+
+# Standard library imports
+import argparse
+import importlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Local imports
+import plaintable
+
+
+# --- Constants --- #
+
+DEFAULT_SOURCE_DIR = Path(__file__).resolve().parents[1] / "docs"
+DEFAULT_BUILDER = "html"
+TABLE_HEADER = ("Extension", "Import (ms)", "Setup (ms)", "Total (ms)")
+
+
+class StartupProfiler:
+    """Record import and setup times of each extension as it is loaded."""
+
+    def __init__(self):
+        self.timings = {}
+        self.conf_time = 0.0
+        self._nested_times = [0.0]
+
+    def wrap_load_extension(self, load_extension):
+        """Wrap the registry's extension loader to time each extension."""
+
+        def timed_load_extension(registry, app, extname):
+            if extname in app.extensions or extname in self.timings:
+                return load_extension(registry, app, extname)
+
+            import_time = 0.0
+            if extname not in sys.modules:
+                start_time = time.perf_counter()
+                importlib.import_module(extname)
+                import_time = time.perf_counter() - start_time
+
+            self._nested_times.append(0.0)
+            start_time = time.perf_counter()
+            try:
+                return load_extension(registry, app, extname)
+            finally:
+                total_time = time.perf_counter() - start_time
+                nested_time = self._nested_times.pop()
+                self._nested_times[-1] += total_time + import_time
+                self.timings[extname] = {
+                    "import": import_time,
+                    "setup": total_time - nested_time,
+                }
+
+        return timed_load_extension
+
+    def wrap_eval_config_file(self, eval_config_file):
+        """Wrap the conf.py evaluation function to time it."""
+
+        def timed_eval_config_file(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return eval_config_file(*args, **kwargs)
+            finally:
+                self.conf_time += time.perf_counter() - start_time
+
+        return timed_eval_config_file
+
+
+def profile_startup(source_dir, *, builder=DEFAULT_BUILDER, tags=()):
+    """Start a Sphinx application without building and time its parts."""
+    # pylint: disable = import-outside-toplevel
+    start_time = time.perf_counter()
+    import sphinx.application
+    import sphinx.config
+    import sphinx.registry
+
+    sphinx_import_time = time.perf_counter() - start_time
+
+    profiler = StartupProfiler()
+    registry_class = sphinx.registry.SphinxComponentRegistry
+    registry_class.load_extension = profiler.wrap_load_extension(
+        registry_class.load_extension
+    )
+    sphinx.config.eval_config_file = profiler.wrap_eval_config_file(
+        sphinx.config.eval_config_file
+    )
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        start_time = time.perf_counter()
+        app = sphinx.application.Sphinx(
+            srcdir=source_dir,
+            confdir=source_dir,
+            outdir=build_dir,
+            doctreedir=Path(build_dir) / ".doctrees",
+            buildername=builder,
+            status=None,
+            warning=io.StringIO(),
+            freshenv=True,
+            tags=tags,
+        )
+        app_init_time = time.perf_counter() - start_time
+
+    return {
+        "sphinx_import": sphinx_import_time,
+        "conf_py": profiler.conf_time,
+        "app_init": app_init_time,
+        "extensions": profiler.timings,
+        "configured_extensions": list(app.config.extensions),
+    }
+
+
+def format_report(report, *, limit=None):
+    """Format a start-up report as a ranked plain-text table."""
+    rows = sorted(
+        report["extensions"].items(),
+        key=lambda item: item[1]["import"] + item[1]["setup"],
+        reverse=True,
+    )
+    if limit:
+        rows = rows[:limit]
+    configured = set(report["configured_extensions"])
+    table_rows = [
+        (
+            f"{'*' if extname in configured else ' '} {extname}",
+            f"{timing['import'] * 1000:.1f}",
+            f"{timing['setup'] * 1000:.1f}",
+            f"{(timing['import'] + timing['setup']) * 1000:.1f}",
+        )
+        for extname, timing in rows
+    ]
+    lines = [
+        f"Import Sphinx:          {report['sphinx_import'] * 1000:8.1f} ms",
+        f"Evaluate conf.py:       {report['conf_py'] * 1000:8.1f} ms",
+        f"Initialize application: {report['app_init'] * 1000:8.1f} ms",
+        "",
+    ]
+    lines.append(plaintable.format_table(TABLE_HEADER, table_rows))
+    lines += ["", "* = listed in conf.py extensions"]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Profile start-up and print a report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-t", "--tag", action="append", default=[])
+    parser.add_argument("-b", "--builder", default=DEFAULT_BUILDER)
+    parser.add_argument("--source-dir", default=DEFAULT_SOURCE_DIR)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    report = profile_startup(
+        Path(args.source_dir).resolve(), builder=args.builder, tags=args.tag
+    )
+    print(format_report(report, limit=args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,668 @@
+"""Prune unused CSS, subset fonts and defer scripts in a built site."""
+
+# Standard library imports
+import argparse
+import hashlib
+import html.parser
+import io
+import json
+import os
+import posixpath
+import re
+import string
+import urllib.parse
+from pathlib import Path
+
+# Third party imports
+try:
+    from fontTools import subset
+except ImportError:
+    subset = None
+
+
+# --- Constants --- #
+
+# Dirs of a site that only hold resources or page fragments
+EXCLUDE_DIRS = {"_images", "_sources", "_static", ".doctrees"}
+STATIC_DIRNAME = "_static"
+# Stylesheets up to this size (after pruning) are inlined into the pages
+DEFAULT_INLINE_MAX_BYTES = 2048
+FINGERPRINT_LENGTH = 10
+FINGERPRINT_PATTERN = re.compile(rf"\.[0-9a-f]{{{FINGERPRINT_LENGTH}}}$")
+WEB_FONT_SUFFIXES = {".woff2", ".woff"}
+FONT_SUFFIXES = WEB_FONT_SUFFIXES | {".ttf", ".otf"}
+# Characters kept in every font, for text inserted by scripts
+BASE_CHARACTERS = set(string.printable)
+GROUPING_AT_RULES = {"@media", "@supports", "@layer", "@container", "@scope"}
+JS_MIME_TYPES = {"", "text/javascript", "application/javascript"}
+
+COMMENT_OR_STRING_PATTERN = re.compile(
+    r"/\*.*?\*/|\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'", re.S
+)
+STRING_PATTERN = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'", re.S)
+CSS_URL_PATTERN = re.compile(r"url\(\s*([\"']?)([^\"')]+)\1\s*\)", re.I)
+CSS_IMPORT_PATTERN = re.compile(
+    r"@import\s+(?:url\(\s*)?([\"']?)([^\"')\s;]+)\1\s*\)?\s*([^;]*);",
+    re.I,
+)
+CSS_ESCAPE_PATTERN = re.compile(r"\\([0-9a-fA-F]{1,6})\s?|\\(.)", re.S)
+SELECTOR_NAME_PATTERN = re.compile(r"[.#]((?:\\.|[\w-])+)")
+SELECTOR_ARGS_PATTERN = re.compile(r"\([^()]*\)|\[[^\]]*\]")
+JS_TOKEN_PATTERN = re.compile(r"[A-Za-z_][\w-]*")
+JS_DECLARATION_PATTERN = re.compile(
+    r"^(?:var|let|const|function|class)\s+([A-Za-z_$][\w$]*)"
+    + r"|\bwindow\.([A-Za-z_$][\w$]*)\s*=",
+    re.M,
+)
+JS_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_$][\w$]*")
+LINK_TAG_PATTERN = re.compile(r"<link\b[^>]*>", re.I)
+# The precache list of the service worker written by the instantnav extension
+SERVICE_WORKER_FILENAME = "service-worker.js"
+PRECACHE_URLS_PATTERN = re.compile(
+    r"^(const PRECACHE_URLS = )(\[.*\]);$", re.M
+)
+SCRIPT_TAG_PATTERN = re.compile(
+    r"<script\b([^>]*)>(.*?)</script>", re.I | re.S
+)
+ATTRIBUTE_PATTERN = re.compile(
+    r"([\w:-]+)(?:\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s\"'>]+)))?"
+)
+
+
+# --- Helpers --- #
+
+
+def parse_attributes(tag_text):
+    """Parse the attributes of an HTML start tag into a dict."""
+    __, __, attributes_text = tag_text.strip().partition(" ")
+    return {
+        match.group(1).lower(): next(
+            (value for value in match.groups()[1:] if value is not None), ""
+        )
+        for match in ATTRIBUTE_PATTERN.finditer(attributes_text.rstrip("/>"))
+    }
+
+
+def resolve_local_url(url, base_dir, site_dir):
+    """Resolve a relative or root URL to a local path, or None if remote."""
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme or parsed.netloc or not parsed.path:
+        return None
+    path = urllib.parse.unquote(parsed.path)
+    if path.startswith("/"):
+        return (site_dir / path.lstrip("/")).resolve()
+    return (base_dir / path).resolve()
+
+
+def get_relative_url(path, base_dir):
+    """Get the relative URL of a path from a dir."""
+    return Path(os.path.relpath(path, base_dir)).as_posix()
+
+
+def with_fingerprint(path, digest):
+    """Get a path with a content hash in its name, replacing any older one."""
+    stem = FINGERPRINT_PATTERN.sub("", path.stem)
+    return path.with_name(f"{stem}.{digest[:FINGERPRINT_LENGTH]}{path.suffix}")
+
+
+def fingerprint_path(path, data):
+    """Get the content-hashed name of a file, next to the original."""
+    return with_fingerprint(path, hashlib.sha256(data).hexdigest())
+
+
+def write_fingerprinted(path, data):
+    """Write data to the content-hashed variant of a path, returning it."""
+    output_path = fingerprint_path(path, data)
+    if not output_path.exists():
+        output_path.write_bytes(data)
+    return output_path
+
+
+# --- CSS --- #
+
+
+def strip_comments(css_text):
+    """Remove the comments from CSS, leaving strings as they are."""
+    return COMMENT_OR_STRING_PATTERN.sub(
+        lambda match: (
+            "" if match.group(0).startswith("/*") else match.group(0)
+        ),
+        css_text,
+    )
+
+
+def parse_css(css_text):
+    """Split CSS into (prelude, block) rules; the block is None if none."""
+    rules = []
+    start = pos = depth = prelude_end = 0
+    while pos < len(css_text):
+        char = css_text[pos]
+        if char in "\"'":
+            match = STRING_PATTERN.match(css_text, pos)
+            pos = match.end() if match else len(css_text)
+            continue
+        if char == "\\":
+            pos += 2
+            continue
+        if char == "{":
+            prelude_end = prelude_end if depth else pos
+            depth += 1
+        elif char == "}" and depth == 1:
+            depth = 0
+            block = css_text[prelude_end + 1 : pos]
+            rules.append((css_text[start:prelude_end].strip(), block))
+            start = pos + 1
+        elif char == "}" and depth:
+            depth -= 1
+        elif char == ";" and not depth:
+            rules.append((css_text[start : pos + 1].strip(), None))
+            start = pos + 1
+        pos += 1
+    if css_text[start:].strip():
+        rules.append((css_text[start:].strip(), None))
+    return rules
+
+
+def split_selectors(prelude):
+    """Split a selector list on its top-level commas."""
+    selectors = []
+    depth = start = 0
+    for pos, char in enumerate(prelude):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and not depth:
+            selectors.append(prelude[start:pos].strip())
+            start = pos + 1
+    selectors.append(prelude[start:].strip())
+    return [selector for selector in selectors if selector]
+
+
+def is_selector_used(selector, used_names):
+    """Check if all classes and IDs a selector requires are used anywhere.
+
+    Arguments of functional pseudo-classes (like ``:not()``) and attribute
+    selectors are ignored, so selectors are only dropped when certain.
+    """
+    simplified = selector
+    while True:
+        simplified, count = SELECTOR_ARGS_PATTERN.subn("", simplified)
+        if not count:
+            break
+    for match in SELECTOR_NAME_PATTERN.finditer(simplified):
+        name = match.group(1)
+        if "\\" not in name and name not in used_names:
+            return False
+    return True
+
+
+def prune_css(css_text, used_names):
+    """Remove the style rules whose selectors can't match any page."""
+    output = []
+    for prelude, block in parse_css(css_text):
+        if block is None:
+            output.append(prelude)
+            continue
+        if prelude.startswith("@"):
+            at_rule = re.split(r"[\s(]", prelude, maxsplit=1)[0].lower()
+            if at_rule not in GROUPING_AT_RULES:
+                output.append(f"{prelude}{{{block}}}")
+            elif pruned_block := prune_css(block, used_names):
+                output.append(f"{prelude}{{{pruned_block}}}")
+            continue
+        selectors = [
+            selector
+            for selector in split_selectors(prelude)
+            if is_selector_used(selector, used_names)
+        ]
+        if selectors:
+            output.append(f"{','.join(selectors)}{{{block.strip()}}}")
+    return "".join(output)
+
+
+def rebase_urls(css_text, from_dir, to_dir, *, replacements=None):
+    """Make the relative URLs in CSS relative to another dir."""
+    replacements = replacements or {}
+
+    def replace_url(match):
+        quote, url = match.groups()
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme or parsed.netloc or url.startswith(("/", "#")):
+            return match.group(0)
+        path = (from_dir / urllib.parse.unquote(parsed.path)).resolve()
+        path = replacements.get(path, path)
+        new_url = urllib.parse.urlunsplit(
+            ("", "", get_relative_url(path, to_dir), parsed.query, "")
+        )
+        if parsed.fragment:
+            new_url += f"#{parsed.fragment}"
+        return f"url({quote}{new_url}{quote})"
+
+    return CSS_URL_PATTERN.sub(replace_url, css_text)
+
+
+def load_css(path, site_dir, *, seen=None):
+    """Read a stylesheet, inlining the local files it imports."""
+    seen = set() if seen is None else seen
+    seen.add(path)
+    css_text = strip_comments(path.read_text(encoding="utf-8"))
+
+    def inline_import(match):
+        __, url, conditions = match.groups()
+        import_path = resolve_local_url(url, path.parent, site_dir)
+        if (
+            conditions.strip()
+            or import_path is None
+            or import_path in seen
+            or not import_path.is_file()
+        ):
+            return match.group(0)
+        imported_text = load_css(import_path, site_dir, seen=seen)
+        return rebase_urls(imported_text, import_path.parent, path.parent)
+
+    return CSS_IMPORT_PATTERN.sub(inline_import, css_text)
+
+
+def get_font_urls(css_text):
+    """Get the URLs of the fonts declared in @font-face rules."""
+    urls = []
+    for prelude, block in parse_css(css_text):
+        if block is None:
+            continue
+        if prelude.lower().startswith("@font-face"):
+            urls += [
+                match.group(2) for match in CSS_URL_PATTERN.finditer(block)
+            ]
+        elif prelude.startswith("@"):
+            urls += get_font_urls(block)
+    return urls
+
+
+def get_string_characters(css_text):
+    """Get the characters in the strings of CSS (such as icon contents)."""
+    characters = set()
+    for match in STRING_PATTERN.finditer(css_text):
+        value = CSS_ESCAPE_PATTERN.sub(
+            lambda escape: (
+                chr(int(escape.group(1), 16))
+                if escape.group(1)
+                else escape.group(2)
+            ),
+            match.group(0)[1:-1],
+        )
+        characters.update(value)
+    return characters
+
+
+# --- Fonts --- #
+
+
+def subset_font(path, characters):
+    """Subset a font to the given characters, returning its bytes."""
+    options = subset.Options()
+    options.flavor = (
+        path.suffix[1:] if path.suffix in WEB_FONT_SUFFIXES else None
+    )
+    options.layout_features = ["*"]
+    options.notdef_outline = True
+    font = subset.load_font(str(path), options)
+    subsetter = subset.Subsetter(options=options)
+    subsetter.populate(unicodes={ord(character) for character in characters})
+    subsetter.subset(font)
+    output = io.BytesIO()
+    subset.save_font(font, output, options)
+    return output.getvalue()
+
+
+# --- HTML --- #
+
+
+class TokenParser(html.parser.HTMLParser):
+    """Collect the classes, IDs, text and inline scripts of HTML pages."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.names = set()
+        self.characters = set()
+        self.scripts = []
+        self._in_script = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        self.names.update((attrs.get("class") or "").split())
+        if attrs.get("id"):
+            self.names.add(attrs["id"])
+        self._in_script = tag == "script"
+
+    def handle_endtag(self, tag):
+        self._in_script = False
+
+    def handle_data(self, data):
+        if self._in_script:
+            self.scripts.append(data)
+        else:
+            self.characters.update(data)
+
+
+def get_script_declarations(path, cache):
+    """Get the global names a classic script declares at its top level."""
+    if path not in cache:
+        cache[path] = (
+            {
+                name
+                for match in JS_DECLARATION_PATTERN.finditer(
+                    path.read_text(encoding="utf-8", errors="replace")
+                )
+                for name in match.groups()
+                if name
+            }
+            if path.is_file()
+            else set()
+        )
+    return cache[path]
+
+
+def defer_scripts(page_text, page_path, site_dir, declarations_cache):
+    """Defer the external scripts no later inline script depends on.
+
+    All external scripts after the last one defining a global used by a
+    later inline script are deferred, which keeps their relative order.
+    """
+    scripts = []
+    for match in SCRIPT_TAG_PATTERN.finditer(page_text):
+        attrs = parse_attributes(f"<script {match.group(1)}")
+        if attrs.get("type", "").lower() not in JS_MIME_TYPES:
+            continue
+        scripts.append((match, attrs))
+
+    last_critical = -1
+    for idx, (match, attrs) in enumerate(scripts):
+        src = attrs.get("src")
+        if not src or "defer" in attrs or "async" in attrs:
+            continue
+        path = resolve_local_url(src, page_path.parent, site_dir)
+        names = (
+            get_script_declarations(path, declarations_cache) if path else None
+        )
+        for later_match, later_attrs in scripts[idx + 1 :]:
+            if later_attrs.get("src"):
+                continue
+            used_names = set(
+                JS_IDENTIFIER_PATTERN.findall(later_match.group(2))
+            )
+            # Remote scripts may declare anything
+            if names is None or names & used_names:
+                last_critical = idx
+                break
+
+    deferred_count = 0
+    for match, attrs in reversed(scripts[last_critical + 1 :]):
+        if not attrs.get("src") or "defer" in attrs or "async" in attrs:
+            continue
+        page_text = (
+            f"{page_text[: match.start()]}<script defer"
+            f"{page_text[match.start() + len('<script') :]}"
+        )
+        deferred_count += 1
+    return page_text, deferred_count
+
+
+# --- Sites --- #
+
+
+def find_sites(root_dir):
+    """Find the built sites (dirs with their own static dir) under a dir."""
+    root_dir = Path(root_dir).resolve()
+    return sorted(
+        path.parent
+        for path in root_dir.rglob(STATIC_DIRNAME)
+        if path.is_dir()
+        and STATIC_DIRNAME not in path.relative_to(root_dir).parts[:-1]
+    )
+
+
+def get_site_files(site_dir, sites, pattern):
+    """Get the files of a site matching a pattern, not in nested sites."""
+    files = []
+    for path in sorted(site_dir.rglob(pattern)):
+        parent_dirs = path.relative_to(site_dir).parents
+        if any(
+            site_dir / parent in sites and parent != Path()
+            for parent in parent_dirs
+        ):
+            continue
+        files.append(path)
+    return files
+
+
+def get_page_stylesheets(page_text, page_path, site_dir):
+    """Get the local stylesheets a page links to."""
+    stylesheets = []
+    for tag_match in LINK_TAG_PATTERN.finditer(page_text):
+        attrs = parse_attributes(tag_match.group(0))
+        if "stylesheet" not in attrs.get("rel", "").lower().split():
+            continue
+        css_path = resolve_local_url(
+            attrs.get("href", ""), page_path.parent, site_dir
+        )
+        if css_path is not None and css_path.is_file():
+            stylesheets.append(css_path)
+    return stylesheets
+
+
+def collect_site_usage(site_dir, sites, html_paths):
+    """Collect the names and characters any page (or script) could need."""
+    used_names = set()
+    characters = set(BASE_CHARACTERS)
+    stylesheets = set()
+    for path in html_paths:
+        page_text = path.read_text(encoding="utf-8", errors="replace")
+        parser = TokenParser()
+        parser.feed(page_text)
+        used_names |= parser.names
+        characters |= parser.characters
+        for script in parser.scripts:
+            used_names.update(JS_TOKEN_PATTERN.findall(script))
+        stylesheets.update(get_page_stylesheets(page_text, path, site_dir))
+    for js_path in get_site_files(site_dir, sites, "*.js"):
+        used_names.update(
+            JS_TOKEN_PATTERN.findall(
+                js_path.read_text(encoding="utf-8", errors="replace")
+            )
+        )
+    return used_names, characters, sorted(stylesheets)
+
+
+def is_font_to_subset(font_path, font_replacements):
+    """Check if a font is a local one that hasn't been subset yet."""
+    return (
+        subset is not None
+        and font_path is not None
+        and font_path not in font_replacements
+        and font_path.suffix in FONT_SUFFIXES
+        # Already subset by a previous run
+        and not FINGERPRINT_PATTERN.search(font_path.stem)
+        and font_path.is_file()
+    )
+
+
+def subset_site_fonts(pruned_css, site_dir, characters, stats):
+    """Subset the fonts the pruned stylesheets use, mapping them to copies."""
+    font_replacements = {}
+    for css_path, css_text in pruned_css.items():
+        for url in get_font_urls(css_text):
+            font_path = resolve_local_url(url, css_path.parent, site_dir)
+            if not is_font_to_subset(font_path, font_replacements):
+                continue
+            try:
+                font_data = subset_font(font_path, characters)
+            except ImportError as error:
+                # E.g. Brotli isn't installed for WOFF2 fonts
+                print(f"Could not subset {font_path.name}: {error}")
+                font_replacements[font_path] = font_path
+                continue
+            stats["fonts_before"] += font_path.stat().st_size
+            stats["fonts_after"] += len(font_data)
+            font_replacements[font_path] = write_fingerprinted(
+                font_path, font_data
+            )
+    return font_replacements
+
+
+def write_stylesheets(pruned_css, font_replacements, inline_max_bytes, stats):
+    """Write the pruned stylesheets, unless small enough to inline."""
+    outputs = {}
+    for css_path, pruned_text in pruned_css.items():
+        css_text = rebase_urls(
+            pruned_text,
+            css_path.parent,
+            css_path.parent,
+            replacements=font_replacements,
+        )
+        css_data = css_text.encode()
+        stats["css_after"] += len(css_data)
+        if (
+            len(css_data) <= inline_max_bytes
+            and "</style" not in css_text.lower()
+        ):
+            outputs[css_path] = ("inline", css_text)
+        else:
+            outputs[css_path] = (
+                "file",
+                write_fingerprinted(css_path, css_data),
+            )
+    return outputs
+
+
+def rewrite_page(path, site_dir, outputs, declarations_cache, stats):
+    """Point a page to the pruned stylesheets and defer its scripts."""
+    page_dir = path.parent
+
+    def replace_stylesheet(tag_match):
+        attrs = parse_attributes(tag_match.group(0))
+        if "stylesheet" not in attrs.get("rel", "").lower().split():
+            return tag_match.group(0)
+        css_path = resolve_local_url(attrs.get("href", ""), page_dir, site_dir)
+        if css_path not in outputs:
+            return tag_match.group(0)
+        kind, output = outputs[css_path]
+        if kind == "inline":
+            stats["inlined"] += 1
+            css_text = rebase_urls(output, css_path.parent, page_dir)
+            return f"<style>{css_text}</style>"
+        return tag_match.group(0).replace(
+            attrs["href"], get_relative_url(output, page_dir)
+        )
+
+    page_text = path.read_text(encoding="utf-8")
+    page_text = LINK_TAG_PATTERN.sub(replace_stylesheet, page_text)
+    page_text, deferred_count = defer_scripts(
+        page_text, path, site_dir, declarations_cache
+    )
+    stats["deferred"] += deferred_count
+    path.write_text(page_text, encoding="utf-8")
+
+
+def update_service_worker(site_dir, outputs):
+    """Point the service worker's precache list to the pruned stylesheets."""
+    service_worker_path = site_dir / SERVICE_WORKER_FILENAME
+    if not service_worker_path.is_file():
+        return
+    script = service_worker_path.read_text(encoding="utf-8")
+    match = PRECACHE_URLS_PATTERN.search(script)
+    if match is None:
+        return
+    precache_urls = []
+    for url in json.loads(match.group(2)):
+        kind, output = outputs.get(
+            resolve_local_url(url, site_dir, site_dir), (None, None)
+        )
+        # Inlined stylesheets are cached along with the pages
+        if kind != "inline":
+            precache_urls.append(
+                get_relative_url(output, site_dir) if kind == "file" else url
+            )
+    script = (
+        f"{script[: match.start()]}{match.group(1)}"
+        f"{json.dumps(precache_urls)};{script[match.end() :]}"
+    )
+    service_worker_path.write_text(script, encoding="utf-8")
+
+
+def prune_site(site_dir, sites, *, inline_max_bytes=DEFAULT_INLINE_MAX_BYTES):
+    """Prune the assets of one built site, and rewrite its pages to them."""
+    html_paths = get_site_files(site_dir, sites, "*.html")
+    page_paths = [
+        path
+        for path in html_paths
+        if not EXCLUDE_DIRS.intersection(path.relative_to(site_dir).parts)
+    ]
+    stats = {"pages": len(page_paths), "css_before": 0, "css_after": 0}
+    stats.update(fonts_before=0, fonts_after=0, inlined=0, deferred=0)
+
+    used_names, characters, stylesheets = collect_site_usage(
+        site_dir, sites, html_paths
+    )
+    pruned_css = {}
+    for css_path in stylesheets:
+        stats["css_before"] += css_path.stat().st_size
+        pruned_css[css_path] = prune_css(
+            load_css(css_path, site_dir), used_names
+        )
+    characters |= get_string_characters("".join(pruned_css.values()))
+    font_replacements = subset_site_fonts(
+        pruned_css, site_dir, characters, stats
+    )
+    outputs = write_stylesheets(
+        pruned_css, font_replacements, inline_max_bytes, stats
+    )
+
+    declarations_cache = {}
+    for path in page_paths:
+        rewrite_page(path, site_dir, outputs, declarations_cache, stats)
+    update_service_worker(site_dir, outputs)
+    return stats
+
+
+# --- CLI --- #
+
+
+def main(argv=None):
+    """Prune the theme assets of every site under a built HTML dir."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("build_dir", help="built HTML dir")
+    parser.add_argument(
+        "--inline-max-bytes",
+        type=int,
+        default=DEFAULT_INLINE_MAX_BYTES,
+        help="inline pruned stylesheets up to this size",
+    )
+    args = parser.parse_args(argv)
+
+    if subset is None:
+        print("fontTools not installed; skipping font subsetting")
+    sites = find_sites(args.build_dir)
+    for site_dir in sites:
+        stats = prune_site(
+            site_dir, set(sites), inline_max_bytes=args.inline_max_bytes
+        )
+        name = posixpath.normpath(
+            posixpath.join(
+                Path(args.build_dir).name,
+                get_relative_url(site_dir, Path(args.build_dir).resolve()),
+            )
+        )
+        print(
+            f"{name}: {stats['pages']} pages; "
+            f"CSS {stats['css_before'] // 1024} -> "
+            f"{stats['css_after'] // 1024} KiB; "
+            f"fonts {stats['fonts_before'] // 1024} -> "
+            f"{stats['fonts_after'] // 1024} KiB; "
+            f"{stats['inlined']} stylesheets inlined; "
+            f"{stats['deferred']} scripts deferred"
+        )
+
+
+if __name__ == "__main__":
+    main()
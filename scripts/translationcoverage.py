@@ -0,0 +1,274 @@
+"""Measure how much of the docs is translated, and fill in the rest."""
+
+# Standard library imports
+import argparse
+import json
+import os
+import shutil
+from pathlib import Path
+
+# Third party imports
+from babel.messages.pofile import read_po
+
+# Local imports
+import plaintable
+
+
+# --- Constants --- #
+
+SOURCE_SUFFIXES = (".rst", ".md")
+# Dirs of the source dir that never hold documents
+EXCLUDE_DIRS = {"_build", "_ext", "_static", "_templates", "locales"}
+CATALOG_DIRNAME = "LC_MESSAGES"
+# Dirs of a build holding the files pages refer to, written only for the
+# pages rendered, and the same in every language
+PAGE_RESOURCE_DIRS = ("_downloads", "_images", "_sources")
+# Only written by a complete build
+INDEX_PAGE = "index.html"
+TABLE_HEADER = ("Language", "Translated", "Messages", "Coverage", "Documents")
+
+
+# --- Coverage --- #
+
+
+def get_domain(docname):
+    """Get the catalog of a document, as with Sphinx's gettext_compact."""
+    return docname.split("/", 1)[0]
+
+
+def get_documents(source_dir):
+    """Get the source file suffix of each document in a source dir."""
+    documents = {}
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        dirnames[:] = sorted(
+            name
+            for name in dirnames
+            if name not in EXCLUDE_DIRS and not name.startswith(".")
+        )
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            if path.suffix in SOURCE_SUFFIXES:
+                docname = path.relative_to(source_dir).with_suffix("")
+                documents[docname.as_posix()] = path.suffix
+    return documents
+
+
+def count_messages(catalog_path):
+    """Count the messages of a catalog, and those translated.
+
+    Fuzzy translations aren't used by Sphinx, so don't count.
+    """
+    with open(catalog_path, "rb") as catalog_file:
+        catalog = read_po(catalog_file)
+    message_count = translated_count = 0
+    for message in catalog:
+        # The header
+        if not message.id:
+            continue
+        message_count += 1
+        strings = (
+            message.string
+            if isinstance(message.string, (list, tuple))
+            else [message.string]
+        )
+        if all(strings) and not message.fuzzy:
+            translated_count += 1
+    return message_count, translated_count
+
+
+def get_catalog_counts(catalog_dir, pot_dir):
+    """Count the messages of each catalog of a language.
+
+    Catalogs not yet made for the language count as untranslated.
+    """
+    counts = {}
+    if pot_dir.is_dir():
+        for pot_path in sorted(pot_dir.glob("*.pot")):
+            counts[pot_path.stem] = (count_messages(pot_path)[0], 0)
+    if catalog_dir.is_dir():
+        for po_path in sorted(catalog_dir.rglob("*.po")):
+            domain = po_path.relative_to(catalog_dir).with_suffix("")
+            counts[domain.as_posix()] = count_messages(po_path)
+    return counts
+
+
+def get_coverage(language, *, locale_dir, pot_dir, source_dir):
+    """Get how much of a language is translated, by catalog and document."""
+    counts = get_catalog_counts(
+        Path(locale_dir) / language / CATALOG_DIRNAME, Path(pot_dir)
+    )
+    message_count = sum(messages for messages, __ in counts.values())
+    translated_count = sum(translated for __, translated in counts.values())
+    translated_docs = {}
+    untranslated_docs = {}
+    for docname, suffix in get_documents(Path(source_dir)).items():
+        if counts.get(get_domain(docname), (0, 0))[1]:
+            translated_docs[docname] = suffix
+        else:
+            untranslated_docs[docname] = suffix
+    return {
+        "messages": message_count,
+        "translated": translated_count,
+        "coverage": (
+            translated_count / message_count if message_count else 0.0
+        ),
+        "catalogs": {
+            domain: {"messages": messages, "translated": translated}
+            for domain, (messages, translated) in counts.items()
+        },
+        "translated_docs": translated_docs,
+        "untranslated_docs": untranslated_docs,
+    }
+
+
+def format_report(coverages):
+    """Format the coverage of each language as a plain-text table."""
+    table_rows = []
+    for language, coverage in coverages.items():
+        translated_doc_count = len(coverage["translated_docs"])
+        doc_count = translated_doc_count + len(coverage["untranslated_docs"])
+        table_rows.append(
+            (
+                language,
+                str(coverage["translated"]),
+                str(coverage["messages"]),
+                f"{coverage['coverage']:.1%}",
+                f"{translated_doc_count}/{doc_count}",
+            )
+        )
+    return plaintable.format_table(TABLE_HEADER, table_rows)
+
+
+# --- Reusing pages --- #
+
+
+def get_translated_filenames(coverage, *, source_dir, source_build_dir):
+    """Get the source files to render for a partly translated language.
+
+    Returns none to render them all, if there are no untranslated documents
+    or no source language build to reuse their pages from.
+    """
+    source_dir = Path(source_dir)
+    source_build_dir = Path(source_build_dir)
+    source_language = source_build_dir.name
+    if not coverage["untranslated_docs"] or not coverage["translated_docs"]:
+        return []
+    if not (source_build_dir / INDEX_PAGE).exists():
+        print(f"No {source_language} build to reuse; rendering all pages")
+        return []
+    # Documents left out of the build (like the API reference without
+    # autodoc) have no pages, and can't be rendered on their own
+    filenames = [
+        str(source_dir / f"{docname}{suffix}")
+        for docname, suffix in coverage["translated_docs"].items()
+        if (source_build_dir / f"{docname}.html").exists()
+    ]
+    print(
+        f"Rendering the {len(filenames)} pages with translations, reusing "
+        f"{source_language} pages for the other "
+        f"{len(coverage['untranslated_docs'])}"
+    )
+    return filenames
+
+
+def copy_missing_files(source_dir, output_dir):
+    """Copy the files of a dir that aren't in another already."""
+    copied_count = 0
+    for source_path in sorted(source_dir.rglob("*")):
+        output_path = output_dir / source_path.relative_to(source_dir)
+        if source_path.is_file() and not output_path.exists():
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source_path, output_path)
+            copied_count += 1
+    return copied_count
+
+
+def reuse_source_pages(source_build_dir, build_dir, untranslated_docs):
+    """Copy the source language's pages of the untranslated documents.
+
+    Also copies the images, downloads and sources only those pages refer
+    to, and replaces the pages of documents that have lost their
+    translations. The copied pages keep their source language ``lang``
+    attribute, as their text is in that language.
+    """
+    page_count = 0
+    for docname in untranslated_docs:
+        source_path = source_build_dir / f"{docname}.html"
+        if source_path.is_file():
+            output_path = build_dir / f"{docname}.html"
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source_path, output_path)
+            page_count += 1
+    resource_count = sum(
+        copy_missing_files(source_build_dir / dirname, build_dir / dirname)
+        for dirname in PAGE_RESOURCE_DIRS
+    )
+    return page_count, resource_count
+
+
+# --- CLI --- #
+
+
+def main(argv=None):
+    """Report the translation coverage, or reuse untranslated pages."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    coverage_parser = subparsers.add_parser(
+        "coverage", help="report the translation coverage of languages"
+    )
+    coverage_parser.add_argument("languages", nargs="+")
+    coverage_parser.add_argument("--source-dir", required=True)
+    coverage_parser.add_argument("--locale-dir", required=True)
+    coverage_parser.add_argument("--pot-dir", required=True)
+    coverage_parser.add_argument(
+        "--output", help="path to write the coverage JSON to"
+    )
+
+    reuse_parser = subparsers.add_parser(
+        "reuse",
+        help="copy the source language's pages of the untranslated documents",
+    )
+    reuse_parser.add_argument("source_build_dir")
+    reuse_parser.add_argument("build_dir")
+    reuse_parser.add_argument(
+        "--coverage", required=True, help="coverage JSON of the language"
+    )
+    reuse_parser.add_argument("--language", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "reuse":
+        coverage = json.loads(Path(args.coverage).read_text(encoding="utf-8"))[
+            args.language
+        ]
+        page_count, resource_count = reuse_source_pages(
+            Path(args.source_build_dir),
+            Path(args.build_dir),
+            coverage["untranslated_docs"],
+        )
+        print(
+            f"Reused {page_count} untranslated pages and {resource_count} "
+            f"other files from {args.source_build_dir}"
+        )
+        return
+
+    coverages = {
+        language: get_coverage(
+            language,
+            locale_dir=args.locale_dir,
+            pot_dir=args.pot_dir,
+            source_dir=args.source_dir,
+        )
+        for language in args.languages
+    }
+    print(format_report(coverages))
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(
+            json.dumps(coverages, indent=2), encoding="utf-8"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""Make the build scripts and Sphinx extensions importable by the tests."""
+
+# Standard library imports
+import sys
+from pathlib import Path
+
+
+# Constants
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SCRIPT_DIR = ROOT_DIR / "scripts"
+EXTENSION_DIR = ROOT_DIR / "docs" / "_ext"
+
+for path in (SCRIPT_DIR, EXTENSION_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,110 @@
+"""Tests for skipping ignored modules in autosummary's recursion."""
+
+# Standard library imports
+import importlib
+import sys
+from types import SimpleNamespace
+
+# Third party imports
+import pytest
+from sphinx.ext.autosummary import generate
+
+# Local imports
+import autosummaryprune
+
+
+# Constants
+PACKAGE_NAME = "prunedpkg"
+# Importing any of the tests packages fails the test
+TESTS_INIT = "raise RuntimeError('tests imported')"
+PACKAGE_FILES = {
+    "__init__.py": "",
+    "core.py": "",
+    "tests/__init__.py": TESTS_INIT,
+    "tests/test_core.py": "",
+    "plugins/__init__.py": "",
+    "plugins/editor.py": "",
+    "plugins/tests/__init__.py": TESTS_INIT,
+    "plugins/widgets/__init__.py": "",
+    "plugins/widgets/panel.py": "",
+    "plugins/widgets/tests/__init__.py": TESTS_INIT,
+}
+
+
+@pytest.fixture(name="package")
+def fixture_package(tmp_path, monkeypatch):
+    """Write a package with tests packages nested at several levels."""
+    for filename, text in PACKAGE_FILES.items():
+        path = tmp_path / PACKAGE_NAME / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield importlib.import_module(PACKAGE_NAME)
+    for modname in list(sys.modules):
+        if modname.partition(".")[0] == PACKAGE_NAME:
+            del sys.modules[modname]
+
+
+@pytest.mark.parametrize(
+    ("modname", "ignored"),
+    [
+        ("prunedpkg.tests", True),
+        ("prunedpkg.tests.test_core", True),
+        ("prunedpkg.plugins.tests", True),
+        ("prunedpkg.plugins.widgets.tests", True),
+        ("prunedpkg.core", False),
+        ("prunedpkg.plugins", False),
+        ("prunedpkg.plugins.widgets.panel", False),
+    ],
+)
+def test_tests_glob_matches_nested_tests(modname, ignored):
+    """Test the tests glob matches tests packages at any depth."""
+    is_ignored = autosummaryprune.compile_module_matcher(["*tests*"])
+
+    assert is_ignored(modname) is ignored
+
+
+@pytest.mark.usefixtures("package")
+@pytest.mark.parametrize(
+    ("modname", "expected"),
+    [
+        (PACKAGE_NAME, ["core", "plugins"]),
+        (f"{PACKAGE_NAME}.plugins", ["editor", "widgets"]),
+        (f"{PACKAGE_NAME}.plugins.widgets", ["panel"]),
+    ],
+)
+def test_nested_tests_skipped_before_import(modname, expected):
+    """Test tests packages are left out without ever being imported."""
+    # pylint: disable = protected-access
+    get_modules = autosummaryprune.wrap_get_modules(
+        getattr(generate._get_modules, "__wrapped__", generate._get_modules),
+        autosummaryprune.compile_module_matcher(["*tests*"]),
+    )
+
+    public, items = get_modules(
+        importlib.import_module(modname), skip=[], name=modname
+    )
+
+    assert sorted(public) == expected
+    assert sorted(items) == expected
+    assert not any(
+        "tests" in name for name in sys.modules if PACKAGE_NAME in name
+    )
+
+
+def test_missing_get_modules_filters_in_template(monkeypatch):
+    """Test a Sphinx without the private finder falls back to the template."""
+    monkeypatch.delattr(generate, "_get_modules")
+    config = SimpleNamespace(
+        autosummary_ignore_modules=["*tests*", "prunedpkg.core", "re:.*_x"],
+        autosummary_only_modules=[],
+        autosummary_context={"other": 1},
+    )
+
+    autosummaryprune.prune_autosummary_modules(SimpleNamespace(), config)
+
+    assert config.autosummary_context == {
+        "other": 1,
+        "ignored_module_names": ["prunedpkg.core"],
+        "ignored_module_parts": ["tests"],
+    }
@@ -0,0 +1,37 @@
+"""Smoke tests for benchmarking the tutorial plugin against a stand-in host."""
+
+# Standard library imports
+import json
+
+# Local imports
+import benchmarkplugin
+
+
+# Constants
+ROUNDS = 2
+# Made by the tutorial plugin: an icon for itself and one for each action
+TUTORIAL_ACTIONS = 3
+TUTORIAL_ICONS = 4
+
+
+def test_tutorial_plugin_report(tmp_path, capsys):
+    """Test the tutorial plugin's start-up steps are all in the report."""
+    report_path = tmp_path / "report.json"
+
+    benchmarkplugin.main(
+        ["--rounds", str(ROUNDS), "--output", str(report_path)]
+    )
+
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert len(report["rounds"]) == ROUNDS
+    for step in ("import", "register", "create_action", "create_icon"):
+        assert step in report["rounds"][0]["times"]
+    assert report["summary"]["create_action"]["calls"] == TUTORIAL_ACTIONS
+    assert report["summary"]["create_icon"]["calls"] == TUTORIAL_ICONS
+    assert report["created"] == {
+        "actions": TUTORIAL_ACTIONS,
+        "icons": TUTORIAL_ICONS,
+        "menu_items": TUTORIAL_ACTIONS,
+        "printed_lines": 1,
+    }
+    assert "Register (plugin's own code)" in capsys.readouterr().out
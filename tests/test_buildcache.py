@@ -0,0 +1,39 @@
+"""Tests for the build cache keys shared between checkouts."""
+
+# Local imports
+import buildcache
+
+
+def write_checkout(checkout_dir, conf_text="project = 'Docs'"):
+    """Write the global build inputs of a checkout."""
+    (checkout_dir / "docs" / "_ext").mkdir(parents=True)
+    (checkout_dir / "docs" / "conf.py").write_text(conf_text, encoding="utf-8")
+    (checkout_dir / "docs" / "_ext" / "ext.py").write_text(
+        "", encoding="utf-8"
+    )
+    return checkout_dir
+
+
+def compute_key(checkout_dir):
+    """Compute the cache key of a build of a checkout."""
+    return buildcache.compute_cache_key(
+        ["sphinx", "-b", "html", "-c", str(checkout_dir / "docs")],
+        [checkout_dir / "docs" / "conf.py", checkout_dir / "docs" / "_ext"],
+        base_dir=checkout_dir,
+    )
+
+
+def test_key_independent_of_checkout_path(tmp_path):
+    """Test checkouts at different paths share their cache key."""
+    first_dir = write_checkout(tmp_path / "first")
+    second_dir = write_checkout(tmp_path / "nested" / "second")
+
+    assert compute_key(first_dir) == compute_key(second_dir)
+
+
+def test_key_changed_by_inputs(tmp_path):
+    """Test a change to a global input changes the cache key."""
+    first_dir = write_checkout(tmp_path / "first")
+    second_dir = write_checkout(tmp_path / "second", "project = 'Other'")
+
+    assert compute_key(first_dir) != compute_key(second_dir)
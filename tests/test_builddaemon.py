@@ -0,0 +1,54 @@
+"""Tests for reusing warm Sphinx apps in the build server."""
+
+# Third party imports
+import pytest
+
+# Local imports
+import builddaemon
+
+
+# Constants
+CONF_PY = """
+extensions = ["counter"]
+"""
+COUNTER_EXTENSION = """
+def count_build(app):
+    app.builder.builds = getattr(app.builder, "builds", 0) + 1
+
+
+def setup(app):
+    app.connect("builder-inited", count_build)
+    return {"parallel_read_safe": True}
+"""
+
+
+@pytest.fixture(name="source_dir")
+def fixture_source_dir(tmp_path, monkeypatch):
+    """Write a project with an extension counting its builder-inited runs."""
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    (source_dir / "conf.py").write_text(CONF_PY, encoding="utf-8")
+    (source_dir / "counter.py").write_text(COUNTER_EXTENSION, encoding="utf-8")
+    (source_dir / "index.rst").write_text("Index\n=====\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(source_dir))
+    yield source_dir
+    builddaemon.unload_modules(source_dir)
+
+
+def test_quiet_reused_app_builds_without_logging_errors(
+    source_dir, tmp_path, capsys
+):
+    """Test a reused app reruns local setup and logs quietly without errors."""
+    server = builddaemon.BuildServer(("127.0.0.1", 0))
+    sphinx_args = ["-b", "html", "-q", str(source_dir), str(tmp_path / "out")]
+    try:
+        statuses = [
+            server.build(sphinx_args, lambda text: None) for __ in range(2)
+        ]
+    finally:
+        server.server_close()
+
+    ((app, __),) = server.apps.values()
+    assert statuses == [0, 0]
+    assert app.builder.builds == 2
+    assert "Logging error" not in capsys.readouterr().err
@@ -0,0 +1,146 @@
+"""Tests for merging site shards built in separate jobs."""
+
+# Standard library imports
+import json
+
+# Third party imports
+import pytest
+
+# Local imports
+import buildshards
+
+
+# Constants
+SITE_FILES = {
+    "index.html": "Index",
+    "_static/style.css": "body {}",
+    "es/index.html": "Índice",
+}
+SOURCE_PART = {"source": ["."]}
+ES_PART = {"es": ["es"]}
+EXPECTED_PARTS = ["source", "es"]
+
+
+@pytest.fixture(name="site_dir")
+def fixture_site_dir(tmp_path):
+    """Write a built site with a source and a translated part."""
+    site_dir = tmp_path / "site"
+    for relpath, text in SITE_FILES.items():
+        (site_dir / relpath).parent.mkdir(parents=True, exist_ok=True)
+        (site_dir / relpath).write_text(text, encoding="utf-8")
+    return site_dir
+
+
+def export_shards(site_dir, shards_dir, *, reserved_dirs=("es",)):
+    """Export the source and translated parts of a site to two shards."""
+    shard_dirs = [shards_dir / "source", shards_dir / "es"]
+    buildshards.export_shard(
+        site_dir, shard_dirs[0], SOURCE_PART, reserved_dirs=reserved_dirs
+    )
+    buildshards.export_shard(site_dir, shard_dirs[1], ES_PART)
+    return shard_dirs
+
+
+def update_manifest(shard_dir, update):
+    """Change the manifest of a shard."""
+    manifest_path = shard_dir / buildshards.SHARD_MANIFEST_FILENAME
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    update(manifest)
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+
+
+def test_merge_complete_shards(site_dir, tmp_path):
+    """Test shards making up the whole site are merged into a copy of it."""
+    shard_dirs = export_shards(site_dir, tmp_path / "shards")
+    output_dir = tmp_path / "output"
+
+    buildshards.merge_shards(
+        shard_dirs, output_dir, expected_parts=EXPECTED_PARTS
+    )
+
+    assert {
+        path.relative_to(output_dir).as_posix(): path.read_text(
+            encoding="utf-8"
+        )
+        for path in output_dir.rglob("*")
+        if path.is_file()
+    } == SITE_FILES
+
+
+def test_missing_part_not_merged(site_dir, tmp_path):
+    """Test a merge without one of the expected parts fails."""
+    shard_dirs = export_shards(site_dir, tmp_path / "shards")
+    output_dir = tmp_path / "output"
+
+    with pytest.raises(RuntimeError, match="Missing parts: es"):
+        buildshards.merge_shards(
+            shard_dirs[:1], output_dir, expected_parts=EXPECTED_PARTS
+        )
+    assert not output_dir.exists()
+
+
+def test_duplicate_file_not_merged(site_dir, tmp_path):
+    """Test a file exported in two parts fails the merge."""
+    shard_dirs = export_shards(site_dir, tmp_path / "shards", reserved_dirs=())
+
+    with pytest.raises(
+        RuntimeError, match="es/index.html is in both part 'source'"
+    ):
+        buildshards.merge_shards(
+            shard_dirs, tmp_path / "output", expected_parts=EXPECTED_PARTS
+        )
+
+
+def test_changed_file_not_merged(site_dir, tmp_path):
+    """Test a file not matching its hash in the manifest fails the merge."""
+    shard_dirs = export_shards(site_dir, tmp_path / "shards")
+    shard_site_dir = shard_dirs[1] / buildshards.SHARD_SITE_DIRNAME
+    (shard_site_dir / "es" / "index.html").write_text(
+        "Truncated", encoding="utf-8"
+    )
+
+    with pytest.raises(RuntimeError, match="es/index.html .* doesn't match"):
+        buildshards.merge_shards(
+            shard_dirs, tmp_path / "output", expected_parts=EXPECTED_PARTS
+        )
+
+
+@pytest.mark.parametrize(
+    "relpath", ["../outside.html", "/tmp/outside.html", "es/../../x.html"]
+)
+def test_path_outside_site_not_merged(site_dir, tmp_path, relpath):
+    """Test a manifest path leading outside the site fails the merge."""
+    shard_dirs = export_shards(site_dir, tmp_path / "shards")
+    update_manifest(
+        shard_dirs[1],
+        lambda manifest: manifest["parts"]["es"]["files"].update(
+            {relpath: "0" * 64}
+        ),
+    )
+
+    with pytest.raises(RuntimeError, match="is outside the site"):
+        buildshards.merge_shards(
+            shard_dirs,
+            tmp_path / "output" / "site",
+            expected_parts=EXPECTED_PARTS,
+        )
+    assert not (tmp_path / "output").exists()
+
+
+def test_main_exits_on_failed_merge(site_dir, tmp_path, capsys):
+    """Test the command line reports the problems and exits with an error."""
+    shard_dirs = export_shards(site_dir, tmp_path / "shards")
+
+    with pytest.raises(SystemExit) as exit_info:
+        buildshards.main(
+            [
+                "merge",
+                str(shard_dirs[0]),
+                "--output",
+                str(tmp_path / "output"),
+                "--expect",
+                ",".join(EXPECTED_PARTS),
+            ]
+        )
+    assert exit_info.value.code == 1
+    assert "Missing parts: es" in capsys.readouterr().err
@@ -0,0 +1,155 @@
+"""Tests for finding the documents affected by changed files."""
+
+# Standard library imports
+import importlib
+import pickle
+import subprocess
+import sys
+from types import SimpleNamespace
+
+# Third party imports
+import pytest
+from docutils.utils import new_document
+from sphinx import addnodes
+
+# Local imports
+import changeddocs
+
+
+# Constants
+# Not in the submodule repo, like older commits in a shallow clone
+MISSING_COMMIT = "0123456789abcdef0123456789abcdef01234567"
+NODE_MODULE = "changeddocsnodes"
+NODE_MODULE_SOURCE = """
+from docutils import nodes
+
+
+class custom_node(nodes.General, nodes.Element):
+    pass
+"""
+
+
+@pytest.fixture(name="source_dir")
+def fixture_source_dir(tmp_path, monkeypatch):
+    """Write a source dir whose doctrees pickle an extension's node."""
+    source_dir = tmp_path / "docs"
+    extension_dir = source_dir / changeddocs.EXTENSION_DIRNAME
+    doctree_dir = source_dir / "_build" / "doctrees"
+    extension_dir.mkdir(parents=True)
+    doctree_dir.mkdir(parents=True)
+    (extension_dir / f"{NODE_MODULE}.py").write_text(
+        NODE_MODULE_SOURCE, encoding="utf-8"
+    )
+    for docname in ("changed", "referrer"):
+        (source_dir / f"{docname}.rst").write_text("", encoding="utf-8")
+
+    # Pickle with the extension importable, as in a build
+    with monkeypatch.context() as build_patch:
+        build_patch.syspath_prepend(str(extension_dir))
+        node_module = importlib.import_module(NODE_MODULE)
+        doctree = new_document("referrer.rst")
+        doctree += node_module.custom_node(
+            "",
+            addnodes.pending_xref(
+                reftype="doc", reftarget="changed", refdoc="referrer"
+            ),
+        )
+        with open(doctree_dir / "referrer.doctree", "wb") as doctree_file:
+            pickle.dump(doctree, doctree_file)
+    monkeypatch.delitem(sys.modules, NODE_MODULE)
+    # Restore the path after the tests add the extension dir to it
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    yield source_dir
+    sys.modules.pop(NODE_MODULE, None)
+
+
+def find_affected_docs(source_dir):
+    """Find the documents affected by changing the changed document."""
+    env = SimpleNamespace(
+        all_docs={"changed": 0, "referrer": 0},
+        toctree_includes={},
+        dependencies={},
+        domaindata={},
+        config=SimpleNamespace(source_suffix={".rst": "restructuredtext"}),
+    )
+    return changeddocs.find_affected_docs(
+        env,
+        [source_dir / "changed.rst"],
+        doctree_dir=source_dir / "_build" / "doctrees",
+        source_dir=source_dir,
+        submodule_dir=source_dir.parent / "spyder",
+    )
+
+
+def test_doctree_with_extension_node_read(source_dir):
+    """Test doctrees with the nodes of local extensions can be read."""
+    changeddocs.add_extension_path(source_dir)
+
+    assert find_affected_docs(source_dir) == ["changed", "referrer"]
+
+
+def test_unreadable_doctree_builds_everything(source_dir):
+    """Test a doctree that can't be unpickled leads to a full build."""
+    assert find_affected_docs(source_dir) is None
+
+
+def git(*args, cwd):
+    """Run a Git command in a test repo."""
+    subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@test", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture(name="repo_dir")
+def fixture_repo_dir(tmp_path):
+    """Create a repo whose submodule is at a commit it doesn't have."""
+    repo_dir = tmp_path / "repo"
+    submodule_dir = repo_dir / "spyder"
+    (repo_dir / "docs").mkdir(parents=True)
+    (repo_dir / "docs" / "index.rst").write_text("", encoding="utf-8")
+    git("init", "-q", cwd=repo_dir)
+    git(
+        "update-index",
+        "--add",
+        "--cacheinfo",
+        f"{changeddocs.SUBMODULE_MODE},{MISSING_COMMIT},spyder",
+        cwd=repo_dir,
+    )
+    git("add", "docs", cwd=repo_dir)
+    git("commit", "-q", "-m", "Initial", cwd=repo_dir)
+
+    submodule_dir.mkdir()
+    (submodule_dir / "module.py").write_text("", encoding="utf-8")
+    git("init", "-q", cwd=submodule_dir)
+    git("add", "module.py", cwd=submodule_dir)
+    git("commit", "-q", "-m", "Shallow", cwd=submodule_dir)
+    return repo_dir
+
+
+def test_changed_files_skip_build_dir(repo_dir):
+    """Test untracked build output isn't taken as a changed source."""
+    build_dir = repo_dir / "docs" / changeddocs.BUILD_DIRNAME
+    build_dir.mkdir()
+    (build_dir / "index.html").write_text("", encoding="utf-8")
+    (repo_dir / "docs" / "new.rst").write_text("", encoding="utf-8")
+
+    assert changeddocs.get_changed_files(
+        "HEAD",
+        source_dir=repo_dir / "docs",
+        submodule_dir=repo_dir / "nonexistent",
+    ) == [repo_dir / "docs" / "new.rst"]
+
+
+def test_missing_submodule_commit_builds_everything(repo_dir, capsys):
+    """Test a submodule commit missing from a shallow clone is tolerated."""
+    changed_files = changeddocs.get_changed_files(
+        "HEAD",
+        source_dir=repo_dir / "docs",
+        submodule_dir=repo_dir / "spyder",
+    )
+
+    assert changed_files is None
+    assert "building everything" in capsys.readouterr().out
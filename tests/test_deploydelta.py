@@ -0,0 +1,84 @@
+"""Tests for computing and applying deltas between deployments."""
+
+# Third party imports
+import pytest
+
+# Local imports
+import deploydelta
+
+
+def write_site(site_dir, files):
+    """Write a site with the given files and their text."""
+    for relpath, text in files.items():
+        path = site_dir / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+
+
+def get_site_files(site_dir):
+    """Get the text of each file of a site, except for its manifest."""
+    return {
+        path.relative_to(site_dir).as_posix(): path.read_text(encoding="utf-8")
+        for path in sorted(site_dir.rglob("*"))
+        if path.is_file() and path.name != deploydelta.MANIFEST_FILENAME
+    }
+
+
+@pytest.fixture(name="site_dir")
+def fixture_site_dir(tmp_path):
+    """Write a built site."""
+    site_dir = tmp_path / "site"
+    write_site(
+        site_dir,
+        {"index.html": "new index", "_static/app.js": "new script"},
+    )
+    return site_dir
+
+
+def test_delta_applied_to_target_deployed_from_its_base(tmp_path, site_dir):
+    """Test a delta is applied as is to the deployment it's based on."""
+    target_dir = tmp_path / "target"
+    old_site_dir = tmp_path / "old-site"
+    write_site(old_site_dir, {"index.html": "old index", "old.html": "old"})
+    deploydelta.write_manifest(old_site_dir)
+    deploydelta.apply_delta(old_site_dir, target_dir)
+    delta = deploydelta.write_manifest(
+        site_dir,
+        previous=old_site_dir / deploydelta.MANIFEST_FILENAME,
+    )
+
+    applied_delta = deploydelta.apply_delta(site_dir, target_dir, delta)
+
+    assert applied_delta == delta
+    assert applied_delta["deleted"] == ["old.html"]
+    assert get_site_files(target_dir) == get_site_files(site_dir)
+
+
+@pytest.mark.parametrize(
+    "target_manifest", [None, {"version": 1, "files": {"other.html": "0"}}]
+)
+def test_delta_recomputed_from_target_files(
+    tmp_path, site_dir, target_manifest
+):
+    """Test stale target files are deleted if the delta has another base."""
+    target_dir = tmp_path / "target"
+    write_site(
+        target_dir,
+        {
+            "index.html": "old index",
+            "stale.html": "stale",
+            "old/page.html": "",
+        },
+    )
+    if target_manifest is not None:
+        deploydelta.write_json(
+            target_dir / deploydelta.MANIFEST_FILENAME, target_manifest
+        )
+    # No previous manifest, so the delta has no base and no deletions
+    delta = deploydelta.write_manifest(site_dir)
+
+    applied_delta = deploydelta.apply_delta(site_dir, target_dir, delta)
+
+    assert applied_delta["deleted"] == ["old/page.html", "stale.html"]
+    assert get_site_files(target_dir) == get_site_files(site_dir)
+    assert not (target_dir / "old").exists()
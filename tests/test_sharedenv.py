@@ -0,0 +1,188 @@
+"""Tests for reusing the environment of another docs variant."""
+
+# Standard library imports
+import io
+import shutil
+import sys
+import zlib
+
+# Third party imports
+import pytest
+from sphinx.application import Sphinx
+
+# Local imports
+import sharedcache
+from sharedenv import MARKER_FILENAME
+
+
+# Constants
+CONF_PY = """
+extensions = ["sharedenv", "sharedcache", "sphinx.ext.intersphinx"]
+exclude_patterns = ["_build"]
+suppress_warnings = []
+
+REFERENCE_EXCLUDE_PATTERNS = ["reference.rst"]
+REFERENCE_SUPPRESS_WARNINGS = ["toc.excluded"]
+if "reference" in tags:
+    extensions.append("referenceonly")
+else:
+    exclude_patterns += REFERENCE_EXCLUDE_PATTERNS
+    suppress_warnings += REFERENCE_SUPPRESS_WARNINGS
+
+name = "Other" if "other" in tags else "Plain"
+rst_prolog = f".. |name| replace:: {name}"
+intersphinx_mapping = {"other": ("https://other.example.org/", None)}
+
+sharedenv_allowed_changes = {
+    "extensions": ["referenceonly"],
+    "reference_option": ["on"],
+    "exclude_patterns": REFERENCE_EXCLUDE_PATTERNS,
+    "suppress_warnings": REFERENCE_SUPPRESS_WARNINGS,
+}
+"""
+# Like sphinx_qt_documentation, which only the autodoc variant loads
+REFERENCE_EXTENSION_NAME = "referenceonly"
+REFERENCE_EXTENSION = """
+def setup(app):
+    app.add_config_value("reference_option", "on", "env")
+    return {"env_version": 1, "parallel_read_safe": True}
+"""
+SOURCES = {
+    f"{REFERENCE_EXTENSION_NAME}.py": REFERENCE_EXTENSION,
+    "index.rst": "Index\n=====\n\n.. toctree::\n\n   page\n   reference\n",
+    "page.rst": "Page\n====\n\nThis is the |name| page.\n",
+    "reference.rst": (
+        "Reference\n=========\n\nSee :doc:`page` and :doc:`other:page`.\n"
+    ),
+}
+# Served instead of the remote inventory, so the tests run offline
+INVENTORY = (
+    b"# Sphinx inventory version 2\n"
+    b"# Project: Other\n"
+    b"# Version: 1.0\n"
+    b"# The remainder of this file is compressed using zlib.\n"
+) + zlib.compress(b"page std:doc -1 page.html Other page\n")
+PLAIN_TAGS = ()
+REFERENCE_TAGS = ("reference",)
+
+
+@pytest.fixture(name="source_dir")
+def fixture_source_dir(tmp_path, monkeypatch):
+    """Write a small project with a plain and a reference variant."""
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    (source_dir / "conf.py").write_text(CONF_PY, encoding="utf-8")
+    for filename, text in SOURCES.items():
+        (source_dir / filename).write_text(text, encoding="utf-8")
+    monkeypatch.syspath_prepend(str(source_dir))
+    monkeypatch.setattr(
+        sharedcache, "fetch_inventory", lambda url, timeout: INVENTORY
+    )
+    yield source_dir
+    sys.modules.pop(REFERENCE_EXTENSION_NAME, None)
+
+
+def build(source_dir, build_dir, tags, status=None):
+    """Build a variant of the project and get the documents it read."""
+    read_docs = []
+    app = Sphinx(
+        str(source_dir),
+        str(source_dir),
+        str(build_dir / "html"),
+        str(build_dir / "doctrees"),
+        "html",
+        status=status,
+        warning=io.StringIO(),
+        tags=list(tags),
+    )
+    app.connect(
+        "env-before-read-docs",
+        lambda app, env, docnames: read_docs.extend(docnames),
+    )
+    app.build()
+    return sorted(read_docs)
+
+
+def build_seeded(source_dir, build_dir, seed_dir, tags, status=None):
+    """Build a variant with the environment read by another one."""
+    shutil.copytree(seed_dir / "doctrees", build_dir / "doctrees")
+    return build(source_dir, build_dir, tags, status)
+
+
+def get_pages(build_dir):
+    """Get the text of each HTML page of a build."""
+    html_dir = build_dir / "html"
+    return {
+        path.relative_to(html_dir).as_posix(): path.read_text(encoding="utf-8")
+        for path in sorted(html_dir.rglob("*.html"))
+    }
+
+
+@pytest.mark.parametrize(
+    ("seed_tags", "tags"),
+    [(PLAIN_TAGS, REFERENCE_TAGS), (REFERENCE_TAGS, PLAIN_TAGS)],
+    ids=["plain-to-reference", "reference-to-plain"],
+)
+def test_reused_env_output_unchanged(source_dir, tmp_path, seed_tags, tags):
+    """Test a variant built from a reused env matches one built fresh."""
+    build(source_dir, tmp_path / "fresh", tags)
+    build(source_dir, tmp_path / "seed", seed_tags)
+
+    read_docs = build_seeded(
+        source_dir, tmp_path / "seeded", tmp_path / "seed", tags
+    )
+
+    assert "page" not in read_docs
+    assert get_pages(tmp_path / "seeded") == get_pages(tmp_path / "fresh")
+
+
+def test_cache_dir_not_in_env_config(source_dir, tmp_path):
+    """Test the build specific inventory cache doesn't change the config."""
+    build(source_dir, tmp_path / "seed", PLAIN_TAGS)
+    status = io.StringIO()
+
+    read_docs = build_seeded(
+        source_dir,
+        tmp_path / "seeded",
+        tmp_path / "seed",
+        REFERENCE_TAGS,
+        status,
+    )
+
+    assert "Not reusing shared pages" not in status.getvalue()
+    assert "page" not in read_docs
+    assert "https://other.example.org/page.html" in (
+        get_pages(tmp_path / "seeded")["reference.html"]
+    )
+
+
+def test_other_config_change_rereads_all(source_dir, tmp_path):
+    """Test a config change outside the allowed ones re-reads every page."""
+    tags = (*REFERENCE_TAGS, "other")
+    build(source_dir, tmp_path / "fresh", tags)
+    build(source_dir, tmp_path / "seed", PLAIN_TAGS)
+
+    read_docs = build_seeded(
+        source_dir, tmp_path / "seeded", tmp_path / "seed", tags
+    )
+
+    assert read_docs == ["index", "page", "reference"]
+    assert get_pages(tmp_path / "seeded") == get_pages(tmp_path / "fresh")
+
+
+def test_marker_of_other_env_rereads_all(source_dir, tmp_path):
+    """Test an env isn't reused by the marker of another one."""
+    build(source_dir, tmp_path / "fresh", REFERENCE_TAGS)
+    build(source_dir, tmp_path / "plain", PLAIN_TAGS)
+    build(source_dir, tmp_path / "seed", ("other",))
+    shutil.copy2(
+        tmp_path / "plain" / "doctrees" / MARKER_FILENAME,
+        tmp_path / "seed" / "doctrees" / MARKER_FILENAME,
+    )
+
+    read_docs = build_seeded(
+        source_dir, tmp_path / "seeded", tmp_path / "seed", REFERENCE_TAGS
+    )
+
+    assert read_docs == ["index", "page", "reference"]
+    assert get_pages(tmp_path / "seeded") == get_pages(tmp_path / "fresh")
@@ -0,0 +1,174 @@
+"""Tests for measuring the translation coverage and reusing pages."""
+
+# Third party imports
+import pytest
+
+# Local imports
+import translationcoverage
+
+
+# Constants
+LANGUAGE = "es"
+SOURCE_LANGUAGE = "en"
+PO_HEADER = """\
+msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+"Plural-Forms: nplurals=2; plural=(n != 1);\\n"
+
+"""
+CATALOGS = {
+    "index": (
+        'msgid "Welcome"\nmsgstr "Bienvenido"\n\n'
+        '#, fuzzy\nmsgid "Hello"\nmsgstr "Hola"\n'
+    ),
+    "guide": (
+        'msgid "Guide"\nmsgstr "Guía"\n\n'
+        'msgid "%d file"\nmsgid_plural "%d files"\n'
+        'msgstr[0] "%d archivo"\nmsgstr[1] "%d archivos"\n\n'
+        'msgid "%d page"\nmsgid_plural "%d pages"\n'
+        'msgstr[0] "%d página"\nmsgstr[1] ""\n'
+    ),
+}
+TEMPLATES = {
+    "index": 'msgid "Welcome"\nmsgstr ""\n\nmsgid "Hello"\nmsgstr ""\n',
+    "guide": (
+        'msgid "Guide"\nmsgstr ""\n\n'
+        'msgid "%d file"\nmsgid_plural "%d files"\n'
+        'msgstr[0] ""\nmsgstr[1] ""\n\n'
+        'msgid "%d page"\nmsgid_plural "%d pages"\n'
+        'msgstr[0] ""\nmsgstr[1] ""\n'
+    ),
+    "faq": 'msgid "Questions"\nmsgstr ""\n',
+}
+DOCUMENTS = (
+    "index.rst",
+    "guide/intro.md",
+    "guide/advanced.rst",
+    "faq.md",
+    "_build/stale.rst",
+)
+
+
+@pytest.fixture(name="docs_dir")
+def fixture_docs_dir(tmp_path):
+    """Write a source dir with its message templates and a translation."""
+    docs_dir = tmp_path / "docs"
+    for filename in DOCUMENTS:
+        (docs_dir / filename).parent.mkdir(parents=True, exist_ok=True)
+        (docs_dir / filename).write_text("", encoding="utf-8")
+    pot_dir = docs_dir / "_build" / "gettext"
+    pot_dir.mkdir(parents=True)
+    for domain, messages in TEMPLATES.items():
+        (pot_dir / f"{domain}.pot").write_text(
+            PO_HEADER + messages, encoding="utf-8"
+        )
+    catalog_dir = (
+        docs_dir / "locales" / LANGUAGE / translationcoverage.CATALOG_DIRNAME
+    )
+    catalog_dir.mkdir(parents=True)
+    for domain, messages in CATALOGS.items():
+        (catalog_dir / f"{domain}.po").write_text(
+            PO_HEADER + messages, encoding="utf-8"
+        )
+    return docs_dir
+
+
+def get_coverage(docs_dir):
+    """Get the coverage of the translation of the source dir."""
+    return translationcoverage.get_coverage(
+        LANGUAGE,
+        locale_dir=docs_dir / "locales",
+        pot_dir=docs_dir / "_build" / "gettext",
+        source_dir=docs_dir,
+    )
+
+
+def write_pages(build_dir, docnames, text):
+    """Write the HTML pages of documents to a build dir."""
+    for docname in docnames:
+        page_path = build_dir / f"{docname}.html"
+        page_path.parent.mkdir(parents=True, exist_ok=True)
+        page_path.write_text(text, encoding="utf-8")
+
+
+def test_coverage_counts(docs_dir):
+    """Test fuzzy and partly translated plural messages don't count."""
+    coverage = get_coverage(docs_dir)
+
+    assert coverage["catalogs"] == {
+        "faq": {"messages": 1, "translated": 0},
+        "guide": {"messages": 3, "translated": 2},
+        "index": {"messages": 2, "translated": 1},
+    }
+    assert (coverage["messages"], coverage["translated"]) == (6, 3)
+    assert coverage["coverage"] == 0.5
+
+
+def test_coverage_documents(docs_dir):
+    """Test documents are translated if their catalog has translations."""
+    coverage = get_coverage(docs_dir)
+
+    assert coverage["translated_docs"] == {
+        "guide/advanced": ".rst",
+        "guide/intro": ".md",
+        "index": ".rst",
+    }
+    assert coverage["untranslated_docs"] == {"faq": ".md"}
+
+
+def test_translated_filenames(docs_dir):
+    """Test only the translated documents with a page are rendered."""
+    source_build_dir = docs_dir / "_build" / "html" / SOURCE_LANGUAGE
+    # The advanced guide was left out of the source language build
+    write_pages(source_build_dir, ["index", "guide/intro", "faq"], "")
+
+    filenames = translationcoverage.get_translated_filenames(
+        get_coverage(docs_dir),
+        source_dir=docs_dir,
+        source_build_dir=source_build_dir,
+    )
+
+    assert filenames == [
+        str(docs_dir / "index.rst"),
+        str(docs_dir / "guide" / "intro.md"),
+    ]
+
+
+def test_no_source_build_renders_all(docs_dir):
+    """Test all pages are rendered without a source build to reuse."""
+    filenames = translationcoverage.get_translated_filenames(
+        get_coverage(docs_dir),
+        source_dir=docs_dir,
+        source_build_dir=docs_dir / "_build" / "html" / SOURCE_LANGUAGE,
+    )
+
+    assert not filenames
+
+
+def test_untranslated_pages_replace_translated(tmp_path):
+    """Test reused pages replace old translated ones, but not resources."""
+    source_build_dir = tmp_path / SOURCE_LANGUAGE
+    build_dir = tmp_path / LANGUAGE
+    write_pages(source_build_dir, ["index", "faq"], "English")
+    write_pages(build_dir, ["index", "faq"], "Español")
+    for language_dir in (source_build_dir, build_dir):
+        (language_dir / "_images").mkdir()
+        (language_dir / "_images" / "shared.png").write_text(
+            language_dir.name, encoding="utf-8"
+        )
+    (source_build_dir / "_images" / "faq.png").write_text(
+        SOURCE_LANGUAGE, encoding="utf-8"
+    )
+
+    counts = translationcoverage.reuse_source_pages(
+        source_build_dir, build_dir, {"faq": ".md"}
+    )
+
+    assert counts == (1, 1)
+    assert (build_dir / "faq.html").read_text(encoding="utf-8") == "English"
+    assert (build_dir / "index.html").read_text(encoding="utf-8") == "Español"
+    assert (build_dir / "_images" / "faq.png").is_file()
+    assert (build_dir / "_images" / "shared.png").read_text(
+        encoding="utf-8"
+    ) == LANGUAGE
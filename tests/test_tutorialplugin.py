@@ -0,0 +1,114 @@
+"""Tests for the tutorial plugin's line count, run in the stand-in host."""
+
+# Standard library imports
+import concurrent.futures
+import importlib
+import threading
+
+# Third party imports
+import pytest
+
+# Local imports
+import benchmarkplugin
+
+
+# Constants
+MODULE_NAME = "my_spyder_plugin.plugin"
+CLASS_NAME = "MySpyderPlugin"
+FILE_COUNT = 50
+FILE_LINES = 10
+TICK = 0.01
+# Generous, as test machines can be slow; a blocking count takes seconds
+MAX_TICK_LATENCY = 0.5
+
+
+@pytest.fixture(name="project_dir")
+def fixture_project_dir(tmp_path, monkeypatch):
+    """Write a project of Python files to count, as the working dir."""
+    project_dir = tmp_path / "project"
+    (project_dir / ".hidden").mkdir(parents=True)
+    for index in range(FILE_COUNT):
+        (project_dir / f"module_{index}.py").write_text(
+            "pass\n" * FILE_LINES, encoding="utf-8"
+        )
+    (project_dir / "notes.txt").write_text("Not Python\n", encoding="utf-8")
+    (project_dir / ".hidden" / "skipped.py").write_text(
+        "pass\n", encoding="utf-8"
+    )
+    monkeypatch.chdir(project_dir)
+    return project_dir
+
+
+def import_plugin_module(monkeypatch):
+    """Import the tutorial plugin, reporting progress for every file."""
+    plugin_module = importlib.import_module(MODULE_NAME)
+    monkeypatch.setattr(plugin_module, "PROGRESS_INTERVAL", 0)
+    return plugin_module
+
+
+@pytest.fixture(name="plugin_module")
+def fixture_plugin_module(monkeypatch):
+    """Import the tutorial plugin module, with the stand-in host."""
+    with benchmarkplugin.plugin_environment(
+        MODULE_NAME, benchmarkplugin.DEFAULT_PLUGIN_PATH
+    ):
+        yield import_plugin_module(monkeypatch)
+
+
+@pytest.fixture(name="plugin")
+def fixture_plugin(monkeypatch):
+    """Load the tutorial plugin in the stand-in host."""
+    with benchmarkplugin.plugin_environment(
+        MODULE_NAME, benchmarkplugin.DEFAULT_PLUGIN_PATH
+    ):
+        __, plugin, __ = benchmarkplugin.load_plugin(
+            MODULE_NAME, CLASS_NAME, benchmarkplugin.StepTimer()
+        )
+        # Loading imports the plugin afresh, so patch the module it's from
+        import_plugin_module(monkeypatch)
+        yield plugin
+        plugin.on_close()
+
+
+@pytest.mark.usefixtures("project_dir")
+def test_count_updates_status_on_main_thread(plugin):
+    """Test the progress and finish slots run on the main thread."""
+    report = benchmarkplugin.run_task(plugin, "start_counting", tick=TICK)
+
+    messages = report["status_messages"]
+    assert report["error"] is None
+    assert not report["off_main_thread"]
+    assert any("so far" in message for message in messages[1:-1])
+    assert messages[-1] == (
+        f"Counted: {FILE_COUNT * FILE_LINES} lines in {FILE_COUNT} files"
+    )
+
+
+@pytest.mark.usefixtures("project_dir")
+def test_count_keeps_main_thread_responsive(plugin):
+    """Test the main thread's ticks stay on time while counting."""
+    report = benchmarkplugin.run_task(plugin, "start_counting", tick=TICK)
+
+    assert report["start_call"] < MAX_TICK_LATENCY
+    assert report["latency"]["max"] < MAX_TICK_LATENCY
+
+
+def test_cancel_stops_walk(project_dir, plugin_module):
+    """Test cancelling the count stops the walk at the next file."""
+    cancel_event = threading.Event()
+
+    result = plugin_module.count_lines(
+        project_dir, lambda *counts: cancel_event.set(), cancel_event
+    )
+
+    assert result == plugin_module.LineCount(1, FILE_LINES, True)
+
+
+def test_cancelled_count_shown_as_stopped(plugin):
+    """Test a count cancelled before it started is shown as stopped."""
+    future = concurrent.futures.Future()
+    future.cancel()
+
+    plugin._on_count_finished(future)  # pylint: disable = protected-access
+
+    assert plugin.status_messages[-1][0] == "Stopped counting"
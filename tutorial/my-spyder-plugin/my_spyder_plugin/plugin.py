@@ -1,14 +1,80 @@
 # pylint: disable = no-name-in-module
 
+# Standard library imports
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
 # Third party imports
+from qtpy.QtCore import Signal
 from spyder.api.plugins import Plugins, SpyderPluginV2
 from spyder.plugins.core.api import ApplicationMenus, HelpMenuSections
 
 
+# Seconds between progress reports, so they don't flood the main thread
+PROGRESS_INTERVAL = 0.1
+STATUS_TIMEOUT = 5000
+
+
+class LineCount(NamedTuple):
+    """The Python files and lines counted, and if the count was cancelled."""
+
+    # pylint: disable = invalid-name
+    files: int
+    lines: int
+    cancelled: bool
+
+
+def count_file_lines(path):
+    """Count the lines of a file, without decoding it."""
+    with open(path, "rb") as file:
+        return sum(1 for __ in file)
+
+
+def count_lines(root_dir, report_progress, cancel_event):
+    """Count the lines of the Python files in a dir, until cancelled."""
+    file_count = line_count = 0
+    last_report_time = time.monotonic()
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+        for filename in filenames:
+            if cancel_event.is_set():
+                return LineCount(file_count, line_count, True)
+            if not filename.endswith(".py"):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                line_count += count_file_lines(path)
+            except OSError:
+                continue
+            file_count += 1
+            if time.monotonic() - last_report_time >= PROGRESS_INTERVAL:
+                last_report_time = time.monotonic()
+                report_progress(file_count, line_count)
+    return LineCount(file_count, line_count, False)
+
+
 class MySpyderPlugin(SpyderPluginV2):
     ID = "my_spyder_plugin"
     REQUIRES = [Plugins.Core]
 
+    # Emitted from the worker thread; Qt calls the connected methods of the
+    # plugin on the main thread, where it's safe to update the UI
+    # pylint: disable = invalid-name
+    sig_count_progress = Signal(int, int)
+    sig_count_finished = Signal(object)
+    # pylint: enable = invalid-name
+
+    def __init__(self, parent, configuration=None):
+        super().__init__(parent, configuration)
+        # The worker thread is only started by the first count, so creating
+        # the executor adds nothing to Spyder's start-up time
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._cancel_event = threading.Event()
+        self._count_future = None
+
     # --- SpyderPluginV2 API
     # -------------------------------------------------------------------------
     def get_name(self):
@@ -28,17 +94,81 @@ def register(self, core):
             triggered=self.print_hello,
             register_shortcut=True,
         )
+        count_action = self.create_action(
+            "count_lines",
+            text="Count lines of Python code",
+            icon=self.create_icon("run"),
+            triggered=self.start_counting,
+        )
+        cancel_action = self.create_action(
+            "cancel_count_lines",
+            text="Stop counting lines",
+            icon=self.create_icon("stop"),
+            triggered=self.cancel_counting,
+        )
 
         help_menu = self.get_plugin(ApplicationMenus.Help)
-        core.add_item_to_application_menu(
-            print_action,
-            menu=help_menu,
-            section=HelpMenuSections.Documentation,
-        )
+        for action in (print_action, count_action, cancel_action):
+            core.add_item_to_application_menu(
+                action,
+                menu=help_menu,
+                section=HelpMenuSections.Documentation,
+            )
+
+        self.sig_count_progress.connect(self._on_count_progress)
+        self.sig_count_finished.connect(self._on_count_finished)
 
         self.print_hello()
 
+    # pylint: disable-next = unused-argument
+    def on_close(self, cancelable=False):
+        self.cancel_counting()
+        self._executor.shutdown(wait=False)
+        return True
+
     # --- Public API
     # -------------------------------------------------------------------------
     def print_hello(self):
         print("Hello world!")
+
+    def start_counting(self):
+        if self._count_future is not None and not self._count_future.done():
+            return self._count_future
+
+        self._cancel_event.clear()
+        self.show_status_message("Counting lines of Python code...")
+        self._count_future = self._executor.submit(
+            count_lines,
+            os.getcwd(),
+            self.sig_count_progress.emit,
+            self._cancel_event,
+        )
+        self._count_future.add_done_callback(self.sig_count_finished.emit)
+        return self._count_future
+
+    def cancel_counting(self):
+        self._cancel_event.set()
+
+    # --- Private API
+    # -------------------------------------------------------------------------
+    def _on_count_progress(self, file_count, line_count):
+        self.show_status_message(
+            f"Counting lines: {line_count} in {file_count} files so far..."
+        )
+
+    def _on_count_finished(self, future):
+        # A cancelled future has no exception or result to get
+        if future.cancelled():
+            self.show_status_message("Stopped counting", STATUS_TIMEOUT)
+            return
+        if future.exception() is not None:
+            self.show_status_message(
+                f"Could not count lines: {future.exception()}", STATUS_TIMEOUT
+            )
+            return
+        result = future.result()
+        state = "Stopped counting" if result.cancelled else "Counted"
+        self.show_status_message(
+            f"{state}: {result.lines} lines in {result.files} files",
+            STATUS_TIMEOUT,
+        )